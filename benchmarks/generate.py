@@ -0,0 +1,129 @@
+"""Generate synthetic sites for benchmarking."""
+
+import click
+from pathlib import Path
+import random
+
+# Words used to fill pages
+WORDS = (
+    "lorem ipsum dolor sit amet consectetur adipiscing elit sed do eiusmod tempor "
+    "incididunt ut labore et dolore magna aliqua enim ad minim veniam quis nostrud "
+    "exercitation ullamco laboris nisi aliquip ex ea commodo consequat"
+).split()
+
+# Page template used by generated sites
+TEMPLATE = """<!DOCTYPE html>
+<html>
+<head>
+<title>{{ title }}</title>
+<link rel="stylesheet" href="style.css">
+</head>
+<body>
+<nav><a href="#top">Top</a></nav>
+<main>
+{{ content|safe }}
+</main>
+</body>
+</html>
+"""
+
+# Configuration file for generated sites
+CONFIG = """[tool.mccole]
+skips = ["*.tmp"]
+"""
+
+# Default generator settings
+DEFAULTS = {
+    "pages": 200,
+    "depth": 3,
+    "page_size": 4000,
+    "links": 10,
+    "assets": 50,
+    "asset_size": 20000,
+    "seed": 12345,
+}
+
+
+def generate_site(root, pages, depth, page_size, links, assets, asset_size, seed):
+    """Create a site under root with src/, templates/, and pyproject.toml."""
+    rng = random.Random(seed)
+    root = Path(root)
+    src = root / "src"
+    (root / "templates").mkdir(parents=True, exist_ok=True)
+    (root / "templates" / "page.html").write_text(TEMPLATE)
+    (root / "pyproject.toml").write_text(CONFIG)
+
+    page_paths = [_nested_path(rng, depth, f"page{i}.md") for i in range(pages)]
+    asset_paths = [_nested_path(rng, depth, f"asset{i}.bin") for i in range(assets)]
+
+    for i, rel_path in enumerate(page_paths):
+        path = src / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(_page(rng, i, rel_path, page_paths, asset_paths, page_size, links))
+
+    for rel_path in asset_paths:
+        path = src / rel_path
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(rng.randbytes(asset_size))
+
+    return root
+
+
+def _nested_path(rng, depth, name):
+    """Put a file name at a random depth in a small directory tree."""
+    levels = rng.randint(0, depth)
+    return Path(*[f"dir{rng.randint(0, 3)}" for _ in range(levels)], name)
+
+
+def _page(rng, index, rel_path, page_paths, asset_paths, page_size, links):
+    """Create the Markdown for one page."""
+    lines = [f"# Page {index}", ""]
+    link_budget = links
+    while sum(len(line) for line in lines) < page_size:
+        kind = rng.randint(0, 9)
+        if kind == 0:
+            lines.append(f"## Section {len(lines)} {{: #section-{len(lines)} }}")
+        elif kind == 1:
+            lines.append("```python\n" + "\n".join(f"x{i} = {i}" for i in range(5)) + "\n```")
+        elif kind == 2:
+            lines.append("\n".join(f"- {' '.join(rng.choices(WORDS, k=6))}" for _ in range(4)))
+        else:
+            words = rng.choices(WORDS, k=60)
+            if link_budget > 0:
+                words.insert(rng.randint(0, len(words)), _link(rng, page_paths, asset_paths))
+                link_budget -= 1
+            lines.append(" ".join(words))
+        lines.append("")
+    return "\n".join(lines)
+
+
+def _link(rng, page_paths, asset_paths):
+    """Create a random link of one of the kinds McCole rewrites."""
+    kind = rng.randint(0, 4)
+    if kind == 0:
+        return f"[page](@root/{rng.choice(page_paths).as_posix()})"
+    if kind == 1:
+        return f"[cite](b:key{rng.randint(0, 99)})"
+    if kind == 2:
+        return f"[term](g:term{rng.randint(0, 99)})"
+    if kind == 3 and asset_paths:
+        return f"![image](@root/{rng.choice(asset_paths).as_posix()})"
+    return f"[anchor](@root/{rng.choice(page_paths).as_posix()}#section-2)"
+
+
+@click.command()
+@click.argument("root", type=click.Path())
+@click.option("--pages", type=int, default=DEFAULTS["pages"], help="Number of pages")
+@click.option("--depth", type=int, default=DEFAULTS["depth"], help="Maximum directory depth")
+@click.option("--page-size", type=int, default=DEFAULTS["page_size"], help="Approximate characters per page")
+@click.option("--links", type=int, default=DEFAULTS["links"], help="Links per page")
+@click.option("--assets", type=int, default=DEFAULTS["assets"], help="Number of assets")
+@click.option("--asset-size", type=int, default=DEFAULTS["asset_size"], help="Bytes per asset")
+@click.option("--seed", type=int, default=DEFAULTS["seed"], help="Random seed")
+def main(root, pages, depth, page_size, links, assets, asset_size, seed):
+    """Generate a synthetic site in ROOT."""
+    generate_site(root, pages, depth, page_size, links, assets, asset_size, seed)
+
+
+if __name__ == "__main__":
+    main()
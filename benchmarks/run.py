@@ -0,0 +1,181 @@
+"""Time the stages of a McCole build on a synthetic site.
+
+Usage: python -m benchmarks.run [options]
+
+Results are written as JSON. If a baseline file exists, each stage is
+compared against it and the run fails if any stage is slower by more than
+the tolerance. Use --save-baseline to record a new baseline on the machine
+that will run the comparison; with --ci, a missing baseline is an error
+rather than a skipped comparison.
+"""
+
+import click
+import json
+import markdown
+import platform
+from pathlib import Path
+import shutil
+import sys
+import tempfile
+import time
+import xml.etree.ElementTree as etree
+
+from mccole import transforms, util
+from mccole.build import Converter, _convert_markdowns, _copy_others, _set_up_jinja, build_site
+from mccole.extension import _apply_to_node
+
+from .generate import DEFAULTS, generate_site
+
+# Where results and the baseline are stored by default
+DEFAULT_RESULTS = Path("bench_output.json")
+DEFAULT_BASELINE = Path(__file__).parent / "baseline.json"
+
+# Allowed slowdown before a stage counts as a regression
+DEFAULT_TOLERANCE = 0.25
+
+
+def run_benchmarks(root, repeat):
+    """Time each stage on the site in root, returning {stage: best seconds}."""
+    config = util.read_config(root / "pyproject.toml", False, str(root / "src"), str(root / "dst"))
+    config["src"] = root / "src"
+    config["templates"] = root / "templates"
+    config["cache"] = root / "cache"
+    timings = {}
+
+    def _time(stage, func, setup=None):
+        best = None
+        for _ in range(repeat):
+            if setup is not None:
+                setup()
+            start = time.perf_counter()
+            func()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        timings[stage] = best
+
+    def _clean():
+        shutil.rmtree(config["dst"], ignore_errors=True)
+
+    markdowns, others = util.find_files(config)
+    jinja_env = _set_up_jinja(config)
+    sources = [(path.read_text(), path.relative_to(config["src"])) for path in markdowns]
+
+    _time("find_files", lambda: util.find_files(config))
+    _time("convert_markdowns", lambda: _convert_markdowns(config, jinja_env, markdowns), _clean)
+    _time("copy_others", lambda: _copy_others(config, others), _clean)
+    build_site(config, jinja_env)
+    _time("incremental_noop", lambda: build_site(config, jinja_env))
+
+    plain = markdown.Markdown(extensions=config["markdown_extensions"], extension_configs=config["markdown_options"])
+    _time("markdown", lambda: [plain.reset().convert(text) for text, rel_path in sources])
+
+    trees = _parse_trees(plain, sources)
+    for transform in transforms.get_transforms():
+        if transform.native:
+            _time(f"transform:{transform.name}", lambda t=transform: _apply_transform(trees, t))
+
+    converter = Converter(config, jinja_env)
+    contents = [(converter.convert(text, rel_path)[0], rel_path) for text, rel_path in sources]
+    template = jinja_env.get_template(util.DEFAULT_TEMPLATE_PAGE)
+    _time("render", lambda: [template.render(content=c, page_path=p, title="Title") for c, p in contents])
+
+    return timings
+
+
+def compare(timings, baseline, tolerance):
+    """Compare timings against a baseline, returning a list of (stage, ratio) regressions."""
+    regressions = []
+    for stage, seconds in sorted(timings.items()):
+        if stage in baseline and baseline[stage] > 0:
+            ratio = seconds / baseline[stage]
+            if ratio > 1 + tolerance:
+                regressions.append((stage, ratio))
+    return regressions
+
+
+def _apply_transform(trees, transform):
+    """Apply one transform to every parsed page."""
+    for root, rel_path in trees:
+        context = transforms.Context(rel_path)
+        handlers = {}
+        for node in root.iter():
+            _apply_to_node(node, context, [transform], handlers)
+        if transform.finish is not None:
+            transform.finish(context)
+
+
+def _parse_trees(md, sources):
+    """Parse each page's untransformed HTML into an ElementTree (skipping pages that are not well formed)."""
+    trees = []
+    for text, rel_path in sources:
+        try:
+            trees.append((etree.fromstring(f"<div>{md.reset().convert(text)}</div>"), rel_path))
+        except etree.ParseError:
+            pass
+    return trees
+
+
+@click.command()
+@click.option("--pages", type=int, default=DEFAULTS["pages"], help="Number of pages")
+@click.option("--depth", type=int, default=DEFAULTS["depth"], help="Maximum directory depth")
+@click.option("--page-size", type=int, default=DEFAULTS["page_size"], help="Approximate characters per page")
+@click.option("--links", type=int, default=DEFAULTS["links"], help="Links per page")
+@click.option("--assets", type=int, default=DEFAULTS["assets"], help="Number of assets")
+@click.option("--asset-size", type=int, default=DEFAULTS["asset_size"], help="Bytes per asset")
+@click.option("--seed", type=int, default=DEFAULTS["seed"], help="Random seed")
+@click.option("--repeat", type=int, default=3, help="Runs per stage (best time is kept)")
+@click.option("--output", type=click.Path(), default=str(DEFAULT_RESULTS), help="Results file")
+@click.option("--baseline", type=click.Path(), default=str(DEFAULT_BASELINE), help="Baseline file")
+@click.option("--tolerance", type=float, default=DEFAULT_TOLERANCE, help="Allowed slowdown (0.25 = 25%)")
+@click.option("--save-baseline", is_flag=True, help="Save these results as the new baseline")
+@click.option("--ci", is_flag=True, help="Fail if there is no baseline to compare against")
+def main(
+    pages, depth, page_size, links, assets, asset_size, seed, repeat, output, baseline, tolerance, save_baseline, ci
+):
+    """Benchmark McCole on a synthetic site."""
+    params = {
+        "pages": pages,
+        "depth": depth,
+        "page_size": page_size,
+        "links": links,
+        "assets": assets,
+        "asset_size": asset_size,
+        "seed": seed,
+    }
+    with tempfile.TemporaryDirectory() as tmp:
+        root = generate_site(Path(tmp), **params)
+        timings = run_benchmarks(root, repeat)
+
+    results = {
+        "params": params,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "timings": timings,
+    }
+    Path(output).write_text(json.dumps(results, indent=2, sort_keys=True))
+    for stage, seconds in sorted(timings.items()):
+        click.echo(f"{stage:32} {seconds * 1000:10.2f} ms")
+
+    baseline_path = Path(baseline)
+    if save_baseline:
+        baseline_path.write_text(json.dumps(results, indent=2, sort_keys=True))
+        click.echo(f"Saved baseline to {baseline_path}")
+        return
+    if not baseline_path.exists():
+        click.echo(f"No baseline at {baseline_path}; comparison skipped (use --save-baseline to record one)")
+        if ci:
+            sys.exit(1)
+        return
+
+    previous = json.loads(baseline_path.read_text())
+    if previous.get("params") != params:
+        click.echo("Warning: baseline was recorded with different parameters")
+    regressions = compare(timings, previous.get("timings", {}), tolerance)
+    for stage, ratio in regressions:
+        click.echo(f"Regression: {stage} is {ratio:.2f}x the baseline")
+    if regressions:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""Copying, linking, and cloning assets into the destination directory."""
+
+import hashlib
+import json
+import os
+from pathlib import Path, PurePosixPath
+import shutil
+
+from . import util
+
+try:
+    import fcntl
+except ImportError:
+    fcntl = None
+
+# Ways of putting an asset in the destination directory
+LINK_MODES = ("copy", "hardlink", "reflink")
+
+# Ways of deciding whether a destination file already matches its source
+COPY_CHECKS = ("stat", "hash")
+
+# Number of hash digits put in fingerprinted file names
+FINGERPRINT_LENGTH = 10
+
+# File (in the destination directory) mapping asset paths to fingerprinted names
+ASSET_MANIFEST_FILE = "asset-manifest.json"
+
+# ioctl request that clones a file on Linux filesystems that support it (btrfs, XFS)
+FICLONE = 0x40049409
+
+
+def sync_file(src, dst, link_mode="copy", check="stat", force=False):
+    """Make dst a copy of src unless it already matches, returning what was done.
+
+    An existing destination is removed first rather than overwritten,
+    since it may be a hard link to the source (or to another file).
+    """
+    src, dst = Path(src), Path(dst)
+    if (not force) and is_current(src, dst, check):
+        return "Unchanged"
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.unlink(missing_ok=True)
+    if link_mode == "hardlink":
+        try:
+            os.link(src, dst)
+            return "Linked"
+        except OSError:
+            pass
+    if link_mode == "reflink":
+        _clone(src, dst)
+    else:
+        shutil.copy2(src, dst)
+    return "Copied"
+
+
+def is_current(src, dst, check="stat"):
+    """Does the destination file already match the source?"""
+    try:
+        dst_stat = dst.stat()
+    except FileNotFoundError:
+        return False
+    src_stat = src.stat()
+    if (src_stat.st_dev, src_stat.st_ino) == (dst_stat.st_dev, dst_stat.st_ino):
+        return True
+    if src_stat.st_size != dst_stat.st_size:
+        return False
+    if check == "hash":
+        return util.hash_file(src) == util.hash_file(dst)
+    return src_stat.st_mtime_ns == dst_stat.st_mtime_ns
+
+
+def fingerprint_assets(config, files, manifest):
+    """Map the site-relative paths of assets matching the 'fingerprint' patterns to content-hashed names."""
+    file_re, _ = util.compile_skips(config.get("fingerprint", []))
+    if file_re is None:
+        return {}
+    src_path = Path(config["src"])
+    result = {}
+    for file_path in files:
+        rel_path = PurePosixPath(*Path(file_path).relative_to(src_path).parts)
+        if file_re.match(rel_path.as_posix()):
+            digest = manifest.source_hash(file_path, rel_path)
+            result[rel_path.as_posix()] = fingerprint_name(rel_path, digest).as_posix()
+    return result
+
+
+def fingerprint_name(rel_path, digest):
+    """Put the start of a content hash in a file name, e.g., style.css to style.3f9a1c07d2.css."""
+    rel_path = PurePosixPath(rel_path)
+    return rel_path.with_name(f"{rel_path.stem}.{digest[:FINGERPRINT_LENGTH]}{rel_path.suffix}")
+
+
+def hash_asset_map(asset_map):
+    """Hash an asset map so that pages are rebuilt when any fingerprinted name changes (None if empty)."""
+    if not asset_map:
+        return None
+    return hashlib.sha256(json.dumps(asset_map, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def read_asset_manifest(config):
+    """Read the asset map written by the last build (empty if there is none)."""
+    try:
+        with open(Path(config["dst"]) / ASSET_MANIFEST_FILE, "r") as reader:
+            return json.load(reader)
+    except (OSError, ValueError):
+        return {}
+
+
+def write_asset_manifest(config, asset_map):
+    """Write the asset map to the destination directory (or remove an old one if there is nothing to map)."""
+    path = Path(config["dst"]) / ASSET_MANIFEST_FILE
+    if not asset_map:
+        path.unlink(missing_ok=True)
+        return
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w") as writer:
+        json.dump(asset_map, writer, indent=1, sort_keys=True)
+
+
+def _clone(src, dst):
+    """Clone a file if the filesystem allows it, or copy it inside the kernel."""
+    with open(src, "rb") as reader, open(dst, "wb") as writer:
+        try:
+            if fcntl is None:
+                raise OSError("cloning not supported")
+            fcntl.ioctl(writer.fileno(), FICLONE, reader.fileno())
+        except OSError:
+            _copy_range(reader, writer)
+    shutil.copystat(src, dst)
+
+
+def _copy_range(reader, writer):
+    """Copy with copy_file_range where available, falling back to a normal copy."""
+    if hasattr(os, "copy_file_range"):
+        try:
+            while os.copy_file_range(reader.fileno(), writer.fileno(), util.HASH_BLOCK_SIZE * 64):
+                pass
+            return
+        except OSError:
+            reader.seek(0)
+            writer.seek(0)
+            writer.truncate()
+    shutil.copyfileobj(reader, writer)
@@ -1,156 +1,539 @@
 """Build functionality for McCole."""
 
-from bs4 import BeautifulSoup
 import click
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
 import jinja2
 import markdown
 from pathlib import Path
-import shutil
 
-from . import util
-
-# Markdown extensions to enable
-MARKDOWN_EXTENSIONS = [
-    "markdown.extensions.attr_list",
-    "markdown.extensions.def_list",
-    "markdown.extensions.fenced_code",
-    "markdown.extensions.md_in_html",
-    "markdown.extensions.tables",
-]
-
-
-def do_build(config, verbose, src, dst):
-    """Build the site."""
+from . import assets, transforms, util
+from .compress import COMPRESS_FORMATS, compress_outputs, sibling_path
+from .extension import TransformExtension
+from .highlight import HighlightCache, HighlightExtension, write_highlight_css
+from .manifest import load_manifest
+from .minify import minifier_for, minify_file, minify_html
+from .pagecache import open_page_cache, page_key, render_versions
+from .search import write_search_index
+from .shard import select_shard
+from .siteindex import SiteIndex, SiteView, build_index, split_front_matter
+from .profile import NULL_PROFILER, MemoryProfiler, Profiler, report, report_memory, write_trace
+
+# Per-process conversion state for parallel builds (filled in by _init_worker)
+_worker = {}
+
+# Pages waiting for or being converted per worker process
+PAGES_PER_WORKER = 2
+
+# Estimated bytes of memory needed while converting each byte of Markdown
+MEMORY_PER_SOURCE_BYTE = 10
+
+
+def do_build(
+    config,
+    verbose,
+    src,
+    dst,
+    force=False,
+    jobs=1,
+    profile=False,
+    trace=None,
+    top=util.DEFAULT_PROFILE_TOP,
+    precompile=False,
+    dry_run=False,
+    shard=None,
+    memprofile=False,
+):
+    """Build the site (or one shard of it), then remove outputs that no longer have sources."""
+    config_file = Path(config) if config else util.DEFAULT_CONFIG_PATH
+    config = util.read_config(config_file, verbose, src, dst)
+    config["force"] = force
+    config["jobs"] = jobs
+    config["shard"] = shard
+    if memprofile:
+        profiler = MemoryProfiler()
+        config["copy_workers"] = 1
+    else:
+        profiler = Profiler() if (profile or trace) else NULL_PROFILER
+    jinja_env = None
+    if precompile:
+        with profiler.stage("precompile"):
+            jinja_env = _set_up_jinja(config)
+            precompile_templates(config, jinja_env)
+    manifest = build_site(config, jinja_env, profiler=profiler)
+    with profiler.stage("prune"):
+        prune_outputs(config, manifest, dry_run)
+    if profile or trace:
+        report(profiler, top)
+    if memprofile:
+        profiler.stop()
+        report_memory(profiler, top)
+    if trace:
+        write_trace(profiler, trace)
+
+
+def do_render(config, verbose, src, dst, page):
+    """Convert a single page using the site index and asset names of the last build."""
     config_file = Path(config) if config else util.DEFAULT_CONFIG_PATH
     config = util.read_config(config_file, verbose, src, dst)
+    render_page(config, Converter(config), page, render_site_index(config))
+
+
+def render_site_index(config):
+    """Get the site index for rendering single pages (with the last build's fingerprinted asset names)."""
     markdowns, others = util.find_files(config)
-    jinja_env = _set_up_jinja(config)
-    _convert_markdowns(config, jinja_env, markdowns)
-    _copy_others(config, others)
+    return build_index(config, markdowns, assets=assets.read_asset_manifest(config))
+
+
+def render_page(config, converter, file_path, site=None):
+    """Convert one Markdown file in the source directory and write its page, returning its relative path."""
+    src_path = Path(config["src"]).resolve()
+    file_path = Path(file_path).resolve()
+    if (file_path.suffix.lower() != ".md") or (not file_path.is_relative_to(src_path)) or (not file_path.is_file()):
+        raise click.ClickException(f"'{file_path}' is not a Markdown file in {config['src']}")
+    rel_path = file_path.relative_to(src_path)
+    context = converter.convert_file(file_path, rel_path, site)
+    _report_page(config, rel_path, context.warnings)
+    return rel_path
+
+
+def build_site(config, jinja_env=None, converter=None, profiler=NULL_PROFILER):
+    """Build the site described by a configuration, returning the new manifest.
+
+    A sharded build fingerprints every asset and indexes every page, but
+    only converts and copies the files in its shard; the search index is
+    written when the shards are merged.
+    """
+    with profiler.stage("manifest"):
+        manifest = load_manifest(config)
+    with profiler.stage("find_files"):
+        markdowns, others = util.find_files(config, manifest.stats)
+    with profiler.stage("fingerprint"):
+        asset_map = assets.fingerprint_assets(config, others, manifest)
+        manifest.assets_hash = assets.hash_asset_map(asset_map)
+    with profiler.stage("site_index"):
+        site = build_index(config, markdowns, manifest.stats, asset_map)
+    markdowns, others = select_shard(config, markdowns), select_shard(config, others)
+    jinja_env = jinja_env or _set_up_jinja(config)
+    page_cache = open_page_cache(config)
+    try:
+        written = _convert_markdowns(config, jinja_env, markdowns, manifest, converter, profiler, page_cache, site)
+    finally:
+        if page_cache is not None:
+            with profiler.stage("page_cache"):
+                page_cache.prune()
+                page_cache.close()
+    written += _copy_others(config, others, manifest, profiler, asset_map)
+    written += write_highlight_css(config)
+    if config.get("shard") is None:
+        with profiler.stage("search"):
+            written += write_search_index(config, site)
+    outputs = {entry["output"]: None for entry in manifest.current.values()}
+    outputs.update((Path(output).as_posix(), None) for output in written)
+    compress_outputs(config, list(outputs), profiler)
+    with profiler.stage("manifest"):
+        manifest.save()
+        assets.write_asset_manifest(config, asset_map)
+    return manifest
+
+
+class Converter:
+    """Reusable engine that turns Markdown pages into finished HTML.
+
+    Holds one configured Markdown instance (reset between pages), the page
+    template, and the transform pipeline, so it can be created once and
+    shared by builds, checks, and long-running modes.
+    """
+
+    def __init__(self, config, jinja_env=None, profiler=NULL_PROFILER):
+        self.config = config
+        self.profiler = profiler
+        jinja_env = jinja_env if jinja_env is not None else _set_up_jinja(config)
+        self.template = jinja_env.get_template(util.DEFAULT_TEMPLATE_PAGE)
+        pipeline = transforms.get_transforms()
+        self.native = [t for t in pipeline if t.native]
+        self.fallback = [t for t in pipeline if not t.native]
+        self.md = _set_up_markdown(config, self.native)
+        self.md.mccole_profiler = profiler
+        self.minify = "html" in config.get("minify", [])
+
+    def _read(self, file_path, rel_path):
+        """Read a page's Markdown (passed straight on so no caller keeps it alive)."""
+        with self.profiler.stage("read", rel_path):
+            with open(file_path, "r") as md_file:
+                return md_file.read()
+
+    def _release(self):
+        """Drop the source lines and stashed HTML the Markdown engine keeps after a conversion."""
+        self.md.reset()
+        self.md.lines = []
+
+    def convert(self, md_content, rel_path, asset_map=None):
+        """Convert Markdown (after any front matter) to an HTML fragment, returning (content, context)."""
+        context = transforms.Context(rel_path, asset_map)
+        self.md.mccole_context = context
+        meta, md_content = split_front_matter(md_content)
+        with self.profiler.stage("markdown", rel_path):
+            content = self.md.reset().convert(md_content)
+        del md_content
+        self._release()
+        if meta.get("title"):
+            context.title = meta["title"]
+        if self.fallback:
+            with self.profiler.stage("soup", rel_path):
+                content = _apply_soup_transforms(content, context, self.fallback)
+        return content, context
+
+    def render(self, md_content, rel_path, site=None):
+        """Convert Markdown and fill in the page template, returning (html, context).
+
+        If a site index is given, the template can use it as `site`, and the
+        entries it uses are saved in `context.site_uses`. Templates can call
+        `asset(path)` to link to an asset by its (fingerprinted) name.
+        """
+        site = site if site is not None else SiteIndex([])
+        content, context = self.convert(md_content, rel_path, site.assets)
+        del md_content
+        view = SiteView(site, rel_path)
+
+        def asset(path):
+            return context.root_path + transforms.asset_path(path, site.assets)
+
+        with self.profiler.stage("render", rel_path):
+            final_html = self.template.render(
+                content=content, page_path=rel_path, title=context.title, site=view, asset=asset
+            )
+        del content
+        if self.minify:
+            with self.profiler.stage("minify", rel_path):
+                final_html = minify_html(final_html)
+        context.site_uses = view.uses
+        return final_html, context
+
+    def convert_file(self, file_path, rel_path, site=None):
+        """Convert one Markdown file and write its page, returning its context."""
+        dest_file = Path(self.config["dst"]) / rel_path.with_suffix(".html")
+        dest_file.parent.mkdir(parents=True, exist_ok=True)
+
+        final_html, context = self.render(self._read(file_path, rel_path), rel_path, site)
+
+        with self.profiler.stage("write", rel_path):
+            with open(dest_file, "w") as html_file:
+                html_file.write(final_html)
+        del final_html
+
+        return context
 
 
-def _copy_others(config, files):
-    """Copy non-Markdown files from source to destination."""
+def _copy_others(config, files, manifest=None, profiler=NULL_PROFILER, asset_map=None):
+    """Copy non-Markdown files from source to destination (fingerprinted assets under their new names).
+
+    Returns the outputs that were copied or linked.
+    """
     src_path = Path(config["src"])
     dst_path = Path(config["dst"])
+    asset_map = asset_map or {}
+    pending = []
     for file_path in files:
         file_path = Path(file_path)
         rel_path = file_path.relative_to(src_path)
-        dest_file = dst_path / rel_path
-        dest_file.parent.mkdir(parents=True, exist_ok=True)
-        shutil.copy2(file_path, dest_file)
-        if config["verbose"]:
-            click.echo(f"Copied {rel_path}")
+        output_path = Path(asset_map.get(rel_path.as_posix(), rel_path))
+        entry = manifest.asset_entry(file_path, rel_path, output_path) if manifest else None
+        if not _is_unchanged(config, manifest, entry):
+            pending.append((file_path, output_path))
+
+    link_mode = config.get("link_mode", util.DEFAULT_LINK_MODE)
+    check = config.get("copy_check", util.DEFAULT_COPY_CHECK)
+    minify = config.get("minify", [])
+
+    def _sync(item):
+        file_path, output_path = item
+        minifier = minifier_for(file_path, minify)
+        if minifier is not None:
+            with profiler.stage("minify", output_path):
+                return minify_file(file_path, dst_path / output_path, minifier)
+        with profiler.stage("copy", output_path):
+            return assets.sync_file(file_path, dst_path / output_path, link_mode, check, config.get("force", False))
+
+    workers = config.get("copy_workers", util.DEFAULT_COPY_WORKERS)
+    if (workers > 1) and (len(pending) > 1):
+        with ThreadPoolExecutor(workers) as pool:
+            actions = list(pool.map(_sync, pending))
+    else:
+        actions = [_sync(item) for item in pending]
 
+    if config["verbose"]:
+        for (file_path, output_path), action in zip(pending, actions):
+            click.echo(f"{action} {output_path}")
+    return [output_path for (file_path, output_path), action in zip(pending, actions) if action != "Unchanged"]
 
-def _convert_markdowns(config, jinja_env, files):
-    """Convert Markdown files to HTML."""
-    transformations = [
-        _do_root_path_replacement,
-        _do_bibliography_refs,
-        _do_glossary_refs,
-        _do_markdown_to_html_links,
-        _do_h1_to_title
-    ]
-    src_path = Path(config["src"])
-    dst_path = Path(config["dst"])
-    template = jinja_env.get_template(util.DEFAULT_TEMPLATE_PAGE)
 
+def _convert_markdowns(
+    config, jinja_env, files, manifest=None, converter=None, profiler=NULL_PROFILER, page_cache=None, site=None
+):
+    """Convert Markdown files to HTML, reusing pages from the page cache where possible.
+
+    Pages whose source, templates, configuration, and used site index
+    entries are all unchanged are skipped entirely. Returns the outputs
+    that were written.
+    """
+    src_path = Path(config["src"])
+    use_cache = (page_cache is not None) and (manifest is not None)
+    versions = render_versions(config) if use_cache else None
+    pages = []
+    keys = {}
     for file_path in files:
         file_path = Path(file_path)
         rel_path = file_path.relative_to(src_path)
-        dest_file = dst_path / rel_path.with_suffix(".html")
+        output_path = rel_path.with_suffix(".html")
+        entry = manifest.page_entry(file_path, rel_path, output_path, site) if manifest else None
+        if not _is_unchanged(config, manifest, entry):
+            pages.append((file_path, rel_path))
+            if use_cache:
+                keys[rel_path] = page_key(entry, versions)
+
+    written = [rel_path.with_suffix(".html") for file_path, rel_path in pages]
+    if use_cache and not config.get("force", False):
+        pages = [
+            (file_path, rel_path)
+            for file_path, rel_path in pages
+            if not _restore_page(config, page_cache, keys[rel_path], rel_path, manifest, site, profiler)
+        ]
+
+    jobs = config.get("jobs", 1)
+    if (jobs > 1) and (len(pages) > 1):
+        limit = config.get("memory_limit", util.DEFAULT_MEMORY_LIMIT) * util.MEGABYTE
+        initargs = (config, type(profiler) if profiler.enabled else None, site)
+        with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=initargs) as pool:
+            results = _bounded_map(
+                lambda page: pool.submit(_convert_in_worker, page),
+                pages,
+                _page_cost,
+                jobs * PAGES_PER_WORKER,
+                limit,
+            )
+            for (file_path, rel_path), (warnings, uses, events) in results:
+                profiler.add(events)
+                _finish_page(config, rel_path, warnings, uses, manifest, page_cache, keys.get(rel_path), site, profiler)
+    else:
+        converter = converter or Converter(config, jinja_env, profiler)
+        for file_path, rel_path in pages:
+            context = converter.convert_file(file_path, rel_path, site)
+            _finish_page(
+                config, rel_path, context.warnings, context.site_uses, manifest, page_cache, keys.get(rel_path), site, profiler
+            )
+    return written
+
+
+def _bounded_map(submit, items, cost, max_items, max_cost=0):
+    """Submit work for items lazily and yield (item, result) in order.
+
+    At most `max_items` items are in flight, and (if `max_cost` is not 0)
+    their total cost stays under `max_cost` except that one item is always
+    allowed. Waiting for the oldest result before submitting more keeps
+    both queues and memory bounded however many items there are.
+    """
+    window = deque()
+    in_flight = 0
+    items = iter(items)
+    item = next(items, None)
+    while (item is not None) or window:
+        while (item is not None) and (len(window) < max_items):
+            item_cost = cost(item)
+            if window and max_cost and (in_flight + item_cost > max_cost):
+                break
+            window.append((item, item_cost, submit(item)))
+            in_flight += item_cost
+            item = next(items, None)
+        done, done_cost, future = window.popleft()
+        in_flight -= done_cost
+        yield done, future.result()
+
+
+def _page_cost(page):
+    """Estimate the memory needed to convert a (file_path, rel_path) page."""
+    return Path(page[0]).stat().st_size * MEMORY_PER_SOURCE_BYTE
+
+
+def _finish_page(config, rel_path, warnings, uses, manifest, page_cache, key, site, profiler=NULL_PROFILER):
+    """Record the site index entries a rendered page used, save it in the page cache, and report it."""
+    digest = site.digest(uses) if site is not None else None
+    if manifest is not None:
+        manifest.record_uses(rel_path.as_posix(), uses, digest)
+    if (page_cache is not None) and (key is not None):
+        with profiler.stage("page_cache", rel_path):
+            final_html = (Path(config["dst"]) / rel_path.with_suffix(".html")).read_text()
+            page_cache.put(key, final_html, {"warnings": warnings, "uses": sorted(uses), "site": digest})
+    _report_page(config, rel_path, warnings)
+
+
+def _restore_page(config, page_cache, key, rel_path, manifest=None, site=None, profiler=NULL_PROFILER):
+    """Write a page from the page cache if it is there and up to date, returning True if it was."""
+    with profiler.stage("page_cache", rel_path):
+        cached = page_cache.get(key)
+        if cached is None:
+            return False
+        final_html, meta = cached
+        if (site is not None) and (site.digest(meta["uses"]) != meta["site"]):
+            return False
+        dest_file = Path(config["dst"]) / rel_path.with_suffix(".html")
         dest_file.parent.mkdir(parents=True, exist_ok=True)
-
-        with open(file_path, "r") as md_file:
-            md_content = md_file.read()
-
-        html_content = markdown.markdown(md_content, extensions=MARKDOWN_EXTENSIONS)
-        soup = BeautifulSoup(html_content, "html.parser")
-        for transform in transformations:
-            soup = transform(soup, rel_path)
-
-        content = str(soup)
-        # Pass the title_text from the first H1 heading if available
-        page_title = getattr(soup, 'custom_title_text', 'Untitled')
-        final_html = template.render(content=content, page_path=rel_path, title=page_title)
-
-        with open(dest_file, "w") as html_file:
-            html_file.write(final_html)
-
+        dest_file.write_text(final_html)
+    if manifest is not None:
+        manifest.record_uses(rel_path.as_posix(), meta["uses"], meta["site"])
+    for message in meta["warnings"]:
+        click.echo(message)
+    if config["verbose"]:
+        click.echo(f"Restored {rel_path} from cache")
+    return True
+
+
+def _apply_soup_transforms(content, context, fallback=None):
+    """Apply transforms that need BeautifulSoup (by default, all such registered transforms)."""
+    if fallback is None:
+        fallback = [t for t in transforms.get_transforms() if not t.native]
+    if not fallback:
+        return content
+    try:
+        from bs4 import BeautifulSoup
+    except ImportError:
+        names = ", ".join(t.name for t in fallback)
+        raise click.ClickException(f"Transforms {names} require BeautifulSoup (pip install beautifulsoup4)")
+    soup = BeautifulSoup(content, "html.parser")
+    del content
+    transforms.apply_transforms(soup, context, fallback)
+    result = str(soup)
+    soup.decompose()
+    return result
+
+
+def _report_page(config, rel_path, warnings):
+    """Report the warnings and progress for one converted page."""
+    for message in warnings:
+        click.echo(message)
+    if config["verbose"]:
+        click.echo(f"Converted {rel_path} to HTML")
+
+
+def _init_worker(config, profiler_class=None, site=None):
+    """Set up a converter (with a profiler of the given class, if any) and the site index once per worker process."""
+    _worker["converter"] = Converter(config, profiler=profiler_class() if profiler_class else NULL_PROFILER)
+    _worker["site"] = site
+
+
+def _convert_in_worker(page):
+    """Convert one (file_path, rel_path) page, returning its warnings, site index uses, and profiling events."""
+    file_path, rel_path = page
+    converter = _worker["converter"]
+    context = converter.convert_file(file_path, rel_path, _worker["site"])
+    return context.warnings, context.site_uses, converter.profiler.take()
+
+
+def prune_outputs(config, manifest, dry_run=False):
+    """Delete outputs of the previous build that this build did not produce, and directories left empty.
+
+    Files that no build produced (i.e., that are not in the manifest) are
+    never touched, except for compressed siblings of stale outputs. With
+    `dry_run`, what would be removed is listed instead, and the manifest
+    keeps the stale entries so that a later build can still remove them.
+    """
+    dst_path = Path(config["dst"])
+    stale = manifest.stale_outputs()
+    stale += [
+        sibling_path(output, fmt).as_posix()
+        for output in list(stale)
+        for fmt in COMPRESS_FORMATS
+        if sibling_path(dst_path / output, fmt).exists()
+    ]
+    directories = _emptied_directories(dst_path, stale)
+    if dry_run:
+        for output in stale:
+            click.echo(f"Would remove {output}")
+        for directory in directories:
+            click.echo(f"Would remove {directory}/")
+        if stale:
+            manifest.retain(stale)
+            manifest.save()
+        return stale
+
+    for output in stale:
+        (dst_path / output).unlink(missing_ok=True)
         if config["verbose"]:
-            click.echo(f"Converted {rel_path} to HTML")
-
-
-def _create_root_path(rel_path):
-    """Calculate the relative path to the root directory."""
-    depth = len(rel_path.parts) - 1
-    return "../" * depth if depth > 0 else "./"
+            click.echo(f"Removed {output}")
+    for directory in directories:
+        try:
+            (dst_path / directory).rmdir()
+        except OSError:
+            continue
+        if config["verbose"]:
+            click.echo(f"Removed {directory}/")
+    return stale
+
+
+def _emptied_directories(dst_path, removed):
+    """Find directories (deepest first) that would be empty once files are removed."""
+    gone = {dst_path / output for output in removed}
+    candidates = set()
+    for path in gone:
+        parent = path.parent
+        while parent != dst_path and dst_path in parent.parents:
+            candidates.add(parent)
+            parent = parent.parent
+    result = []
+    for directory in sorted(candidates, key=lambda d: (-len(d.parts), str(d))):
+        if directory.is_dir() and all(child in gone for child in directory.iterdir()):
+            gone.add(directory)
+            result.append(directory.relative_to(dst_path).as_posix())
+    return result
+
+
+def _is_unchanged(config, manifest, entry):
+    """Record a file in the manifest and report whether its output is up to date."""
+    if manifest is None:
+        return False
+    manifest.record(entry)
+    if not manifest.is_current(entry):
+        return False
+    if config["verbose"]:
+        click.echo(f"Unchanged {entry['key']}")
+    return True
 
 
 def _do_bibliography_refs(soup, rel_path):
     """Replace b:something links with relative references to bibliography.html#something."""
-    root_path = _create_root_path(rel_path)
-
-    for tag in soup.find_all("a", href=True):
-        if tag["href"].startswith("b:"):
-            ref_id = tag["href"][2:]
-            tag["href"] = f"{root_path}bibliography.html#{ref_id}"
-
-    return soup
+    return _apply_one(soup, rel_path, transforms.BIBLIOGRAPHY)
 
 
 def _do_glossary_refs(soup, rel_path):
     """Replace g:something links with relative references to glossary.html#something."""
-    root_path = _create_root_path(rel_path)
-
-    for tag in soup.find_all("a", href=True):
-        if tag["href"].startswith("g:"):
-            ref_id = tag["href"][2:]
-            tag["href"] = f"{root_path}glossary.html#{ref_id}"
-
-    return soup
+    return _apply_one(soup, rel_path, transforms.GLOSSARY)
 
 
 def _do_markdown_to_html_links(soup, rel_path):
     """Replace .md links with .html links."""
-    for tag in soup.find_all("a", href=True):
-        href = tag["href"]
-        if ".md" in href:
-            # Handle both simple .md and .md#anchor cases
-            if href.endswith(".md"):
-                tag["href"] = href[:-3] + ".html"
-            elif ".md#" in href:
-                # Replace .md with .html but preserve the anchor
-                tag["href"] = href.replace(".md#", ".html#")
-
-    return soup
+    return _apply_one(soup, rel_path, transforms.MARKDOWN_LINKS)
 
 
-def _do_root_path_replacement(soup, rel_path):
+def _do_root_path_replacement(soup, rel_path, asset_map=None):
     """Replace @root/ with the relative path to the root directory in HTML content."""
-    root_path = _create_root_path(rel_path)
-    attributes = ["href", "src"]
-    for attr in attributes:
-        for tag in soup.find_all(attrs={attr: True}):
-            if tag[attr].startswith("@root/"):
-                tag[attr] = tag[attr].replace("@root/", root_path)
-
-    return soup
+    return _apply_one(soup, rel_path, transforms.ROOT_PATH, transforms.Context(rel_path, asset_map))
 
 
 def _do_h1_to_title(soup, rel_path):
     """Copy the text from the unique H1 heading to the title element."""
-    h1_tags = soup.find_all("h1")
+    context = transforms.Context(rel_path)
+    _apply_one(soup, rel_path, transforms.H1_TITLE, context)
+    if not context.warnings:
+        setattr(soup, "custom_title_text", context.title)
+    return soup
 
-    if not h1_tags:
-        click.echo(f"Warning: No H1 heading found in {rel_path}")
-    elif len(h1_tags) > 1:
-        click.echo(f"Warning: Multiple H1 headings found in {rel_path}")
-    else:
-        title_text = h1_tags[0].get_text()
-        setattr(soup, "custom_title_text", title_text)
 
+def _apply_one(soup, rel_path, transform, context=None):
+    """Apply a single transform on its own, reporting any warnings immediately."""
+    context = context or transforms.Context(rel_path)
+    transforms.apply_transforms(soup, context, [transform])
+    for message in context.warnings:
+        click.echo(message)
     return soup
 
 
@@ -162,5 +545,52 @@ def _set_up_jinja(config):
 
     return jinja2.Environment(
         loader=jinja2.FileSystemLoader(templates_path),
-        autoescape=jinja2.select_autoescape(["html", "xml"])
+        autoescape=jinja2.select_autoescape(["html", "xml"]),
+        bytecode_cache=_bytecode_cache(config),
     )
+
+
+def precompile_templates(config, jinja_env):
+    """Compile every template so that later builds and workers load bytecode."""
+    names = jinja_env.list_templates()
+    for name in names:
+        try:
+            jinja_env.get_template(name)
+        except jinja2.TemplateSyntaxError as exc:
+            raise click.ClickException(f"Cannot compile template '{name}': {exc}")
+        if config.get("verbose", False):
+            click.echo(f"Compiled template {name}")
+    return names
+
+
+def _bytecode_cache(config):
+    """Create an on-disk template bytecode cache, or None if caching is off.
+
+    Jinja checks each entry against its template's source, and entries are
+    kept in a directory per Jinja version so that upgrades start afresh.
+    """
+    if not config.get("cache"):
+        return None
+    cache_path = Path(config["cache"]) / "jinja" / jinja2.__version__
+    try:
+        cache_path.mkdir(parents=True, exist_ok=True)
+    except OSError:
+        return None
+    return jinja2.FileSystemBytecodeCache(str(cache_path))
+
+
+def _set_up_markdown(config, native=None):
+    """Create a Markdown engine with the configured extensions and options."""
+    extensions = list(config.get("markdown_extensions", util.DEFAULT_MARKDOWN_EXTENSIONS))
+    extensions.append(TransformExtension(native))
+    if config.get("highlight"):
+        extensions.append(HighlightExtension(HighlightCache(config)))
+    options = config.get("markdown_options", {})
+    try:
+        return markdown.Markdown(
+            extensions=extensions,
+            extension_configs=options,
+        )
+    except (ImportError, AttributeError, TypeError, KeyError) as exc:
+        raise click.ClickException(f"Unable to set up Markdown extensions: {exc}")
+
@@ -1,12 +1,220 @@
 """Check functionality for McCole."""
 
-from pathlib import Path
+import click
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path, PurePosixPath
+import re
 
-from . import util
+from . import transforms, util
+from .manifest import hash_config
+from .siteindex import split_front_matter
 
+# File (in the cache directory) holding the index of pages between checks
+INDEX_FILE = "check-index.json"
 
-def do_check(config, verbose, src, dst):
+# Version of the index format (bump to discard old indexes)
+INDEX_VERSION = 1
+
+# Pages holding the targets of b: and g: references
+BIBLIOGRAPHY_PAGE = "bibliography.md"
+GLOSSARY_PAGE = "glossary.md"
+
+# Configuration keys that change the ids found in pages
+INDEX_KEYS = ("markdown_extensions", "markdown_options")
+
+# Inline code spans (links inside them are not links)
+CODE_SPAN_RE = re.compile(r"`+[^`]*`+")
+
+# Link targets in Markdown inline links, reference definitions, and HTML attributes
+REF_RES = (
+    re.compile(r"\]\(\s*<?([^\s)>]+)"),
+    re.compile(r"^\s*\[[^\]]+\]:\s*<?([^\s>]+)"),
+    re.compile(r"""\b(?:href|src)\s*=\s*["']([^"']*)["']"""),
+)
+
+# Anchors in rendered HTML
+ID_RE = re.compile(r"""\s(?:id|name)\s*=\s*(?:"([^"]*)"|'([^']*)')""")
+
+# Per-process Markdown engine for parallel indexing (filled in by _init_worker)
+_worker = {}
+
+
+def do_check(config, verbose, src, dst, jobs=1):
     """Check the site for errors."""
     config_file = Path(config) if config else util.DEFAULT_CONFIG_PATH
     config = util.read_config(config_file, verbose, src, dst)
+    config["jobs"] = jobs
+    report_problems(check_site(config))
+
+
+def check_site(config):
+    """Check every reference in the site, returning sorted (file, line, message) problems."""
     markdowns, others = util.find_files(config)
+    src_path = Path(config["src"])
+    files = {_posix(path.relative_to(src_path)) for path in others}
+    index = build_index(config, markdowns)
+    problems = []
+    for rel_path, entry in index.items():
+        for line, target in entry["refs"]:
+            message = check_ref(rel_path, target, index, files)
+            if message is not None:
+                problems.append((rel_path, line, message))
+    return sorted(problems)
+
+
+def report_problems(problems):
+    """Show problems found by a check, failing if there were any."""
+    for rel_path, line, message in problems:
+        click.echo(f"{rel_path}:{line}: {message}")
+    if problems:
+        raise click.ClickException(f"Found {len(problems)} problem(s)")
+
+
+def build_index(config, markdowns):
+    """Index the ids and references of every page, reusing unchanged entries."""
+    src_path = Path(config["src"])
+    previous = util.load_cache(config, INDEX_FILE, _index_version(config))
+    index = {}
+    pending = []
+    for file_path in markdowns:
+        file_path = Path(file_path)
+        rel_path = _posix(file_path.relative_to(src_path))
+        stat = file_path.stat()
+        old = previous.get(rel_path)
+        if old and (old["size"] == stat.st_size) and (old["mtime_ns"] == stat.st_mtime_ns):
+            index[rel_path] = old
+        else:
+            pending.append((str(file_path), rel_path))
+
+    jobs = config.get("jobs", 1)
+    if (jobs > 1) and (len(pending) > 1):
+        chunksize = max(1, len(pending) // (jobs * 4))
+        with ProcessPoolExecutor(jobs, initializer=_init_worker, initargs=(config,)) as pool:
+            entries = list(pool.map(_index_in_worker, pending, chunksize=chunksize))
+    else:
+        _init_worker(config)
+        entries = [_index_in_worker(page) for page in pending]
+
+    for (file_path, rel_path), entry in zip(pending, entries):
+        index[rel_path] = entry
+    if config.get("verbose", False):
+        click.echo(f"Indexed {len(pending)} page(s), reused {len(index) - len(pending)}")
+    util.save_cache(config, INDEX_FILE, _index_version(config), index)
+    return index
+
+
+def index_page(md, text, rel_path):
+    """Find the ids defined by a page and the references it makes (with line numbers)."""
+    md.reset()
+    md.mccole_context = transforms.Context(rel_path)
+    html = md.convert(split_front_matter(text)[1])
+    ids = sorted({next(v for v in match.groups() if v is not None) for match in ID_RE.finditer(html)})
+    return {"ids": ids, "refs": find_refs(text)}
+
+
+def find_refs(text):
+    """Find checkable link targets outside code, returning (line, target) pairs."""
+    refs = []
+    fence = None
+    for number, line in enumerate(text.splitlines(), start=1):
+        match = util.FENCE_RE.match(line)
+        if match:
+            if fence is None:
+                fence = match.group(1)
+            elif fence == match.group(1):
+                fence = None
+            continue
+        if fence is not None:
+            continue
+        line = CODE_SPAN_RE.sub("", line)
+        for pattern in REF_RES:
+            for match in pattern.finditer(line):
+                if _is_checked(match.group(1)):
+                    refs.append((number, match.group(1)))
+    return refs
+
+
+def check_ref(rel_path, target, index, files):
+    """Check one reference from a page, returning a message if it is broken."""
+    if target.startswith("b:"):
+        return _check_entry(target[2:], BIBLIOGRAPHY_PAGE, "bibliography", index)
+    if target.startswith("g:"):
+        return _check_entry(target[2:], GLOSSARY_PAGE, "glossary", index)
+
+    path, _, anchor = target.partition("#")
+    if path.startswith("@root/"):
+        path = path[len("@root/"):]
+        if (not path) or path.endswith("/"):
+            path += "index.html"
+    else:
+        path = str(PurePosixPath(rel_path).parent / path)
+    path = _normalize(path)
+    if path is None:
+        return f"Reference '{target}' is outside the site"
+
+    page = path[:-len(".html")] + ".md" if path.endswith(".html") else path
+    if page in index:
+        if anchor and (anchor not in index[page]["ids"]):
+            return f"Unknown anchor '#{anchor}' in reference '{target}'"
+        return None
+    if path in files:
+        return None
+    return f"Unknown page or file in reference '{target}'"
+
+
+def _check_entry(key, page, kind, index):
+    """Check that a bibliography or glossary key is defined."""
+    if page not in index:
+        return f"No {kind} page ({page}) for reference to '{key}'"
+    if key not in index[page]["ids"]:
+        return f"Unknown {kind} key '{key}'"
+    return None
+
+
+def _init_worker(config):
+    """Set up a Markdown engine once per worker process."""
+    from .build import _set_up_markdown
+
+    _worker["md"] = _set_up_markdown(config, native=[])
+
+
+def _index_in_worker(page):
+    """Index one (file_path, rel_path) page."""
+    file_path, rel_path = page
+    text = Path(file_path).read_text()
+    entry = index_page(_worker["md"], text, rel_path)
+    stat = Path(file_path).stat()
+    entry["size"] = stat.st_size
+    entry["mtime_ns"] = stat.st_mtime_ns
+    return entry
+
+
+def _is_checked(target):
+    """Is this a kind of reference that the checker validates?"""
+    if target.startswith(("b:", "g:", "@root/")):
+        return True
+    path = target.partition("#")[0]
+    return path.endswith(".md") and (":" not in path) and (not path.startswith("/"))
+
+
+def _normalize(path):
+    """Resolve '.' and '..' in a site-relative path, or None if it leaves the site."""
+    parts = []
+    for part in PurePosixPath(path).parts:
+        if part == "..":
+            if not parts:
+                return None
+            parts.pop()
+        elif part != ".":
+            parts.append(part)
+    return "/".join(parts)
+
+
+def _posix(path):
+    """Convert a relative path to the string used as an index key."""
+    return PurePosixPath(*Path(path).parts).as_posix()
+
+
+def _index_version(config):
+    """Identify the index format and the configuration that determines what the index contains."""
+    return [INDEX_VERSION, hash_config({key: config.get(key) for key in INDEX_KEYS})]
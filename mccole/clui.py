@@ -1,9 +1,25 @@
-"""Command-line interface for McCole."""
+"""Command-line interface for McCole.
+
+Command modules (and the Markdown, Jinja, and other libraries they use) are
+imported inside each command so that help and usage errors stay fast.
+"""
 
 import click
+from pathlib import Path
+
+from . import util
+
 
-from .build import do_build
-from .check import do_check
+def _shard_option(ctx, param, value):
+    """Parse the --shard option."""
+    if value is None:
+        return None
+    from .shard import parse_shard
+
+    try:
+        return parse_shard(value)
+    except ValueError as exc:
+        raise click.BadParameter(str(exc))
 
 
 @click.group()
@@ -17,9 +33,40 @@ def cli():
 @click.option("--verbose", is_flag=True, help="Enable verbose output")
 @click.option("--src", type=click.Path(), help="Source directory path")
 @click.option("--dst", type=click.Path(), help="Destination directory path")
-def build(config, verbose, src, dst):
+@click.option("--force", is_flag=True, help="Rebuild every file even if unchanged")
+@click.option("--jobs", type=click.IntRange(min=1), default=1, help="Number of worker processes")
+@click.option("--profile", is_flag=True, help="Report time spent in each stage and page")
+@click.option("--trace", type=click.Path(), help="Write a Chrome trace-event file (implies --profile)")
+@click.option("--top", type=click.IntRange(min=1), default=util.DEFAULT_PROFILE_TOP, help="Number of slowest pages to report")
+@click.option("--memprofile", is_flag=True, help="Report peak and retained memory for each stage and page")
+@click.option("--precompile", is_flag=True, help="Compile all templates into the cache before building")
+@click.option("--dry-run", is_flag=True, help="List stale outputs instead of removing them")
+@click.option("--shard", callback=_shard_option, help="Build only shard i of N (e.g., 2/4) for merging later")
+@click.option("--no-daemon", is_flag=True, help="Build in this process even if a daemon is running")
+def build(config, verbose, src, dst, force, jobs, profile, trace, top, memprofile, precompile, dry_run, shard, no_daemon):
     """Build the site."""
-    do_build(config, verbose, src, dst)
+    if not (no_daemon or profile or trace or memprofile or precompile):
+        from .daemon import run_in_daemon
+
+        args = {"force": force, "jobs": jobs, "dry_run": dry_run, "shard": shard}
+        if run_in_daemon(config, verbose, src, dst, "build", args):
+            return
+
+    from .build import do_build
+
+    do_build(config, verbose, src, dst, force, jobs, profile, trace, top, precompile, dry_run, shard, memprofile)
+
+
+@cli.command()
+@click.argument("shards", nargs=-1, required=True, type=click.Path(exists=True, file_okay=False))
+@click.option("--config", type=click.Path(exists=True), help="Path to config file")
+@click.option("--verbose", is_flag=True, help="Enable verbose output")
+@click.option("--dst", type=click.Path(), help="Destination directory path")
+def merge(shards, config, verbose, dst):
+    """Combine the outputs of sharded builds into the destination directory."""
+    from .shard import do_merge
+
+    do_merge(config, verbose, dst, shards)
 
 
 @cli.command()
@@ -27,9 +74,78 @@ def build(config, verbose, src, dst):
 @click.option("--verbose", is_flag=True, help="Enable verbose output")
 @click.option("--src", type=click.Path(), help="Source directory path")
 @click.option("--dst", type=click.Path(), help="Destination directory path")
-def check(config, verbose, src, dst):
+@click.option("--jobs", type=click.IntRange(min=1), default=1, help="Number of worker processes")
+@click.option("--no-daemon", is_flag=True, help="Check in this process even if a daemon is running")
+def check(config, verbose, src, dst, jobs, no_daemon):
     """Check the site for errors."""
-    do_check(config, verbose, src, dst)
+    if not no_daemon:
+        from .daemon import run_in_daemon
+
+        if run_in_daemon(config, verbose, src, dst, "check", {"jobs": jobs}):
+            return
+
+    from .check import do_check
+
+    do_check(config, verbose, src, dst, jobs)
+
+
+@cli.command()
+@click.argument("page", type=click.Path(exists=True, dir_okay=False))
+@click.option("--config", type=click.Path(exists=True), help="Path to config file")
+@click.option("--verbose", is_flag=True, help="Enable verbose output")
+@click.option("--src", type=click.Path(), help="Source directory path")
+@click.option("--dst", type=click.Path(), help="Destination directory path")
+@click.option("--no-daemon", is_flag=True, help="Render in this process even if a daemon is running")
+def render(page, config, verbose, src, dst, no_daemon):
+    """Convert a single Markdown page."""
+    if not no_daemon:
+        from .daemon import run_in_daemon
+
+        if run_in_daemon(config, verbose, src, dst, "render", {"page": str(Path(page).resolve())}):
+            return
+
+    from .build import do_render
+
+    do_render(config, verbose, src, dst, page)
+
+
+@cli.command("serve-daemon")
+@click.option("--config", type=click.Path(exists=True), help="Path to config file")
+@click.option("--verbose", is_flag=True, help="Enable verbose output")
+@click.option("--src", type=click.Path(), help="Source directory path")
+@click.option("--dst", type=click.Path(), help="Destination directory path")
+@click.option("--stop", is_flag=True, help="Stop the daemon serving this site")
+def serve_daemon(config, verbose, src, dst, stop):
+    """Keep the site loaded and serve build, check, and render requests over a Unix socket."""
+    from .daemon import do_serve_daemon
+
+    do_serve_daemon(config, verbose, src, dst, stop)
+
+
+@cli.command()
+@click.option("--config", type=click.Path(exists=True), help="Path to config file")
+@click.option("--verbose", is_flag=True, help="Enable verbose output")
+@click.option("--src", type=click.Path(), help="Source directory path")
+@click.option("--dst", type=click.Path(), help="Destination directory path")
+@click.option("--interval", type=float, default=util.DEFAULT_WATCH_INTERVAL, help="Seconds between checks for changes")
+@click.option("--debounce", type=float, default=util.DEFAULT_WATCH_DEBOUNCE, help="Seconds to wait for changes to settle")
+def watch(config, verbose, src, dst, interval, debounce):
+    """Rebuild the site when files change."""
+    from .watch import do_watch
+
+    do_watch(config, verbose, src, dst, interval, debounce)
+
+
+@cli.command()
+@click.argument("action", type=click.Choice(["stats", "prune"]))
+@click.option("--config", type=click.Path(exists=True), help="Path to config file")
+@click.option("--verbose", is_flag=True, help="Enable verbose output")
+@click.option("--limit", type=click.IntRange(min=0), help="Megabytes to keep when pruning (0 empties the cache)")
+def cache(action, config, verbose, limit):
+    """Show the size of the rendered-page cache or prune it."""
+    from .pagecache import do_cache
+
+    do_cache(config, verbose, action, limit)
 
 
 @cli.command()
@@ -0,0 +1,124 @@
+"""Precompressed siblings (.gz, .br, .zst) of built files."""
+
+import click
+from concurrent.futures import ThreadPoolExecutor
+import gzip
+import os
+from pathlib import Path
+
+from . import util
+from .profile import NULL_PROFILER
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+# Sibling suffixes that can be configured
+COMPRESS_FORMATS = ("gz", "br", "zst")
+
+# Python packages needed for each format
+COMPRESS_PACKAGES = {"gz": "gzip", "br": "brotli", "zst": "zstandard"}
+
+
+def available_formats():
+    """Formats whose compression library is installed."""
+    return [fmt for fmt in COMPRESS_FORMATS if _encoder(fmt) is not None]
+
+
+def compress_outputs(config, outputs, profiler=NULL_PROFILER):
+    """Write compressed siblings of built files, returning {output: [formats written]}."""
+    wanted = config.get("compress", [])
+    formats = [fmt for fmt in wanted if _encoder(fmt) is not None]
+    if config.get("verbose", False):
+        for fmt in wanted:
+            if fmt not in formats:
+                click.echo(f"Not writing .{fmt} files ({COMPRESS_PACKAGES[fmt]} is not installed)")
+    if not formats:
+        return {}
+
+    suffixes = set(config.get("compress_types", util.DEFAULT_COMPRESS_TYPES))
+    min_ratio = config.get("compress_min_ratio", util.DEFAULT_COMPRESS_MIN_RATIO)
+    force = config.get("force", False)
+    dst_path = Path(config["dst"])
+    outputs = [Path(output) for output in outputs if Path(output).suffix in suffixes]
+
+    def _compress(output):
+        with profiler.stage("compress", output):
+            return compress_file(dst_path / output, formats, min_ratio, force)
+
+    workers = config.get("copy_workers", util.DEFAULT_COPY_WORKERS)
+    if (workers > 1) and (len(outputs) > 1):
+        with ThreadPoolExecutor(workers) as pool:
+            written = list(pool.map(_compress, outputs))
+    else:
+        written = [_compress(output) for output in outputs]
+
+    result = {}
+    for output, formats_written in zip(outputs, written):
+        if formats_written:
+            result[output.as_posix()] = formats_written
+            if config.get("verbose", False):
+                click.echo(f"Compressed {output} ({', '.join(formats_written)})")
+    return result
+
+
+def compress_file(path, formats, min_ratio=util.DEFAULT_COMPRESS_MIN_RATIO, force=False):
+    """Write compressed siblings of one file unless they are up to date, returning the formats written.
+
+    A sibling is only kept if it is at least `min_ratio` smaller than the
+    original; otherwise any old sibling is removed so that servers send the
+    original instead. Siblings get the original's modification time, which
+    is how later builds tell that they are up to date; a sibling that is
+    up to date but no longer small enough for `min_ratio` is removed.
+    """
+    path = Path(path)
+    stat = path.stat()
+    data = None
+    written = []
+    for fmt in formats:
+        sibling = sibling_path(path, fmt)
+        if (not force) and _is_current(stat, sibling):
+            if sibling.stat().st_size > stat.st_size * (1 - min_ratio):
+                sibling.unlink()
+            continue
+        if data is None:
+            data = path.read_bytes()
+        compressed = _encoder(fmt)(data)
+        if len(compressed) > len(data) * (1 - min_ratio):
+            sibling.unlink(missing_ok=True)
+            continue
+        sibling.write_bytes(compressed)
+        os.utime(sibling, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+        written.append(fmt)
+    return written
+
+
+def sibling_path(path, fmt):
+    """The compressed sibling of a file, e.g., index.html.gz."""
+    path = Path(path)
+    return path.with_name(f"{path.name}.{fmt}")
+
+
+def _is_current(stat, sibling):
+    """Was this sibling written from the current version of its original?"""
+    try:
+        return sibling.stat().st_mtime_ns == stat.st_mtime_ns
+    except FileNotFoundError:
+        return False
+
+
+def _encoder(fmt):
+    """Get the function that compresses bytes in a format, or None if it is unavailable."""
+    if fmt == "gz":
+        return lambda data: gzip.compress(data, compresslevel=9, mtime=0)
+    if (fmt == "br") and (brotli is not None):
+        return lambda data: brotli.compress(data, quality=11)
+    if (fmt == "zst") and (zstandard is not None):
+        return lambda data: zstandard.ZstdCompressor(level=19).compress(data)
+    return None
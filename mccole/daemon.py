@@ -0,0 +1,260 @@
+"""Long-running build daemon and the client that sends it commands.
+
+The daemon keeps the configuration, Jinja environment, Markdown engine,
+and site index in memory and serves one site over a Unix socket in the
+cache directory. This module only imports what the client needs; the
+daemon imports the build machinery when it starts.
+"""
+
+import click
+from contextlib import redirect_stderr, redirect_stdout
+import io
+import json
+import os
+from pathlib import Path
+import socket
+
+from . import util
+
+# Socket file (inside the cache directory)
+DAEMON_SOCKET_FILE = "daemon.sock"
+
+# Protocol version (client and daemon must agree)
+DAEMON_PROTOCOL_VERSION = 1
+
+# Commands the daemon accepts
+DAEMON_COMMANDS = ("ping", "stop", "build", "check", "render")
+
+# Bytes read from the socket at a time
+DAEMON_BUFFER_SIZE = 64 * 1024
+
+# Seconds a client may take to send its request before it is dropped
+DAEMON_TIMEOUT = 5.0
+
+
+class Daemon:
+    """Warm state for one site and the handlers for client requests."""
+
+    def __init__(self, config_file, verbose, src, dst):
+        self.config_file = Path(config_file)
+        self.verbose = verbose
+        self.src = src
+        self.dst = dst
+        self.config = None
+        self.inputs = None
+        self.running = True
+        self._load()
+
+    def site(self):
+        """Identify the site being served (resolved configuration file, source, and destination)."""
+        return site_identity(self.config_file, self.config)
+
+    def handle(self, request):
+        """Run one request, returning the response to send back."""
+        command = request.get("command")
+        if (request.get("version") != DAEMON_PROTOCOL_VERSION) or (command not in DAEMON_COMMANDS):
+            return {"status": "rejected"}
+        if command == "ping":
+            return {"status": "done", "output": "", "error": None}
+        if request.get("site") != self.site():
+            return {"status": "mismatch"}
+        if command == "stop":
+            self.running = False
+            return {"status": "done", "output": "Stopped daemon\n", "error": None}
+
+        import jinja2
+
+        output = io.StringIO()
+        error = None
+        with redirect_stdout(output), redirect_stderr(output):
+            try:
+                self._refresh()
+                self.config["verbose"] = request.get("verbose", False)
+                getattr(self, f"_{command}")(**request.get("args", {}))
+            except click.ClickException as exc:
+                error = exc.format_message()
+            except (jinja2.TemplateError, OSError, ValueError) as exc:
+                error = str(exc)
+        return {"status": "done", "output": output.getvalue(), "error": error}
+
+    def serve(self, path):
+        """Accept requests on a Unix socket until a client asks the daemon to stop.
+
+        Requests are handled one at a time, so a client that stops sending
+        is dropped after DAEMON_TIMEOUT seconds rather than blocking others.
+        """
+        path = Path(path)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.unlink(missing_ok=True)
+        server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            server.bind(str(path))
+            os.chmod(path, 0o600)
+            server.listen()
+            while self.running:
+                connection, _ = server.accept()
+                connection.settimeout(DAEMON_TIMEOUT)
+                with connection:
+                    try:
+                        request = _receive(connection)
+                        _send(connection, self.handle(request))
+                    except (socket.timeout, OSError, ValueError):
+                        continue
+        finally:
+            server.close()
+            path.unlink(missing_ok=True)
+
+    def _build(self, force=False, jobs=1, dry_run=False, shard=None):
+        """Build the site (or one shard of it) with the warm converter, then remove stale outputs.
+
+        Files are rediscovered on every build because the daemon does not
+        watch the source directory. The warm index is dropped since the build
+        may have changed any page; the next render walks the source directory
+        again but reloads entries from the cached index file, only re-reading
+        pages whose size or mtime changed.
+        """
+        from .build import build_site, prune_outputs
+
+        self.config["force"] = force
+        self.config["jobs"] = jobs
+        self.config["shard"] = tuple(shard) if shard else None
+        try:
+            manifest = build_site(self.config, self.jinja_env, self.converter)
+        finally:
+            self.config["force"] = False
+            self.config["shard"] = None
+            self.index = None
+        prune_outputs(self.config, manifest, dry_run)
+
+    def _check(self, jobs=1):
+        """Check the site for errors."""
+        from .check import check_site, report_problems
+
+        self.config["jobs"] = jobs
+        report_problems(check_site(self.config))
+
+    def _render(self, page):
+        """Convert one page, updating its entry in the warm site index first."""
+        from .build import render_page, render_site_index
+        from .siteindex import SiteIndex, extract_metadata
+
+        if self.index is None:
+            self.index = render_site_index(self.config)
+        src_path = Path(self.config["src"]).resolve()
+        file_path = Path(page).resolve()
+        if file_path.is_file() and file_path.is_relative_to(src_path) and (file_path.suffix.lower() == ".md"):
+            entry = extract_metadata(file_path.read_text(), file_path.relative_to(src_path))
+            if self.index.entries.get(entry["key"]) != entry:
+                entries = {**self.index.entries, entry["key"]: entry}
+                self.index = SiteIndex(entries.values(), self.index.assets)
+        render_page(self.config, self.converter, file_path, self.index)
+
+    def _load(self):
+        """Read the configuration and set up the Jinja environment and converter."""
+        from .build import Converter, _set_up_jinja
+
+        self.config = util.read_config(self.config_file, self.verbose, self.src, self.dst)
+        self.jinja_env = _set_up_jinja(self.config)
+        self.converter = Converter(self.config, self.jinja_env)
+        self.index = None
+        self.inputs = util.snapshot_settings(self.config_file, self.config)
+
+    def _refresh(self):
+        """Reload whatever depends on the configuration file or templates if either has changed."""
+        from .build import Converter
+
+        inputs = util.snapshot_settings(self.config_file, self.config)
+        if inputs == self.inputs:
+            return
+        changed = {path for path in inputs.keys() | self.inputs.keys() if inputs.get(path) != self.inputs.get(path)}
+        if self.config_file in changed:
+            self._load()
+        else:
+            self.converter = Converter(self.config, self.jinja_env)
+            self.index = None
+            self.inputs = inputs
+
+
+def do_serve_daemon(config, verbose, src, dst, stop=False):
+    """Serve build, check, and render requests for a site until stopped."""
+    config_file = Path(config) if config else util.DEFAULT_CONFIG_PATH
+    if stop:
+        if not run_in_daemon(config, verbose, src, dst, "stop"):
+            raise click.ClickException("No daemon is running")
+        return
+    if run_in_daemon(config, verbose, src, dst, "ping"):
+        raise click.ClickException("A daemon is already running for this site")
+    daemon = Daemon(config_file, verbose, src, dst)
+    path = socket_path(daemon.config)
+    if path is None:
+        raise click.ClickException("The daemon needs a cache directory for its socket")
+    click.echo(f"Serving on {path} (press Ctrl-C to stop)")
+    try:
+        daemon.serve(path)
+    except KeyboardInterrupt:
+        click.echo("Stopped daemon")
+    except OSError as exc:
+        raise click.ClickException(f"Cannot serve on {path}: {exc}")
+
+
+def run_in_daemon(config, verbose, src, dst, command, args=None):
+    """Send a command to the daemon serving this site, returning False if there is none.
+
+    Output from the daemon is shown as if the command had run here, and
+    errors are raised the same way.
+    """
+    config_file = Path(config) if config else util.DEFAULT_CONFIG_PATH
+    if not config_file.exists():
+        return False
+    config = util.read_config(config_file, verbose, src, dst)
+    path = socket_path(config)
+    if (path is None) or (not path.exists()):
+        return False
+    request = {
+        "version": DAEMON_PROTOCOL_VERSION,
+        "command": command,
+        "site": site_identity(config_file, config),
+        "verbose": verbose,
+        "args": args or {},
+    }
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as client:
+            client.connect(str(path))
+            _send(client, request)
+            response = _receive(client)
+    except (OSError, ValueError):
+        return False
+    if response.get("status") != "done":
+        return False
+    click.echo(response["output"], nl=False)
+    if response["error"]:
+        raise click.ClickException(response["error"])
+    return True
+
+
+def site_identity(config_file, config):
+    """Resolved paths that a client and the daemon must agree on."""
+    return [str(Path(path).resolve()) for path in (config_file, config["src"], config["dst"])]
+
+
+def socket_path(config):
+    """Where the daemon for a site listens, or None if there is no cache directory."""
+    return Path(config["cache"]).resolve() / DAEMON_SOCKET_FILE if config.get("cache") else None
+
+
+def _send(connection, message):
+    """Send one newline-terminated JSON message."""
+    connection.sendall(json.dumps(message).encode("utf-8") + b"\n")
+
+
+def _receive(connection):
+    """Receive one newline-terminated JSON message."""
+    chunks = []
+    while True:
+        chunk = connection.recv(DAEMON_BUFFER_SIZE)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        if chunk.endswith(b"\n"):
+            break
+    return json.loads(b"".join(chunks).decode("utf-8"))
@@ -0,0 +1,147 @@
+"""Markdown extension that applies transforms inside the Markdown pipeline."""
+
+import html
+import re
+import xml.etree.ElementTree as etree
+
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+from markdown.util import HTML_PLACEHOLDER_RE
+
+from . import transforms
+from .profile import NULL_PROFILER
+
+# Run after inline processing (priority 20) and attribute lists (priority 8)
+TREEPROCESSOR_PRIORITY = 5
+
+# Start tags in raw HTML blocks
+START_TAG_RE = re.compile(r"<([a-zA-Z][\w:-]*)((?:\s+[^<>]*?)?)(\s*/?)>")
+
+# Attributes inside a start tag
+ATTR_RE = re.compile(r"""(\s+)([\w:.-]+)(?:(\s*=\s*)(?:"([^"]*)"|'([^']*)'|([^\s"'=<>`]+)))?""")
+
+# Tags inside raw HTML
+TAG_RE = re.compile(r"<[^>]*>")
+
+
+class TransformExtension(Extension):
+    """Apply native transforms to the ElementTree before serialization.
+
+    Set `md.mccole_context` to a `transforms.Context` before each conversion.
+    If `native` is not given, the registered native transforms are used.
+    """
+
+    def __init__(self, native=None, **kwargs):
+        super().__init__(**kwargs)
+        self.native = native
+
+    def extendMarkdown(self, md):
+        """Register the treeprocessor."""
+        processor = TransformTreeprocessor(md, self.native)
+        md.treeprocessors.register(processor, "mccole", TREEPROCESSOR_PRIORITY)
+
+
+class TransformTreeprocessor(Treeprocessor):
+    """Apply every native transform in one walk of the tree and raw HTML."""
+
+    def __init__(self, md, native=None):
+        super().__init__(md)
+        self.native = native
+
+    def run(self, root):
+        """Walk the tree and stashed raw HTML, then finish the transforms."""
+        context = self.md.mccole_context
+        profiler = getattr(self.md, "mccole_profiler", NULL_PROFILER)
+        with profiler.stage("transform", context.rel_path):
+            self._transform(root, context)
+
+    def _transform(self, root, context):
+        """Apply the native transforms to everything in one page."""
+        native = self.native
+        if native is None:
+            native = [t for t in transforms.get_transforms() if t.native]
+        handlers = {}
+        for node in root.iter():
+            if (node is not root) and isinstance(node.tag, str):
+                _apply_to_node(node, context, native, handlers)
+
+        stash = self.md.htmlStash.rawHtmlBlocks
+        for i, block in enumerate(stash):
+            if isinstance(block, str):
+                stash[i] = _rewrite_raw_html(block, context, native, handlers)
+            else:
+                for node in block.iter():
+                    if isinstance(node.tag, str):
+                        _apply_to_node(node, context, native, handlers)
+
+        for transform in native:
+            if transform.finish is not None:
+                transform.finish(context)
+        context.title = self._unstash(context.title)
+
+    def _unstash(self, text):
+        """Replace raw HTML placeholders and backslash escapes in text with what they stand for.
+
+        This runs before Markdown's own unescape treeprocessor, so escapes
+        like `\\*` are still placeholders here.
+        """
+        def _replace(match):
+            index = int(match.group(1))
+            block = self.md.htmlStash.rawHtmlBlocks[index]
+            return _strip_tags(block) if isinstance(block, str) else transforms.node_text(block)
+        text = HTML_PLACEHOLDER_RE.sub(_replace, text)
+        if "unescape" in self.md.treeprocessors:
+            text = self.md.treeprocessors["unescape"].unescape(text)
+        return text
+
+
+def _apply_to_node(node, context, native, handlers):
+    """Apply the transforms that handle this node's tag."""
+    if node.tag not in handlers:
+        handlers[node.tag] = [t for t in native if t.handles(node.tag)]
+    for transform in handlers[node.tag]:
+        if transform.rewrite is not None:
+            for attr in transform.attrs:
+                value = node.get(attr)
+                if value is not None:
+                    node.set(attr, transform.rewrite(value, context))
+        if transform.visit is not None:
+            transform.visit(node, context)
+
+
+def _rewrite_raw_html(block, context, native, handlers):
+    """Apply transforms to the start tags in a block of raw HTML."""
+    def _replace_tag(match):
+        tag = match.group(1).lower()
+        if tag not in handlers:
+            handlers[tag] = [t for t in native if t.handles(tag)]
+        if not handlers[tag]:
+            return match.group(0)
+
+        node = etree.Element(tag)
+        for attr in ATTR_RE.finditer(match.group(2)):
+            value = next((v for v in attr.group(4, 5, 6) if v is not None), "")
+            node.set(attr.group(2).lower(), html.unescape(value))
+        original = dict(node.attrib)
+        closing = block.find(f"</{tag}>", match.end())
+        if closing >= 0:
+            node.text = _strip_tags(block[match.end():closing])
+        _apply_to_node(node, context, native, handlers)
+        if node.attrib == original:
+            return match.group(0)
+
+        def _replace_attr(attr):
+            name = attr.group(2).lower()
+            if (attr.group(3) is None) or (node.get(name) == original.get(name)):
+                return attr.group(0)
+            return f'{attr.group(1)}{attr.group(2)}="{html.escape(node.get(name), quote=True)}"'
+
+        attrs = ATTR_RE.sub(_replace_attr, match.group(2))
+        return f"<{match.group(1)}{attrs}{match.group(3)}>"
+
+    return START_TAG_RE.sub(_replace_tag, block)
+
+
+def _strip_tags(text):
+    """Get the plain text of an HTML fragment."""
+    return html.unescape(TAG_RE.sub("", text))
@@ -0,0 +1,177 @@
+"""Cached server-side syntax highlighting of fenced code blocks (using Pygments)."""
+
+import click
+import hashlib
+import html
+import os
+from pathlib import Path
+import re
+
+from markdown.extensions import Extension
+from markdown.treeprocessors import Treeprocessor
+
+from .profile import NULL_PROFILER
+
+try:
+    import pygments
+    from pygments.formatters import HtmlFormatter
+    from pygments.lexers import get_lexer_by_name
+    from pygments.util import ClassNotFound
+except ImportError:
+    pygments = None
+
+# Stylesheet for the highlighting style (inside the destination directory)
+HIGHLIGHT_CSS_FILE = "mccole-highlight.css"
+
+# Directory (inside the cache directory) holding highlighted blocks
+HIGHLIGHT_CACHE_DIR = "highlight"
+
+# Cache format version (change to discard old entries)
+HIGHLIGHT_CACHE_VERSION = 1
+
+# CSS class of the <div> around highlighted blocks
+HIGHLIGHT_CLASS = "highlight"
+
+# Run after the transform treeprocessor (priority 5) so transforms never see the highlighting
+HIGHLIGHT_PRIORITY = 4
+
+# Fenced code blocks with a language, as stashed by the fenced_code extension
+CODE_BLOCK_RE = re.compile(r'<pre([^>]*)><code class="language-([^\s"]+)[^"]*"[^>]*>(.*)</code></pre>', re.DOTALL)
+
+
+class HighlightCache:
+    """Highlighted HTML for code blocks, stored on disk by content.
+
+    Each block is kept in its own file (named by a hash of its language,
+    code, style, and the highlighter's version), so worker processes can
+    share the cache without locking.
+    """
+
+    def __init__(self, config):
+        if pygments is None:
+            raise click.ClickException("Highlighting requires Pygments (pip install pygments)")
+        self.style = config["highlight"]
+        try:
+            self.formatter = HtmlFormatter(style=self.style, cssclass=HIGHLIGHT_CLASS, wrapcode=True)
+        except ClassNotFound:
+            raise click.ClickException(f"Unknown highlighting style '{self.style}'")
+        self.path = Path(config["cache"]) / HIGHLIGHT_CACHE_DIR if config.get("cache") else None
+        self.hits = 0
+        self.misses = 0
+
+    def highlight(self, language, code):
+        """Get the highlighted HTML for a block, or None if the language is unknown."""
+        key = highlight_key(language, code, self.style)
+        result = self._load(key)
+        if result is None:
+            self.misses += 1
+            result = self._highlight(language, code)
+            self._save(key, result)
+        else:
+            self.hits += 1
+        return result or None
+
+    def _highlight(self, language, code):
+        """Run the highlighter ("" if it does not know the language)."""
+        try:
+            lexer = get_lexer_by_name(language)
+        except ClassNotFound:
+            return ""
+        return pygments.highlight(code, lexer, self.formatter)
+
+    def _entry_path(self, key):
+        """Where a block is cached (spread over subdirectories to keep them small)."""
+        return self.path / key[:2] / f"{key}.html"
+
+    def _load(self, key):
+        """Read a cached block, or None if it is not there."""
+        if self.path is None:
+            return None
+        try:
+            return self._entry_path(key).read_text()
+        except OSError:
+            return None
+
+    def _save(self, key, result):
+        """Cache a block, writing it under a temporary name first so that readers never see part of it."""
+        if self.path is None:
+            return
+        path = self._entry_path(key)
+        temp = path.with_name(f"{path.name}.{os.getpid()}")
+        try:
+            path.parent.mkdir(parents=True, exist_ok=True)
+            temp.write_text(result)
+            os.replace(temp, path)
+        except OSError:
+            temp.unlink(missing_ok=True)
+
+
+class HighlightExtension(Extension):
+    """Replace fenced code blocks that name a language with highlighted HTML."""
+
+    def __init__(self, cache, **kwargs):
+        super().__init__(**kwargs)
+        self.cache = cache
+
+    def extendMarkdown(self, md):
+        """Register the treeprocessor."""
+        md.treeprocessors.register(HighlightTreeprocessor(md, self.cache), "mccole_highlight", HIGHLIGHT_PRIORITY)
+
+
+class HighlightTreeprocessor(Treeprocessor):
+    """Highlight the code blocks in the raw HTML stash."""
+
+    def __init__(self, md, cache):
+        super().__init__(md)
+        self.cache = cache
+
+    def run(self, root):
+        """Replace each stashed block that is a fenced code block with a language."""
+        stash = self.md.htmlStash.rawHtmlBlocks
+        blocks = [i for i, block in enumerate(stash) if isinstance(block, str) and block.startswith("<pre")]
+        if not blocks:
+            return
+        context = getattr(self.md, "mccole_context", None)
+        profiler = getattr(self.md, "mccole_profiler", NULL_PROFILER)
+        with profiler.stage("highlight", None if context is None else context.rel_path):
+            for i in blocks:
+                match = CODE_BLOCK_RE.fullmatch(stash[i])
+                if match is None:
+                    continue
+                attrs, language, code = match.groups()
+                result = self.cache.highlight(language, html.unescape(code))
+                if result is not None:
+                    stash[i] = result.replace("<pre>", f"<pre{attrs}>", 1) if attrs else result
+
+
+def highlight_key(language, code, style):
+    """Hash everything that determines how a block is highlighted."""
+    parts = [str(HIGHLIGHT_CACHE_VERSION), pygments.__version__, style, language, code]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def highlight_version(config):
+    """Describe the highlighter used for pages (None if highlighting is off or unavailable)."""
+    if (not config.get("highlight")) or (pygments is None):
+        return None
+    return f"pygments {pygments.__version__}"
+
+
+def write_highlight_css(config):
+    """Write the stylesheet for the highlighting style once per build, returning the outputs that changed.
+
+    If highlighting is turned off, an old stylesheet is removed.
+    """
+    path = Path(config["dst"]) / HIGHLIGHT_CSS_FILE
+    if not config.get("highlight"):
+        path.unlink(missing_ok=True)
+        return []
+    css = HighlightCache(config).formatter.get_style_defs(f".{HIGHLIGHT_CLASS}") + "\n"
+    try:
+        if path.read_text() == css:
+            return []
+    except OSError:
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(css)
+    return [Path(HIGHLIGHT_CSS_FILE)]
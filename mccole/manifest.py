@@ -0,0 +1,164 @@
+"""Build manifest used to skip unchanged files in incremental builds."""
+
+import hashlib
+import json
+from pathlib import Path
+
+from . import util
+
+# Manifest file name (inside the destination directory)
+MANIFEST_FILE = ".mccole-manifest.json"
+
+# Manifest format version (change to invalidate old manifests)
+MANIFEST_VERSION = 1
+
+# Configuration keys that do not affect the generated site
+RUNTIME_KEYS = {"verbose", "force", "jobs", "copy_workers", "cache", "page_cache_limit", "memory_limit", "shard"}
+
+# Configuration keys that change where outputs go or how they are compressed, indexed, or copied but not what they contain
+OUTPUT_KEYS = {"dst", "compress", "compress_types", "compress_min_ratio", "search", "link_mode", "copy_check"}
+
+# Entry fields that must match for an output to be up to date
+FINGERPRINT_KEYS = ("source", "template", "config", "site", "assets", "output")
+
+
+class Manifest:
+    """Inputs and output of every file produced by a build."""
+
+    def __init__(self, config, previous=None):
+        self.dst_path = Path(config["dst"])
+        self.previous = previous if previous is not None else {}
+        self.force = config.get("force", False)
+        self.current = {}
+        self.stats = {}
+        self.hashes = {}
+        self.config_hash = hash_config(config)
+        self.template_hash = hash_templates(config)
+        self.assets_hash = None
+
+    def asset_entry(self, file_path, rel_path, output_path=None):
+        """Fingerprint a file that is copied as-is (possibly to a different name)."""
+        return self._entry(file_path, rel_path, output_path or rel_path, None)
+
+    def page_entry(self, file_path, rel_path, output_path, site=None):
+        """Fingerprint a page that is rendered with the page template.
+
+        If a site index is given, the page also depends on the current values
+        of the index entries it used when it was last rendered.
+        """
+        entry = self._entry(file_path, rel_path, output_path, self.template_hash)
+        entry["assets"] = self.assets_hash
+        if site is not None:
+            uses = self.previous.get(entry["key"], {}).get("uses")
+            entry["uses"] = uses
+            entry["site"] = site.digest(uses)
+        return entry
+
+    def is_current(self, entry):
+        """Is the output described by this entry already up to date (never, if the build is forced)?"""
+        old = self.previous.get(entry["key"])
+        if self.force or (old is None):
+            return False
+        if any(old.get(key) != entry[key] for key in FINGERPRINT_KEYS):
+            return False
+        return (self.dst_path / entry["output"]).exists()
+
+    def record(self, entry):
+        """Remember an entry for the next build."""
+        self.current[entry["key"]] = {k: v for k, v in entry.items() if k != "key"}
+
+    def record_uses(self, key, uses, digest):
+        """Remember which site index entries a page used when it was rendered."""
+        if key in self.current:
+            self.current[key]["uses"] = sorted(uses)
+            self.current[key]["site"] = digest
+
+    def retain(self, outputs):
+        """Keep previous entries for these outputs (e.g., when they were not removed)."""
+        outputs = set(outputs)
+        for key, entry in self.previous.items():
+            if (entry["output"] in outputs) and (key not in self.current):
+                self.current[key] = entry
+
+    def stale_outputs(self):
+        """Outputs of the previous build that this build did not produce."""
+        current = {entry["output"] for entry in self.current.values()}
+        previous = {entry["output"] for entry in self.previous.values()}
+        return sorted(previous - current)
+
+    def save(self):
+        """Write the entries recorded during this build."""
+        self.dst_path.mkdir(parents=True, exist_ok=True)
+        data = {"version": MANIFEST_VERSION, "files": self.current}
+        with open(self.dst_path / MANIFEST_FILE, "w") as writer:
+            json.dump(data, writer, indent=1, sort_keys=True)
+
+    def source_hash(self, file_path, rel_path):
+        """Hash a source file, reusing the previous hash if the file looks untouched and the build is not forced."""
+        file_path = Path(file_path)
+        if file_path not in self.hashes:
+            stat = self.stats.get(file_path) or file_path.stat()
+            old = self.previous.get(Path(rel_path).as_posix(), {})
+            if (not self.force) and old.get("size") == stat.st_size and old.get("mtime") == stat.st_mtime_ns:
+                self.hashes[file_path] = old["source"]
+            else:
+                self.hashes[file_path] = util.hash_file(file_path)
+        return self.hashes[file_path]
+
+    def _entry(self, file_path, rel_path, output_path, template_hash):
+        """Build an entry for a file and its output."""
+        key = Path(rel_path).as_posix()
+        stat = self.stats.get(Path(file_path)) or Path(file_path).stat()
+        return {
+            "key": key,
+            "source": self.source_hash(file_path, rel_path),
+            "template": template_hash,
+            "config": self.config_hash,
+            "site": None,
+            "assets": None,
+            "output": Path(output_path).as_posix(),
+            "size": stat.st_size,
+            "mtime": stat.st_mtime_ns,
+        }
+
+
+def hash_config(config):
+    """Hash the configuration values that affect the contents of pages and copied files."""
+    relevant = {k: v for k, v in config.items() if (k not in RUNTIME_KEYS) and (k not in OUTPUT_KEYS)}
+    text = json.dumps(relevant, sort_keys=True, default=str)
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
+
+
+def hash_templates(config):
+    """Hash every file in the templates directory (pages may extend or include any of them)."""
+    templates_path = Path(config["templates"])
+    digest = hashlib.sha256()
+    if templates_path.exists():
+        for path in sorted(templates_path.rglob("*")):
+            if path.is_file():
+                digest.update(path.relative_to(templates_path).as_posix().encode("utf-8"))
+                digest.update(util.hash_file(path).encode("utf-8"))
+    return digest.hexdigest()
+
+
+def load_manifest(config):
+    """Load the previous build's manifest (empty if missing or unreadable).
+
+    Forced builds still load it so that outputs of deleted sources are pruned.
+    """
+    return Manifest(config, read_manifest_files(config["dst"]))
+
+
+def read_manifest_files(dst):
+    """Read the entries of the manifest in a destination directory (None if missing, unreadable, or out of date)."""
+    manifest_path = Path(dst) / MANIFEST_FILE
+    if not manifest_path.exists():
+        return None
+    try:
+        with open(manifest_path, "r") as reader:
+            data = json.load(reader)
+    except (OSError, ValueError):
+        return None
+    if data.get("version") != MANIFEST_VERSION:
+        return None
+    return data.get("files", {})
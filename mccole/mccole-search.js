@@ -0,0 +1,62 @@
+// Load the search index written by `mccole build` and query it.
+//
+//   const search = await mccoleSearch("../search-index.json");
+//   for (const result of search("static site")) { ... result.url, result.title, result.headings ... }
+//
+// Results contain every query word, best matches first. URLs are relative
+// to the page that loaded the index (like the index URL itself).
+
+async function mccoleSearch(indexUrl = "search-index.json", limit = 20) {
+  const response = await fetch(indexUrl);
+  const index = await response.json();
+  const base = indexUrl.slice(0, indexUrl.lastIndexOf("/") + 1);
+  const stopWords = new Set(
+    "an and are as at be but by for from has have in is it its not of on or that the this to was were will with".split(" ")
+  );
+
+  const tokenize = (text) =>
+    (text.toLowerCase().match(/[\p{L}\p{N}]+/gu) || []).filter((w) => w.length >= 2 && !stopWords.has(w));
+
+  const postings = (term) => {
+    const flat = index.terms[term] || [];
+    const result = new Map();
+    let page = 0;
+    for (let i = 0; i < flat.length; i += 2) {
+      page += flat[i];
+      result.set(page, flat[i + 1]);
+    }
+    return result;
+  };
+
+  return function search(query) {
+    const words = [...new Set(tokenize(query))];
+    if (words.length === 0) {
+      return [];
+    }
+    let scores = null;
+    for (const word of words) {
+      const found = postings(word);
+      const next = new Map();
+      for (const [page, weight] of found) {
+        if (scores === null || scores.has(page)) {
+          next.set(page, (scores === null ? 0 : scores.get(page)) + weight);
+        }
+      }
+      scores = next;
+    }
+    return [...scores.entries()]
+      .sort((a, b) => b[1] - a[1])
+      .slice(0, limit)
+      .map(([page, score]) => {
+        const [url, title, headings] = index.pages[page];
+        return {
+          url: base + url,
+          title,
+          score,
+          headings: headings
+            .filter(([anchor, text]) => tokenize(text).some((w) => words.includes(w)))
+            .map(([anchor, text]) => ({ url: `${base}${url}#${anchor}`, text })),
+        };
+      });
+  };
+}
@@ -0,0 +1,138 @@
+"""Conservative HTML, CSS, and JavaScript minification using regular expressions."""
+
+from pathlib import Path
+import re
+import shutil
+
+# Elements whose content must be left exactly as it is
+PRESERVE_RE = re.compile(r"<(pre|code|textarea|script|style)\b[^>]*>.*?</\1\s*>", re.DOTALL | re.IGNORECASE)
+
+# Comments (but not conditional comments)
+HTML_COMMENT_RE = re.compile(r"<!--(?!\[if).*?-->", re.DOTALL)
+
+# Runs of whitespace
+SPACE_RE = re.compile(r"\s+")
+
+# Runs of whitespace in text (i.e., not inside a tag)
+TEXT_SPACE_RE = re.compile(r"\s+(?=[^<>]*(?:<|$))")
+
+# Block-level tags around which whitespace is never significant
+BLOCK_TAGS = (
+    "html|head|body|title|meta|link|base|div|p|ul|ol|li|dl|dt|dd|h[1-6]|table|thead|tbody|tfoot|tr|td|th"
+    "|header|footer|main|nav|section|article|aside|figure|figcaption|blockquote|hr|br|form|fieldset"
+    "|legend|details|summary|!DOCTYPE"
+)
+BLOCK_SPACE_RE = re.compile(rf" ?(</?(?:{BLOCK_TAGS})\b[^>]*>) ?", re.IGNORECASE)
+
+# End tags that may be omitted when followed by these tags (HTML standard, "optional tags")
+OPTIONAL_END_RE = re.compile(
+    r"</(li|dt|dd|tr|td|th|option)>(?=<(?:li|dt|dd|tr|td|th|option)\b|</(?:ul|ol|dl|tr|tbody|thead|tfoot|table|select)>)",
+    re.IGNORECASE,
+)
+
+# End tags that may be omitted at the end of the document (innermost last)
+TRAILING_END_TAGS = ("</html>", "</body>")
+
+# Strings, comments, and whitespace in CSS
+CSS_TOKEN_RE = re.compile(r"""("(?:\\.|[^"\\])*"|'(?:\\.|[^'\\])*')|(/\*(?!!).*?\*/)|(\s+)""", re.DOTALL)
+
+# Spaces that are not needed around CSS punctuation
+CSS_SPACE_RE = re.compile(r"\s*([{};,>])\s*|(:)\s+")
+
+# Placeholder for preserved text (cannot appear in HTML)
+PLACEHOLDER = "\x00{}\x00"
+PLACEHOLDER_RE = re.compile(r"\x00(\d+)\x00")
+
+
+def minify_html(text):
+    """Remove comments, collapse whitespace, and drop optional end tags.
+
+    The contents of pre, code, and textarea elements (and of scripts and
+    styles) are left exactly as they are, as are the insides of tags.
+    """
+    preserved = []
+
+    def _keep(match):
+        preserved.append(match.group(0))
+        return PLACEHOLDER.format(len(preserved) - 1)
+
+    text = PRESERVE_RE.sub(_keep, text)
+    text = HTML_COMMENT_RE.sub("", text)
+    text = TEXT_SPACE_RE.sub(" ", text)
+    text = BLOCK_SPACE_RE.sub(r"\1", text)
+    text = OPTIONAL_END_RE.sub("", text)
+    text = text.rstrip()
+    for tag in TRAILING_END_TAGS:
+        if text[-len(tag):].lower() == tag:
+            text = text[:-len(tag)].rstrip()
+    return PLACEHOLDER_RE.sub(lambda match: preserved[int(match.group(1))], text).strip()
+
+
+def minify_css(text):
+    """Remove comments (except /*! ... */) and unneeded whitespace from CSS, leaving strings alone."""
+    parts = []
+    code = []
+    last = 0
+    for match in CSS_TOKEN_RE.finditer(text):
+        code.append(text[last:match.start()])
+        if match.group(1):
+            parts.append(_squeeze_css("".join(code)))
+            parts.append(match.group(1))
+            code = []
+        else:
+            code.append(" ")
+        last = match.end()
+    code.append(text[last:])
+    parts.append(_squeeze_css("".join(code)))
+    return "".join(parts).strip()
+
+
+def minify_js(text):
+    """Remove indentation, blank lines, and whole-line // comments from JavaScript.
+
+    Anything more needs a real parser, and files with template literals are
+    left alone because their lines may be significant.
+    """
+    if "`" in text:
+        return text
+    lines = []
+    for line in text.splitlines():
+        line = line.strip()
+        if line and not line.startswith("//"):
+            lines.append(line)
+    return "\n".join(lines) + "\n"
+
+
+def minifier_for(path, kinds):
+    """Get the function that minifies a copied file, or None if it should be copied as-is."""
+    name = Path(path).name
+    if (".min." in name) or not kinds:
+        return None
+    suffix = Path(path).suffix
+    if (suffix == ".css") and ("css" in kinds):
+        return minify_css
+    if (suffix == ".js") and ("js" in kinds):
+        return minify_js
+    return None
+
+
+def minify_file(src, dst, minifier):
+    """Write a minified copy of a file, returning what was done.
+
+    An existing destination is removed first, since it may be a hard link
+    to the source left by an earlier build.
+    """
+    dst = Path(dst)
+    text = minifier(Path(src).read_text())
+    dst.parent.mkdir(parents=True, exist_ok=True)
+    dst.unlink(missing_ok=True)
+    dst.write_text(text)
+    shutil.copystat(src, dst)
+    return "Minified"
+
+
+def _squeeze_css(code):
+    """Remove unneeded whitespace and semicolons from CSS that contains no strings or comments."""
+    code = SPACE_RE.sub(" ", code)
+    code = CSS_SPACE_RE.sub(lambda match: match.group(1) or match.group(2), code)
+    return code.replace(";}", "}")
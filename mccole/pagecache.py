@@ -0,0 +1,148 @@
+"""Content-addressed cache of rendered pages shared between builds."""
+
+import click
+import hashlib
+import importlib
+import json
+from pathlib import Path
+import sqlite3
+import time
+import zlib
+
+from . import transforms, util
+
+# Database file (inside the cache directory)
+PAGE_CACHE_FILE = "pages.sqlite"
+
+# Cache format version (change to discard old entries)
+PAGE_CACHE_VERSION = 2
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS pages (
+    key TEXT PRIMARY KEY,
+    html BLOB NOT NULL,
+    meta TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    used INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS pages_used ON pages (used);
+"""
+
+
+class PageCache:
+    """Rendered pages stored by fingerprint, evicted least-recently-used first.
+
+    Pages are compressed, and `limit` is the number of compressed bytes to keep.
+    """
+
+    def __init__(self, path, limit):
+        self.path = Path(path)
+        self.limit = limit
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self.connection = sqlite3.connect(self.path, timeout=30)
+        (version,) = self.connection.execute("PRAGMA user_version").fetchone()
+        if version != PAGE_CACHE_VERSION:
+            self.connection.execute("DROP TABLE IF EXISTS pages")
+            self.connection.execute(f"PRAGMA user_version = {PAGE_CACHE_VERSION}")
+        self.connection.executescript(SCHEMA)
+
+    def get(self, key):
+        """Return (html, metadata) for a key and mark it as used, or None."""
+        row = self.connection.execute("SELECT html, meta FROM pages WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        self.connection.execute("UPDATE pages SET used = ? WHERE key = ?", (time.time_ns(), key))
+        return zlib.decompress(row[0]).decode("utf-8"), json.loads(row[1])
+
+    def put(self, key, html, meta):
+        """Store a rendered page with JSON-serializable metadata (e.g., its warnings)."""
+        blob = zlib.compress(html.encode("utf-8"))
+        self.connection.execute(
+            "INSERT OR REPLACE INTO pages (key, html, meta, size, used) VALUES (?, ?, ?, ?, ?)",
+            (key, blob, json.dumps(meta), len(blob), time.time_ns()),
+        )
+
+    def stats(self):
+        """Count the entries and bytes in the cache."""
+        entries, size = self.connection.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM pages").fetchone()
+        return {"entries": entries, "size": size, "limit": self.limit}
+
+    def prune(self, limit=None):
+        """Evict least-recently-used entries until the cache fits its limit, returning how many went."""
+        limit = self.limit if limit is None else limit
+        total = self.stats()["size"]
+        if total <= limit:
+            return 0
+        doomed = []
+        for key, size in self.connection.execute("SELECT key, size FROM pages ORDER BY used"):
+            if total <= limit:
+                break
+            doomed.append((key,))
+            total -= size
+        self.connection.executemany("DELETE FROM pages WHERE key = ?", doomed)
+        return len(doomed)
+
+    def close(self):
+        """Save changes and close the database."""
+        self.connection.commit()
+        self.connection.close()
+
+
+def do_cache(config, verbose, action, limit=None):
+    """Report on or prune the page cache."""
+    config_file = Path(config) if config else util.DEFAULT_CONFIG_PATH
+    config = util.read_config(config_file, verbose, None, None)
+    if limit is not None:
+        config["page_cache_limit"] = limit
+    page_cache = open_page_cache(config, always=True)
+    if page_cache is None:
+        raise click.ClickException(f"Cannot open page cache in '{config['cache']}'")
+    try:
+        if action == "prune":
+            removed = page_cache.prune()
+            click.echo(f"Removed {removed} page(s)")
+        stats = page_cache.stats()
+        click.echo(f"Pages: {stats['entries']}")
+        click.echo(f"Size: {stats['size'] / util.MEGABYTE:.2f} MB of {stats['limit'] / util.MEGABYTE:.2f} MB")
+    finally:
+        page_cache.close()
+
+
+def open_page_cache(config, always=False):
+    """Open the configured page cache, or return None if it is turned off (unless `always`)."""
+    limit = config.get("page_cache_limit", util.DEFAULT_PAGE_CACHE_LIMIT)
+    if (not config.get("cache")) or ((limit <= 0) and not always):
+        return None
+    try:
+        return PageCache(Path(config["cache"]) / PAGE_CACHE_FILE, limit * util.MEGABYTE)
+    except (OSError, sqlite3.Error):
+        return None
+
+
+def page_key(entry, versions):
+    """Combine a page's manifest fingerprints and software versions into a cache key."""
+    parts = [entry["key"], entry["source"], entry["template"], entry["config"], str(entry.get("assets")), versions]
+    return hashlib.sha256("\0".join(parts).encode("utf-8")).hexdigest()
+
+
+def render_versions(config):
+    """Describe the versions of the software that affects rendering."""
+    import jinja2
+    import markdown
+
+    from .highlight import highlight_version
+
+    versions = {
+        "cache": PAGE_CACHE_VERSION,
+        "markdown": markdown.__version__,
+        "jinja2": jinja2.__version__,
+        "transforms": [t.name for t in transforms.get_transforms()],
+        "highlight": highlight_version(config),
+    }
+    for name in config.get("markdown_extensions", util.DEFAULT_MARKDOWN_EXTENSIONS):
+        try:
+            package = importlib.import_module(name.split(":")[0].split(".")[0])
+        except ImportError:
+            package = None
+        versions[name] = getattr(package, "__version__", None)
+    return json.dumps(versions, sort_keys=True)
@@ -0,0 +1,215 @@
+"""Timing and memory instrumentation for builds."""
+
+import click
+from contextlib import contextmanager, nullcontext
+import json
+import os
+import sys
+import threading
+import time
+import tracemalloc
+
+from . import util
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+# Stages that run inside other stages (not added again to page totals)
+NESTED_STAGES = {"transform": "markdown", "highlight": "markdown"}
+
+
+class NullProfiler:
+    """Profiler that records nothing, used when profiling is off."""
+
+    enabled = False
+
+    def __init__(self):
+        self._stage = nullcontext()
+
+    def stage(self, name, page=None):
+        """Time nothing."""
+        return self._stage
+
+    def take(self):
+        """There are never any events."""
+        return []
+
+    def add(self, events):
+        """Discard events."""
+        pass
+
+
+class Profiler:
+    """Record how long each stage takes for each page."""
+
+    enabled = True
+
+    def __init__(self):
+        self.events = []
+
+    @contextmanager
+    def stage(self, name, page=None):
+        """Time the body of a `with` statement as one stage."""
+        start = time.perf_counter_ns()
+        try:
+            yield
+        finally:
+            duration = time.perf_counter_ns() - start
+            page = None if page is None else str(page)
+            self.events.append((name, page, start, duration, os.getpid(), threading.get_ident()))
+
+    def take(self):
+        """Remove and return the events recorded so far (e.g., to send from a worker)."""
+        events, self.events = self.events, []
+        return events
+
+    def add(self, events):
+        """Add events recorded elsewhere (e.g., in a worker process)."""
+        self.events.extend(events)
+
+
+class MemoryProfiler(Profiler):
+    """Record how long each stage takes and how much memory it allocates (using tracemalloc).
+
+    Each sample is (stage, page, peak, retained, rss, pid): the most memory
+    the stage had allocated at once beyond what was in use when it started,
+    how much of that was still allocated when it finished, and the highest
+    resident set size of the process so far. A stage's peak includes the
+    peaks of the stages nested inside it. Stages must not run in several
+    threads at once, since tracemalloc measures the whole process.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.samples = []
+        self._stack = []
+        self._started = not tracemalloc.is_tracing()
+        if self._started:
+            tracemalloc.start()
+
+    def stop(self):
+        """Stop tracing allocations (if this profiler started it)."""
+        if self._started:
+            tracemalloc.stop()
+            self._started = False
+
+    @contextmanager
+    def stage(self, name, page=None):
+        """Time and measure the body of a `with` statement as one stage."""
+        current, peak = tracemalloc.get_traced_memory()
+        if self._stack:
+            self._stack[-1][1] = max(self._stack[-1][1], peak)
+        tracemalloc.reset_peak()
+        frame = [current, current]
+        self._stack.append(frame)
+        try:
+            with super().stage(name, page):
+                yield
+        finally:
+            end, peak = tracemalloc.get_traced_memory()
+            self._stack.pop()
+            peak = max(frame[1], peak)
+            if self._stack:
+                self._stack[-1][1] = max(self._stack[-1][1], peak)
+            tracemalloc.reset_peak()
+            page = None if page is None else str(page)
+            self.samples.append((name, page, peak - frame[0], end - frame[0], max_rss(), os.getpid()))
+
+    def take(self):
+        """Remove and return the (events, samples) recorded so far (e.g., to send from a worker)."""
+        samples, self.samples = self.samples, []
+        return super().take(), samples
+
+    def add(self, events):
+        """Add (events, samples) recorded elsewhere (e.g., in a worker process)."""
+        events, samples = events
+        super().add(events)
+        self.samples.extend(samples)
+
+
+# Shared profiler for code that is not being profiled
+NULL_PROFILER = NullProfiler()
+
+
+def max_rss():
+    """The highest resident set size of this process so far in bytes (0 if unknown)."""
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return usage if sys.platform == "darwin" else usage * 1024
+
+
+def report(profiler, top=util.DEFAULT_PROFILE_TOP):
+    """Print per-stage totals and the slowest pages and page stages."""
+    stages = {}
+    pages = {}
+    for name, page, start, duration, pid, tid in profiler.events:
+        count, total = stages.get(name, (0, 0))
+        stages[name] = (count + 1, total + duration)
+        if (page is not None) and (name not in NESTED_STAGES):
+            pages[page] = pages.get(page, 0) + duration
+
+    click.echo("Stage                 Count    Total (ms)   Mean (ms)")
+    for name, (count, total) in sorted(stages.items(), key=lambda item: -item[1][1]):
+        note = f" (part of {NESTED_STAGES[name]})" if name in NESTED_STAGES else ""
+        click.echo(f"{name:20} {count:6} {total / 1e6:13.2f} {total / count / 1e6:11.3f}{note}")
+
+    click.echo(f"Slowest {top} pages (ms):")
+    for page, total in sorted(pages.items(), key=lambda item: -item[1])[:top]:
+        click.echo(f"{total / 1e6:10.2f}  {page}")
+
+    click.echo(f"Slowest {top} page stages (ms):")
+    slowest = sorted((e for e in profiler.events if e[1] is not None), key=lambda e: -e[3])[:top]
+    for name, page, start, duration, pid, tid in slowest:
+        click.echo(f"{duration / 1e6:10.2f}  {name:12} {page}")
+
+
+def write_trace(profiler, path):
+    """Write events in Chrome trace-event format (load in chrome://tracing or Perfetto)."""
+    events = []
+    for name, page, start, duration, pid, tid in profiler.events:
+        event = {
+            "name": name,
+            "cat": "mccole",
+            "ph": "X",
+            "ts": start / 1000,
+            "dur": duration / 1000,
+            "pid": pid,
+            "tid": tid,
+        }
+        if page is not None:
+            event["args"] = {"page": page}
+        events.append(event)
+    with open(path, "w") as writer:
+        json.dump({"traceEvents": events, "displayTimeUnit": "ms"}, writer)
+
+
+def report_memory(profiler, top=util.DEFAULT_PROFILE_TOP):
+    """Print per-stage peak and retained allocation, the pages that allocated most, and peak RSS."""
+    stages = {}
+    pages = {}
+    rss = {}
+    for name, page, peak, retained, process_rss, pid in profiler.samples:
+        count, highest, total_peak, total_retained = stages.get(name, (0, 0, 0, 0))
+        stages[name] = (count + 1, max(highest, peak), total_peak + peak, total_retained + retained)
+        if (page is not None) and (peak > pages.get(page, (0, None))[0]):
+            pages[page] = (peak, name)
+        rss[pid] = max(rss.get(pid, 0), process_rss)
+
+    click.echo("Stage                 Count     Peak (MB)   Mean peak (MB)   Retained (MB)")
+    for name, (count, highest, total_peak, total_retained) in sorted(stages.items(), key=lambda item: -item[1][1]):
+        click.echo(
+            f"{name:20} {count:6} {highest / util.MEGABYTE:13.2f} {total_peak / count / util.MEGABYTE:16.3f}"
+            f" {total_retained / util.MEGABYTE:15.2f}"
+        )
+
+    click.echo(f"Largest {top} page allocations (MB):")
+    for page, (peak, name) in sorted(pages.items(), key=lambda item: -item[1][0])[:top]:
+        click.echo(f"{peak / util.MEGABYTE:10.2f}  {name:12} {page}")
+
+    main = rss.pop(os.getpid(), max_rss())
+    click.echo(f"Peak RSS: {main / util.MEGABYTE:.1f} MB")
+    if rss:
+        click.echo(f"Peak worker RSS: {max(rss.values()) / util.MEGABYTE:.1f} MB over {len(rss)} worker(s)")
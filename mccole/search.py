@@ -0,0 +1,209 @@
+"""Client-side search index built from rendered pages."""
+
+import click
+from html.parser import HTMLParser
+import json
+from pathlib import Path
+import re
+
+from . import util
+
+# Search index (inside the destination directory)
+SEARCH_INDEX_FILE = "search-index.json"
+
+# Script that loads and queries the search index (inside the destination directory)
+SEARCH_SCRIPT_FILE = "mccole-search.js"
+
+# File (in the cache directory) holding each page's postings between builds
+SEARCH_CACHE_FILE = "search-pages.json"
+
+# Version of the index and cache formats (bump to discard old postings)
+SEARCH_INDEX_VERSION = 1
+
+# Words (must match the tokenizer in the loader script)
+TOKEN_RE = re.compile(r"[^\W_]+")
+
+# Shortest word that is indexed
+MIN_TOKEN_LENGTH = 2
+
+# Words too common to be worth indexing
+STOP_WORDS = frozenset(
+    "an and are as at be but by for from has have in is it its not of on or that the this to was were will with".split()
+)
+
+# Extra weight of a word in a heading or in the page title
+HEADING_WEIGHT = 5
+TITLE_WEIGHT = 10
+
+# Elements whose text is not part of the page's content
+SKIP_TAGS = {"head", "script", "style", "template", "noscript", "nav", "header", "footer"}
+
+# Elements that give the page's outline
+HEADING_TAGS = {"h1", "h2", "h3", "h4", "h5", "h6"}
+
+
+def write_search_index(config, site):
+    """Write the search index and its loader script, returning the outputs that changed.
+
+    Each page's postings are reused from the previous build if its output
+    has the same size and modification time; only new or rebuilt pages are
+    tokenized again. If search is turned off, old index files are removed.
+    """
+    dst_path = Path(config["dst"])
+    if not config.get("search", False):
+        for name in (SEARCH_INDEX_FILE, SEARCH_SCRIPT_FILE):
+            (dst_path / name).unlink(missing_ok=True)
+        return []
+
+    previous = util.load_cache(config, SEARCH_CACHE_FILE, SEARCH_INDEX_VERSION)
+    postings = {}
+    pages = []
+    tokenized = 0
+    for entry in site.pages():
+        output = dst_path / entry["url"]
+        try:
+            stat = output.stat()
+        except FileNotFoundError:
+            continue
+        old = previous.get(entry["url"])
+        if old and (old["size"] == stat.st_size) and (old["mtime_ns"] == stat.st_mtime_ns):
+            page = old
+        else:
+            page = index_page(output.read_text())
+            page["size"] = stat.st_size
+            page["mtime_ns"] = stat.st_mtime_ns
+            tokenized += 1
+        postings[entry["url"]] = page
+        pages.append((entry, page))
+    util.save_cache(config, SEARCH_CACHE_FILE, SEARCH_INDEX_VERSION, postings)
+    if config.get("verbose", False):
+        click.echo(f"Indexed {tokenized} page(s) for search, reused {len(pages) - tokenized}")
+
+    written = []
+    text = json.dumps(encode_index(pages), separators=(",", ":"), ensure_ascii=False)
+    if _write_if_changed(dst_path / SEARCH_INDEX_FILE, text):
+        written.append(Path(SEARCH_INDEX_FILE))
+    script = (Path(__file__).parent / SEARCH_SCRIPT_FILE).read_text()
+    if _write_if_changed(dst_path / SEARCH_SCRIPT_FILE, script):
+        written.append(Path(SEARCH_SCRIPT_FILE))
+    return written
+
+
+def index_page(html):
+    """Get the weighted words and anchored headings of a rendered page.
+
+    Only text inside <main> is used if the page has one, and text in
+    navigation, headers, footers, and scripts is always skipped.
+    """
+    parser = _PageText(main_only="<main" in html)
+    parser.feed(html)
+    parser.close()
+    terms = {}
+    _count(terms, tokenize(" ".join(parser.text)), 1)
+    for anchor, text in parser.headings:
+        _count(terms, tokenize(text), HEADING_WEIGHT)
+    return {"headings": parser.headings, "terms": terms}
+
+
+def encode_index(pages):
+    """Combine (site index entry, page postings) pairs into the compact index.
+
+    Pages are numbered in reading order. Each term maps to a flat list of
+    (page number, weight) pairs in which page numbers are stored as the
+    difference from the previous one so that the lists stay small.
+    """
+    by_term = {}
+    for number, (entry, page) in enumerate(pages):
+        terms = dict(page["terms"])
+        _count(terms, tokenize(entry["title"]), TITLE_WEIGHT)
+        for term, weight in terms.items():
+            by_term.setdefault(term, []).append((number, weight))
+    encoded = {}
+    for term in sorted(by_term):
+        flat = []
+        last = 0
+        for number, weight in by_term[term]:
+            flat.extend((number - last, weight))
+            last = number
+        encoded[term] = flat
+    return {
+        "version": SEARCH_INDEX_VERSION,
+        "pages": [[entry["url"], entry["title"], page["headings"]] for entry, page in pages],
+        "terms": encoded,
+    }
+
+
+def decode_postings(flat):
+    """Turn a term's encoded postings back into {page number: weight}."""
+    result = {}
+    number = 0
+    for i in range(0, len(flat), 2):
+        number += flat[i]
+        result[number] = flat[i + 1]
+    return result
+
+
+def tokenize(text):
+    """Split text into lower-case words worth indexing."""
+    return [
+        word
+        for word in TOKEN_RE.findall(text.lower())
+        if (len(word) >= MIN_TOKEN_LENGTH) and (word not in STOP_WORDS)
+    ]
+
+
+class _PageText(HTMLParser):
+    """Collect the content text and the headings with ids of a page."""
+
+    def __init__(self, main_only):
+        super().__init__(convert_charrefs=True)
+        self.main_only = main_only
+        self.in_main = 0
+        self.skipping = 0
+        self.heading = None
+        self.text = []
+        self.headings = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIP_TAGS:
+            self.skipping += 1
+        elif tag == "main":
+            self.in_main += 1
+        elif (tag in HEADING_TAGS) and (self.heading is None):
+            self.heading = (dict(attrs).get("id"), [])
+
+    def handle_endtag(self, tag):
+        if tag in SKIP_TAGS:
+            self.skipping = max(0, self.skipping - 1)
+        elif tag == "main":
+            self.in_main = max(0, self.in_main - 1)
+        elif (tag in HEADING_TAGS) and (self.heading is not None):
+            anchor, parts = self.heading
+            if anchor:
+                self.headings.append([anchor, " ".join("".join(parts).split())])
+            self.heading = None
+
+    def handle_data(self, data):
+        if self.skipping or (self.main_only and not self.in_main):
+            return
+        self.text.append(data)
+        if self.heading is not None:
+            self.heading[1].append(data)
+
+
+def _count(terms, words, weight):
+    """Add the weight of each occurrence of each word."""
+    for word in words:
+        terms[word] = terms.get(word, 0) + weight
+
+
+def _write_if_changed(path, text):
+    """Write a file unless it already holds this text (so its mtime only changes when it does)."""
+    try:
+        if path.read_text() == text:
+            return False
+    except (OSError, ValueError):
+        pass
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(text)
+    return True
@@ -0,0 +1,110 @@
+"""Splitting builds into shards and merging their outputs."""
+
+import click
+import hashlib
+from pathlib import Path, PurePosixPath
+
+from . import assets, util
+from .manifest import MANIFEST_FILE, load_manifest, read_manifest_files
+
+
+def parse_shard(text):
+    """Turn 'i/N' (with shards numbered from 1) into (i, N)."""
+    index, _, count = text.partition("/")
+    try:
+        index, count = int(index), int(count)
+    except ValueError:
+        raise ValueError(f"Shard '{text}' must look like i/N")
+    if not (1 <= index <= count):
+        raise ValueError(f"Shard '{text}' must have 1 <= i <= N")
+    return index, count
+
+
+def shard_of(rel_path, count):
+    """Which shard (from 1 to count) a source file belongs to.
+
+    This depends only on the file's relative path, so every runner agrees
+    without coordination and files stay in the same shard between builds.
+    """
+    key = PurePosixPath(*Path(rel_path).parts).as_posix().encode("utf-8")
+    return int.from_bytes(hashlib.sha256(key).digest()[:8], "big") % count + 1
+
+
+def select_shard(config, files):
+    """Keep the files that belong to the configured shard (all of them if the build is not sharded)."""
+    shard = config.get("shard")
+    if shard is None:
+        return files
+    index, count = shard
+    src_path = Path(config["src"])
+    return [path for path in files if shard_of(Path(path).relative_to(src_path), count) == index]
+
+
+def do_merge(config, verbose, dst, shards):
+    """Merge the outputs of sharded builds into one destination directory."""
+    from .build import prune_outputs, render_site_index
+    from .compress import compress_outputs
+    from .search import write_search_index
+
+    config_file = Path(config) if config else util.DEFAULT_CONFIG_PATH
+    config = util.read_config(config_file, verbose, None, dst)
+    manifest, collisions = merge_shards(config, shards)
+    manifest.save()
+    prune_outputs(config, manifest)
+    if config.get("search", False):
+        compress_outputs(config, write_search_index(config, render_site_index(config)))
+    for message in collisions:
+        click.echo(message, err=True)
+    if collisions:
+        raise click.ClickException(f"Found {len(collisions)} collision(s)")
+
+
+def merge_shards(config, shards):
+    """Copy every shard's files into the destination and combine their manifests.
+
+    The first shard to produce a file wins. Returns the combined manifest
+    and messages describing collisions: files that more than one shard
+    produced with different contents, and sources that more than one shard
+    built differently.
+    """
+    dst_path = Path(config["dst"])
+    manifest = load_manifest(config)
+    collisions = []
+    built_by = {}
+    sources = {}
+    for shard_dir in shards:
+        shard_dir = Path(shard_dir)
+        files = read_manifest_files(shard_dir)
+        if files is None:
+            raise click.ClickException(f"No build manifest in shard '{shard_dir}'")
+        for key, entry in sorted(files.items()):
+            if key not in built_by:
+                built_by[key] = shard_dir
+                manifest.record({"key": key, **entry})
+            elif manifest.current[key] != entry:
+                collisions.append(f"Collision: {key} was built differently by {built_by[key]} and {shard_dir}")
+        for path in sorted(shard_dir.rglob("*")):
+            if (not path.is_file()) or (path.parent == shard_dir and path.name == MANIFEST_FILE):
+                continue
+            rel_path = path.relative_to(shard_dir).as_posix()
+            if rel_path not in sources:
+                sources[rel_path] = (shard_dir, path)
+            elif not _same_contents(sources[rel_path][1], path):
+                collisions.append(f"Collision: {rel_path} differs between {sources[rel_path][0]} and {shard_dir}")
+
+    link_mode = config.get("link_mode", util.DEFAULT_LINK_MODE)
+    check = config.get("copy_check", util.DEFAULT_COPY_CHECK)
+    for rel_path, (shard_dir, path) in sources.items():
+        action = assets.sync_file(path, dst_path / rel_path, link_mode, check, config.get("force", False))
+        if config["verbose"]:
+            click.echo(f"{action} {rel_path}")
+    if config["verbose"]:
+        click.echo(f"Merged {len(sources)} file(s) from {len(shards)} shard(s)")
+    return manifest, collisions
+
+
+def _same_contents(left, right):
+    """Do two files hold the same bytes?"""
+    if left.stat().st_size != right.stat().st_size:
+        return False
+    return util.hash_file(left) == util.hash_file(right)
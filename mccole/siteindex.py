@@ -0,0 +1,256 @@
+"""Site metadata index built before pages are rendered and shared with templates."""
+
+import hashlib
+import html
+import json
+from pathlib import Path, PurePosixPath
+import re
+
+from . import transforms, util
+
+# File (in the cache directory) holding the index between builds
+SITE_INDEX_FILE = "site-index.json"
+
+# Version of the index format (bump to discard old indexes)
+SITE_INDEX_VERSION = 2
+
+# Front matter delimiter (first line of the file and end of the block)
+FRONT_MATTER_FENCE = "---"
+
+# Lines inside front matter
+FRONT_MATTER_RE = re.compile(r"^([A-Za-z_][\w-]*)\s*:\s*(.*?)\s*$")
+
+# ATX headings, with optional closing hashes and attribute list
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.*?)(?:\s+#+)?(?:\s*\{:?[^}]*\})?\s*$")
+
+# Underlines of setext headings ("=" for level 1, "-" for level 2)
+SETEXT_RE = re.compile(r"^([=-])[=-]*[ ]*$")
+
+# Lines that are indented code rather than text
+INDENTED_RE = re.compile(r"^(?: {4}|\t)")
+
+# Code spans (whose text is taken literally)
+CODE_SPAN_RE = re.compile(r"(?<!\\)(`+)(.+?)\1")
+
+# Backslash escapes of ASCII punctuation
+ESCAPE_RE = re.compile(r"\\([!-/:-@\[-`{-~])")
+
+# Dependency recorded when a template uses the whole index
+ALL_PAGES = "*"
+
+
+def split_front_matter(text):
+    """Split a page into (front matter dictionary, Markdown body)."""
+    lines = text.split("\n")
+    if (not lines) or (lines[0].rstrip() != FRONT_MATTER_FENCE):
+        return {}, text
+    meta = {}
+    for i, line in enumerate(lines[1:], start=1):
+        if line.rstrip() == FRONT_MATTER_FENCE:
+            return meta, "\n".join(lines[i + 1:])
+        match = FRONT_MATTER_RE.match(line)
+        if match is None:
+            return {}, text
+        meta[match.group(1)] = _unquote(match.group(2))
+    return {}, text
+
+
+def extract_metadata(text, rel_path):
+    """Get a page's index entry (title, front matter, and headings) without rendering it."""
+    meta, body = split_front_matter(text)
+    headings = []
+    fence = None
+    previous = ""
+    for line in body.split("\n"):
+        match = util.FENCE_RE.match(line)
+        if match:
+            if fence is None:
+                fence = match.group(1)
+            elif fence == match.group(1):
+                fence = None
+            previous = ""
+            continue
+        if fence is not None:
+            continue
+        match = HEADING_RE.match(line)
+        if match:
+            headings.append({"level": len(match.group(1)), "text": _plain_text(match.group(2))})
+            previous = ""
+            continue
+        match = SETEXT_RE.match(line)
+        if match and previous.strip() and not INDENTED_RE.match(previous):
+            headings.append({"level": 1 if match.group(1) == "=" else 2, "text": _plain_text(previous.strip())})
+            previous = ""
+            continue
+        previous = line
+    h1s = [h["text"] for h in headings if h["level"] == 1]
+    title = meta.get("title") or (h1s[0] if len(h1s) == 1 else transforms.DEFAULT_TITLE)
+    key = PurePosixPath(*Path(rel_path).parts)
+    return {
+        "key": key.as_posix(),
+        "url": key.with_suffix(".html").as_posix(),
+        "title": title,
+        "meta": meta,
+        "headings": headings,
+    }
+
+
+class SiteIndex:
+    """Metadata for every page, in reading order (each directory's index page first).
+
+    `assets` maps the site-relative paths of fingerprinted assets to their
+    fingerprinted names.
+    """
+
+    def __init__(self, entries, assets=None):
+        self.entries = {entry["key"]: entry for entry in entries}
+        self.assets = assets if assets is not None else {}
+        self.order = sorted(self.entries, key=_reading_order)
+        self.position = {key: i for i, key in enumerate(self.order)}
+        self._all_pages = None
+
+    def pages(self):
+        """Entries for all pages in reading order."""
+        return [self.entries[key] for key in self.order]
+
+    def neighbor(self, key, step):
+        """The key of the page before (-1) or after (+1) a page, or None."""
+        i = self.position.get(key)
+        if i is None or not (0 <= i + step < len(self.order)):
+            return None
+        return self.order[i + step]
+
+    def digest(self, uses):
+        """Hash the current values of the index entries a page used (None if unknown)."""
+        if uses is None:
+            return None
+        digest = hashlib.sha256()
+        for use in sorted(uses):
+            digest.update(use.encode("utf-8"))
+            digest.update(json.dumps(self._value(use), sort_keys=True).encode("utf-8"))
+        return digest.hexdigest()
+
+    def _value(self, use):
+        """Look up what a recorded use depends on."""
+        if use == ALL_PAGES:
+            if self._all_pages is None:
+                self._all_pages = json.dumps(self.pages(), sort_keys=True)
+            return self._all_pages
+        kind, _, key = use.partition(":")
+        if kind == "page":
+            return self.entries.get(key)
+        if kind == "next":
+            return self.neighbor(key, 1)
+        if kind == "previous":
+            return self.neighbor(key, -1)
+        return None
+
+
+class SiteView:
+    """The index as seen by one page's template, recording which entries it uses."""
+
+    def __init__(self, index, rel_path):
+        self._index = index
+        self._key = PurePosixPath(*Path(rel_path).parts).as_posix()
+        self._root = transforms.root_path(rel_path)
+        self.uses = set()
+
+    @property
+    def current(self):
+        """The entry for the page being rendered."""
+        return self.page(self._key)
+
+    @property
+    def pages(self):
+        """All entries in reading order."""
+        self.uses.add(ALL_PAGES)
+        return self._index.pages()
+
+    def page(self, key):
+        """The entry for a page (by source path such as 'docs/intro.md'), or None."""
+        self.uses.add(f"page:{key}")
+        return self._index.entries.get(key)
+
+    def next(self):
+        """The entry for the next page in reading order, or None."""
+        self.uses.add(f"next:{self._key}")
+        key = self._index.neighbor(self._key, 1)
+        return None if key is None else self.page(key)
+
+    def previous(self):
+        """The entry for the previous page in reading order, or None."""
+        self.uses.add(f"previous:{self._key}")
+        key = self._index.neighbor(self._key, -1)
+        return None if key is None else self.page(key)
+
+    def breadcrumbs(self):
+        """Entries for the index pages of the directories above this page (outermost first)."""
+        parts = PurePosixPath(self._key).parent.parts
+        crumbs = []
+        for i in range(len(parts) + 1):
+            key = PurePosixPath(*parts[:i], "index.md").as_posix()
+            if key == self._key:
+                continue
+            entry = self.page(key)
+            if entry is not None:
+                crumbs.append(entry)
+        return crumbs
+
+    def url(self, entry):
+        """The link from this page to another page's entry."""
+        return self._root + entry["url"]
+
+
+def build_index(config, markdowns, stats=None, assets=None):
+    """Extract metadata from every page, reusing entries for files that have not changed."""
+    src_path = Path(config["src"])
+    stats = stats if stats is not None else {}
+    previous = util.load_cache(config, SITE_INDEX_FILE, SITE_INDEX_VERSION)
+    entries = {}
+    for file_path in markdowns:
+        file_path = Path(file_path)
+        rel_path = file_path.relative_to(src_path)
+        key = PurePosixPath(*rel_path.parts).as_posix()
+        stat = stats.get(file_path) or file_path.stat()
+        old = previous.get(key)
+        if old and (old["size"] == stat.st_size) and (old["mtime_ns"] == stat.st_mtime_ns):
+            entries[key] = old
+            continue
+        entry = extract_metadata(file_path.read_text(), rel_path)
+        entry["size"] = stat.st_size
+        entry["mtime_ns"] = stat.st_mtime_ns
+        entries[key] = entry
+    util.save_cache(config, SITE_INDEX_FILE, SITE_INDEX_VERSION, entries)
+    return SiteIndex(
+        ({k: v for k, v in entry.items() if k not in ("size", "mtime_ns")} for entry in entries.values()),
+        assets,
+    )
+
+
+def _plain_text(text):
+    """Turn the Markdown of a heading into the text it displays.
+
+    Code spans lose their backticks but are otherwise taken literally;
+    elsewhere, backslash escapes and character entities are replaced.
+    """
+    parts = []
+    start = 0
+    for match in CODE_SPAN_RE.finditer(text):
+        parts.append(html.unescape(ESCAPE_RE.sub(r"\1", text[start:match.start()])))
+        parts.append(match.group(2).strip())
+        start = match.end()
+    parts.append(html.unescape(ESCAPE_RE.sub(r"\1", text[start:])))
+    return "".join(parts)
+
+
+def _reading_order(key):
+    """Sort key putting each directory's index page first, then its pages, then subdirectories."""
+    path = PurePosixPath(key)
+    return tuple((2, part) for part in path.parent.parts) + ((0, "") if path.name == "index.md" else (1, path.name),)
+
+
+def _unquote(value):
+    """Remove matching quotes around a front matter value."""
+    if len(value) >= 2 and value[0] == value[-1] and value[0] in "'\"":
+        return value[1:-1]
+    return value
@@ -0,0 +1,158 @@
+"""Single-pass transformation engine for converted pages."""
+
+from pathlib import Path
+
+# Title used when a page does not have exactly one H1 heading
+DEFAULT_TITLE = "Untitled"
+
+
+class Context:
+    """Information about the page being transformed."""
+
+    def __init__(self, rel_path, assets=None):
+        self.rel_path = Path(rel_path)
+        self.root_path = root_path(self.rel_path)
+        self.assets = assets if assets is not None else {}
+        self.h1_texts = []
+        self.title = DEFAULT_TITLE
+        self.warnings = []
+
+
+class Transform:
+    """A rewrite applied to matching nodes during a single walk of a page.
+
+    - `tags`: names of the tags this transform handles (`None` for all tags).
+    - `attrs`: attributes whose values are passed to `rewrite(value, context)`,
+      which returns the new value.
+    - `visit(node, context)`: called with every matching node.
+    - `finish(context)`: called once after the walk.
+    - `native`: can this transform run on the Markdown ElementTree? Attribute
+      rewrites always can; transforms with `visit` are assumed to need
+      BeautifulSoup nodes unless they say otherwise.
+    """
+
+    def __init__(self, name, tags=None, attrs=(), rewrite=None, visit=None, finish=None, native=None):
+        self.name = name
+        self.tags = None if tags is None else frozenset(tags)
+        self.attrs = tuple(attrs)
+        self.rewrite = rewrite
+        self.visit = visit
+        self.finish = finish
+        self.native = (visit is None) if native is None else native
+
+    def handles(self, tag):
+        """Does this transform want to see nodes with this tag name?"""
+        return (self.tags is None) or (tag in self.tags)
+
+
+def apply_transforms(soup, context, transforms=None):
+    """Apply transforms to every matching node in one walk of the tree."""
+    transforms = _registry if transforms is None else transforms
+    handlers = {}
+    for node in soup.find_all(True):
+        if node.name not in handlers:
+            handlers[node.name] = [t for t in transforms if t.handles(node.name)]
+        for transform in handlers[node.name]:
+            if transform.rewrite is not None:
+                for attr in transform.attrs:
+                    value = node.get(attr)
+                    if value is not None:
+                        node[attr] = transform.rewrite(value, context)
+            if transform.visit is not None:
+                transform.visit(node, context)
+    for transform in transforms:
+        if transform.finish is not None:
+            transform.finish(context)
+    return soup
+
+
+def get_transforms():
+    """Return the registered transforms in the order they are applied."""
+    return list(_registry)
+
+
+def register_transform(transform, before=None):
+    """Add a transform, optionally before the one with the given name."""
+    if any(t.name == transform.name for t in _registry):
+        raise ValueError(f"Transform '{transform.name}' is already registered")
+    names = [t.name for t in _registry]
+    if before is None:
+        _registry.append(transform)
+    elif before in names:
+        _registry.insert(names.index(before), transform)
+    else:
+        raise ValueError(f"No transform named '{before}'")
+
+
+def root_path(rel_path):
+    """Calculate the relative path to the root directory."""
+    depth = len(Path(rel_path).parts) - 1
+    return "../" * depth if depth > 0 else "./"
+
+
+def asset_path(path, assets):
+    """Replace a site-relative path with its fingerprinted name (if any), keeping any query or fragment."""
+    end = min((i for i in (path.find("?"), path.find("#")) if i >= 0), default=len(path))
+    return assets.get(path[:end], path[:end]) + path[end:]
+
+
+def node_text(node):
+    """Get the text of a BeautifulSoup or ElementTree node."""
+    if hasattr(node, "get_text"):
+        return node.get_text()
+    return "".join(node.itertext())
+
+
+def _rewrite_root_path(value, context):
+    """Replace @root/ with the relative path to the root directory (and use fingerprinted asset names)."""
+    if value.startswith("@root/"):
+        return context.root_path + asset_path(value[len("@root/"):], context.assets)
+    return value
+
+
+def _rewrite_bibliography(value, context):
+    """Replace b:something with a relative reference to bibliography.html#something."""
+    if value.startswith("b:"):
+        return f"{context.root_path}bibliography.html#{value[2:]}"
+    return value
+
+
+def _rewrite_glossary(value, context):
+    """Replace g:something with a relative reference to glossary.html#something."""
+    if value.startswith("g:"):
+        return f"{context.root_path}glossary.html#{value[2:]}"
+    return value
+
+
+def _rewrite_markdown_link(value, context):
+    """Replace .md links (with or without anchors) with .html links."""
+    if value.endswith(".md"):
+        return value[:-3] + ".html"
+    if ".md#" in value:
+        return value.replace(".md#", ".html#")
+    return value
+
+
+def _visit_h1(node, context):
+    """Remember the text of each H1 heading."""
+    context.h1_texts.append(node_text(node))
+
+
+def _finish_h1(context):
+    """Use the unique H1 heading as the page title."""
+    if not context.h1_texts:
+        context.warnings.append(f"Warning: No H1 heading found in {context.rel_path}")
+    elif len(context.h1_texts) > 1:
+        context.warnings.append(f"Warning: Multiple H1 headings found in {context.rel_path}")
+    else:
+        context.title = context.h1_texts[0]
+
+
+ROOT_PATH = Transform("root_path", attrs=["href", "src"], rewrite=_rewrite_root_path)
+BIBLIOGRAPHY = Transform("bibliography", tags=["a"], attrs=["href"], rewrite=_rewrite_bibliography)
+GLOSSARY = Transform("glossary", tags=["a"], attrs=["href"], rewrite=_rewrite_glossary)
+MARKDOWN_LINKS = Transform("markdown_links", tags=["a"], attrs=["href"], rewrite=_rewrite_markdown_link)
+H1_TITLE = Transform("h1_title", tags=["h1"], visit=_visit_h1, finish=_finish_h1, native=True)
+
+# Transforms applied to every page, in order
+_registry = [ROOT_PATH, BIBLIOGRAPHY, GLOSSARY, MARKDOWN_LINKS, H1_TITLE]
@@ -1,8 +1,11 @@
 """Utility functions and constants for McCole."""
 
 import click
+import hashlib
+import json
+import os
 from pathlib import Path
-import tomli
+import re
 
 # Default configuration file path
 DEFAULT_CONFIG_PATH = Path("pyproject.toml")
@@ -16,23 +19,73 @@ DEFAULT_DST_PATH = "docs"
 # Default templates directory path
 DEFAULT_TEMPLATES_PATH = "templates"
 
+# Default directory for caches that persist between builds
+DEFAULT_CACHE_PATH = ".mccole-cache"
+
+# Megabytes of rendered pages kept in the page cache (0 turns it off)
+DEFAULT_PAGE_CACHE_LIMIT = 256
+
 # Default page template file
 DEFAULT_TEMPLATE_PAGE = "page.html"
 
+# Markdown extensions enabled by default
+DEFAULT_MARKDOWN_EXTENSIONS = [
+    "markdown.extensions.attr_list",
+    "markdown.extensions.def_list",
+    "markdown.extensions.fenced_code",
+    "markdown.extensions.md_in_html",
+    "markdown.extensions.tables",
+]
 
-def find_files(config):
-    """Find files in the source directory, returning (markdown, others)."""
-    src_path = Path(config["src"])
+# How assets are put in the destination directory ("copy", "hardlink", or "reflink")
+DEFAULT_LINK_MODE = "copy"
+
+# How to decide that a copied asset is up to date ("stat" or "hash")
+DEFAULT_COPY_CHECK = "stat"
+
+# Number of threads used to copy assets
+DEFAULT_COPY_WORKERS = 8
+
+# Megabytes of memory that pages being converted in parallel may use (0 for no limit)
+DEFAULT_MEMORY_LIMIT = 1024
+
+# File types that get compressed siblings (when compression is turned on)
+DEFAULT_COMPRESS_TYPES = [".html", ".css", ".js", ".json", ".svg", ".xml", ".txt"]
+
+# Fraction of a file's size that compression must save for a sibling to be written
+DEFAULT_COMPRESS_MIN_RATIO = 0.1
+
+# Seconds between checks for changes in watch mode
+DEFAULT_WATCH_INTERVAL = 0.5
+
+# Seconds without further changes before watch mode rebuilds
+DEFAULT_WATCH_DEBOUNCE = 0.2
+
+# Number of slowest pages and stages reported when profiling
+DEFAULT_PROFILE_TOP = 10
+
+# Size of blocks read when hashing files
+HASH_BLOCK_SIZE = 1024 * 1024
+
+# Bytes in a megabyte (the unit of configured size and memory limits and of reports)
+MEGABYTE = 1024 * 1024
+
+# Lines that open or close fenced code blocks in Markdown
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+
+
+def find_files(config, stats=None):
+    """Find files in the source directory, returning (markdown, others).
+
+    If `stats` is a dictionary, each file's stat result is saved in it.
+    """
     markdown_files = []
     other_files = []
-    skips = config["skips"]
-
-    for path in src_path.rglob("*"):
-        if not path.is_file():
-            pass
-        elif any(path.match(pat) for pat in skips):
-            pass
-        elif path.suffix.lower() == ".md":
+
+    for path, stat in iter_files(config):
+        if stats is not None:
+            stats[path] = stat
+        if path.suffix.lower() == ".md":
             markdown_files.append(path)
         else:
             other_files.append(path)
@@ -40,11 +93,155 @@ def find_files(config):
     return markdown_files, other_files
 
 
+def iter_files(config):
+    """Yield (path, stat) for each file in the source directory that is not skipped.
+
+    Directories matched by a pattern ending in '/**' or '/' are not entered.
+    """
+    src_path = Path(config["src"])
+    if not src_path.is_dir():
+        return
+    file_skips, dir_skips = compile_skips(config["skips"])
+    yield from _walk(src_path, "", file_skips, dir_skips)
+
+
+def compile_skips(patterns):
+    """Compile glob patterns into (file_regex, directory_regex), either of which may be None.
+
+    Patterns are matched against paths relative to the source directory.
+    '*' and '?' do not match '/', '**' matches any number of directories,
+    and patterns that do not start with '/' may match at any depth.
+    """
+    files = []
+    dirs = []
+    for pattern in patterns:
+        anchored = pattern.startswith("/")
+        pattern = pattern.lstrip("/")
+        prefix = "" if anchored else "(?:.*/)?"
+        if pattern.endswith("/**") or pattern.endswith("/"):
+            dirs.append(prefix + _glob_to_regex(pattern.rstrip("*").rstrip("/")))
+        if not pattern.endswith("/"):
+            files.append(prefix + _glob_to_regex(pattern))
+    return _join_regexes(files), _join_regexes(dirs)
+
+
+def _glob_to_regex(pattern):
+    """Translate one glob pattern into a regular expression."""
+    parts = []
+    i = 0
+    while i < len(pattern):
+        if pattern.startswith("**/", i):
+            parts.append("(?:.*/)?")
+            i += 3
+        elif pattern.startswith("**", i):
+            parts.append(".*")
+            i += 2
+        elif pattern[i] == "*":
+            parts.append("[^/]*")
+            i += 1
+        elif pattern[i] == "?":
+            parts.append("[^/]")
+            i += 1
+        elif pattern[i] == "[" and "]" in pattern[i + 2:]:
+            end = pattern.index("]", i + 2)
+            body = pattern[i + 1:end].replace("\\", "\\\\")
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            parts.append(f"[{body}]")
+            i = end + 1
+        else:
+            parts.append(re.escape(pattern[i]))
+            i += 1
+    return "".join(parts)
+
+
+def _join_regexes(regexes):
+    """Combine regular expressions into one that matches a whole path, or None."""
+    if not regexes:
+        return None
+    return re.compile("(?:" + "|".join(regexes) + ")$")
+
+
+def _walk(dir_path, prefix, file_skips, dir_skips):
+    """Recursively yield (path, stat) for files, pruning skipped directories."""
+    with os.scandir(dir_path) as entries:
+        entries = sorted(entries, key=lambda entry: entry.name)
+    subdirs = []
+    for entry in entries:
+        rel_path = prefix + entry.name
+        if entry.is_dir(follow_symlinks=False):
+            if not (dir_skips and dir_skips.match(rel_path)):
+                subdirs.append((entry.path, rel_path + "/"))
+        elif entry.is_file():
+            if not (file_skips and file_skips.match(rel_path)):
+                yield Path(entry.path), entry.stat()
+    for subdir, subprefix in subdirs:
+        yield from _walk(subdir, subprefix, file_skips, dir_skips)
+
+
+def snapshot_settings(config_file, config):
+    """Record the modification time and size of the configuration file and every template."""
+    paths = [Path(config_file)]
+    templates_path = Path(config["templates"])
+    if templates_path.exists():
+        paths.extend(path for path in templates_path.rglob("*") if path.is_file())
+    result = {}
+    for path in paths:
+        try:
+            stat = path.stat()
+        except FileNotFoundError:
+            continue
+        result[path] = (stat.st_mtime_ns, stat.st_size)
+    return result
+
+
+def hash_file(path):
+    """Return the SHA-256 hex digest of a file's contents."""
+    digest = hashlib.sha256()
+    with open(path, "rb") as reader:
+        while block := reader.read(HASH_BLOCK_SIZE):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+def load_cache(config, name, version):
+    """Load the entries cached in a file in the cache directory.
+
+    Returns an empty dictionary if caching is off, the build is forced, or
+    the file is missing, unreadable, or was saved with a different version.
+    """
+    if (not config.get("cache")) or config.get("force", False):
+        return {}
+    try:
+        data = json.loads((Path(config["cache"]) / name).read_text())
+    except (OSError, ValueError):
+        return {}
+    if data.get("version") != version:
+        return {}
+    return data.get("pages", {})
+
+
+def save_cache(config, name, version, entries):
+    """Save entries in a file in the cache directory for the next run (if caching is on)."""
+    if not config.get("cache"):
+        return
+    path = Path(config["cache"]) / name
+    data = {"version": version, "pages": entries}
+    try:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(json.dumps(data))
+    except OSError as exc:
+        if config.get("verbose", False):
+            click.echo(f"Unable to save {name}: {exc}")
+
+
 def read_config(config_file, verbose, src, dst):
     """Read configuration from TOML file."""
     if not config_file.exists():
         raise click.FileError(str(config_file), hint="File not found")
 
+    import tomli
+
     with config_file.open("rb") as reader:
         toml_dict = tomli.load(reader)
 
@@ -57,12 +254,136 @@ def read_config(config_file, verbose, src, dst):
         lambda cfg, key: key not in cfg or isinstance(cfg[key], list),
         "'skips' in configuration must be a list of glob patterns",
     )
+    _check_config(
+        config_file,
+        config,
+        "fingerprint",
+        lambda cfg, key: key not in cfg or isinstance(cfg[key], list),
+        "'fingerprint' in configuration must be a list of glob patterns",
+    )
+    _check_config(
+        config_file,
+        config,
+        "markdown_extensions",
+        lambda cfg, key: key not in cfg or isinstance(cfg[key], list),
+        "'markdown_extensions' in configuration must be a list of extension names",
+    )
+    _check_config(
+        config_file,
+        config,
+        "markdown_options",
+        lambda cfg, key: key not in cfg or isinstance(cfg[key], dict),
+        "'markdown_options' in configuration must be a table of extension settings",
+    )
+    _check_config(
+        config_file,
+        config,
+        "link_mode",
+        lambda cfg, key: key not in cfg or cfg[key] in ("copy", "hardlink", "reflink"),
+        "'link_mode' in configuration must be 'copy', 'hardlink', or 'reflink'",
+    )
+    _check_config(
+        config_file,
+        config,
+        "copy_check",
+        lambda cfg, key: key not in cfg or cfg[key] in ("stat", "hash"),
+        "'copy_check' in configuration must be 'stat' or 'hash'",
+    )
+    _check_config(
+        config_file,
+        config,
+        "copy_workers",
+        lambda cfg, key: key not in cfg or (isinstance(cfg[key], int) and cfg[key] > 0),
+        "'copy_workers' in configuration must be a positive integer",
+    )
+
+    _check_config(
+        config_file,
+        config,
+        "cache",
+        lambda cfg, key: key not in cfg or isinstance(cfg[key], str),
+        "'cache' in configuration must be a directory path",
+    )
+
+    _check_config(
+        config_file,
+        config,
+        "page_cache_limit",
+        lambda cfg, key: key not in cfg or (isinstance(cfg[key], int) and cfg[key] >= 0),
+        "'page_cache_limit' in configuration must be a number of megabytes",
+    )
+
+    _check_config(
+        config_file,
+        config,
+        "memory_limit",
+        lambda cfg, key: key not in cfg or (isinstance(cfg[key], int) and cfg[key] >= 0),
+        "'memory_limit' in configuration must be a number of megabytes",
+    )
+
+    _check_config(
+        config_file,
+        config,
+        "minify",
+        lambda cfg, key: key not in cfg or (isinstance(cfg[key], list) and set(cfg[key]) <= {"html", "css", "js"}),
+        "'minify' in configuration must be a list of 'html', 'css', and 'js'",
+    )
+    _check_config(
+        config_file,
+        config,
+        "highlight",
+        lambda cfg, key: key not in cfg or isinstance(cfg[key], str),
+        "'highlight' in configuration must be the name of a Pygments style",
+    )
+    _check_config(
+        config_file,
+        config,
+        "search",
+        lambda cfg, key: key not in cfg or isinstance(cfg[key], bool),
+        "'search' in configuration must be true or false",
+    )
+    _check_config(
+        config_file,
+        config,
+        "compress",
+        lambda cfg, key: key not in cfg or (isinstance(cfg[key], list) and set(cfg[key]) <= {"gz", "br", "zst"}),
+        "'compress' in configuration must be a list of 'gz', 'br', and 'zst'",
+    )
+    _check_config(
+        config_file,
+        config,
+        "compress_types",
+        lambda cfg, key: key not in cfg or isinstance(cfg[key], list),
+        "'compress_types' in configuration must be a list of file suffixes",
+    )
+    _check_config(
+        config_file,
+        config,
+        "compress_min_ratio",
+        lambda cfg, key: key not in cfg or (isinstance(cfg[key], (int, float)) and 0 <= cfg[key] < 1),
+        "'compress_min_ratio' in configuration must be a number from 0 up to 1",
+    )
 
     config["verbose"] = verbose
     _build_config(config, "src", src, DEFAULT_SRC_PATH)
     _build_config(config, "dst", dst, DEFAULT_DST_PATH)
     _build_config(config, "skips", None, [])
+    _build_config(config, "fingerprint", None, [])
     _build_config(config, "templates", None, DEFAULT_TEMPLATES_PATH)
+    _build_config(config, "cache", None, DEFAULT_CACHE_PATH)
+    _build_config(config, "page_cache_limit", None, DEFAULT_PAGE_CACHE_LIMIT)
+    _build_config(config, "markdown_extensions", None, list(DEFAULT_MARKDOWN_EXTENSIONS))
+    _build_config(config, "markdown_options", None, {})
+    _build_config(config, "link_mode", None, DEFAULT_LINK_MODE)
+    _build_config(config, "copy_check", None, DEFAULT_COPY_CHECK)
+    _build_config(config, "copy_workers", None, DEFAULT_COPY_WORKERS)
+    _build_config(config, "memory_limit", None, DEFAULT_MEMORY_LIMIT)
+    _build_config(config, "minify", None, [])
+    _build_config(config, "highlight", None, "")
+    _build_config(config, "search", None, False)
+    _build_config(config, "compress", None, [])
+    _build_config(config, "compress_types", None, list(DEFAULT_COMPRESS_TYPES))
+    _build_config(config, "compress_min_ratio", None, DEFAULT_COMPRESS_MIN_RATIO)
 
     return config
 
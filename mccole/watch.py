@@ -0,0 +1,83 @@
+"""Watch functionality for McCole."""
+
+import click
+import jinja2
+from pathlib import Path
+import time
+
+from . import util
+from .build import Converter, _set_up_jinja, build_site, prune_outputs
+
+
+def do_watch(config, verbose, src, dst, interval=util.DEFAULT_WATCH_INTERVAL, debounce=util.DEFAULT_WATCH_DEBOUNCE):
+    """Rebuild the site whenever sources, templates, or configuration change."""
+    config_file = Path(config) if config else util.DEFAULT_CONFIG_PATH
+    config = util.read_config(config_file, verbose, src, dst)
+    jinja_env = _set_up_jinja(config)
+    converter = Converter(config, jinja_env)
+    _rebuild(config, jinja_env, converter)
+
+    def take_snapshot():
+        return _snapshot(config_file, config)
+
+    snapshot = take_snapshot()
+    click.echo(f"Watching {config['src']} and {config['templates']} (press Ctrl-C to stop)")
+    try:
+        while True:
+            latest = _wait_for_changes(take_snapshot, snapshot, interval, debounce)
+            changed = _changed_paths(snapshot, latest)
+            snapshot = latest
+            try:
+                if config_file in changed:
+                    config = util.read_config(config_file, verbose, src, dst)
+                    jinja_env = _set_up_jinja(config)
+                    converter = Converter(config, jinja_env)
+                elif any(_is_within(path, config["templates"]) for path in changed):
+                    converter = Converter(config, jinja_env)
+            except (click.ClickException, jinja2.TemplateError, ValueError) as exc:
+                click.echo(f"Error: {exc}", err=True)
+                continue
+            click.echo(f"Rebuilding after {len(changed)} change(s)")
+            _rebuild(config, jinja_env, converter)
+    except KeyboardInterrupt:
+        click.echo("Stopped watching")
+
+
+def _changed_paths(old, new):
+    """Find paths that were added, removed, or modified between two snapshots."""
+    return {path for path in old.keys() | new.keys() if old.get(path) != new.get(path)}
+
+
+def _is_within(path, directory):
+    """Is a path inside a directory?"""
+    return Path(path).is_relative_to(Path(directory))
+
+
+def _rebuild(config, jinja_env, converter):
+    """Rebuild changed files and remove the outputs of deleted ones."""
+    try:
+        manifest = build_site(config, jinja_env, converter)
+        prune_outputs(config, manifest)
+    except (click.ClickException, jinja2.TemplateError, OSError, ValueError) as exc:
+        click.echo(f"Error: {exc}", err=True)
+
+
+def _snapshot(config_file, config):
+    """Record the modification time and size of every watched file."""
+    result = {path: (stat.st_mtime_ns, stat.st_size) for path, stat in util.iter_files(config)}
+    result.update(util.snapshot_settings(config_file, config))
+    return result
+
+
+def _wait_for_changes(take_snapshot, previous, interval, debounce, sleep=time.sleep):
+    """Wait for a change, then until nothing has changed for the debounce period."""
+    current = previous
+    while current == previous:
+        sleep(interval)
+        current = take_snapshot()
+    while True:
+        sleep(debounce)
+        settled = take_snapshot()
+        if settled == current:
+            return settled
+        current = settled
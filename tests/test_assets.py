@@ -0,0 +1,140 @@
+"""Tests for copying, linking, and cloning assets."""
+
+import json
+import os
+import pytest
+
+from mccole.assets import ASSET_MANIFEST_FILE, is_current, sync_file
+from mccole.build import _copy_others, build_site, prune_outputs
+
+
+@pytest.fixture
+def source(tmp_path):
+    """Create a source file on the real filesystem (links need real inodes)."""
+    path = tmp_path / "src" / "image.png"
+    path.parent.mkdir()
+    path.write_bytes(b"pixels" * 100)
+    return path
+
+
+def test_sync_copies_then_skips(source, tmp_path):
+    """Test that a second sync of an unchanged file does nothing."""
+    dst = tmp_path / "dst" / "image.png"
+    assert sync_file(source, dst) == "Copied"
+    assert dst.read_bytes() == source.read_bytes()
+    assert sync_file(source, dst) == "Unchanged"
+
+
+def test_sync_recopies_when_size_changes(source, tmp_path):
+    """Test that a destination with a different size is replaced."""
+    dst = tmp_path / "dst" / "image.png"
+    sync_file(source, dst)
+    source.write_bytes(b"more pixels" * 100)
+    assert sync_file(source, dst) == "Copied"
+    assert dst.read_bytes() == source.read_bytes()
+
+
+def test_hash_check_detects_same_size_edits(source, tmp_path):
+    """Test that hash checking catches edits that keep size and mtime."""
+    dst = tmp_path / "dst" / "image.png"
+    sync_file(source, dst)
+    stat = source.stat()
+    dst.write_bytes(b"PIXELS" * 100)
+    os.utime(dst, ns=(stat.st_atime_ns, stat.st_mtime_ns))
+    assert is_current(source, dst, "stat")
+    assert not is_current(source, dst, "hash")
+    assert sync_file(source, dst, check="hash") == "Copied"
+
+
+def test_hardlink_shares_inode(source, tmp_path):
+    """Test that hardlink mode links instead of copying."""
+    dst = tmp_path / "dst" / "image.png"
+    assert sync_file(source, dst, link_mode="hardlink") == "Linked"
+    assert dst.stat().st_ino == source.stat().st_ino
+    assert sync_file(source, dst, link_mode="hardlink") == "Unchanged"
+
+
+@pytest.mark.parametrize("link_mode", ["copy", "reflink"])
+def test_forced_sync_over_hardlink_leaves_source_alone(source, tmp_path, link_mode):
+    """Test that replacing a hard-linked destination never writes through to the source."""
+    dst = tmp_path / "dst" / "image.png"
+    original = source.read_bytes()
+    assert sync_file(source, dst, link_mode="hardlink") == "Linked"
+    assert sync_file(source, dst, link_mode=link_mode, force=True) == "Copied"
+    assert source.read_bytes() == original
+    assert dst.read_bytes() == original
+    assert dst.stat().st_ino != source.stat().st_ino
+
+
+def test_reflink_copies_content_and_times(source, tmp_path):
+    """Test that reflink mode produces an identical file (cloned or copied)."""
+    dst = tmp_path / "dst" / "image.png"
+    assert sync_file(source, dst, link_mode="reflink") == "Copied"
+    assert dst.read_bytes() == source.read_bytes()
+    assert dst.stat().st_mtime_ns == source.stat().st_mtime_ns
+    assert dst.stat().st_ino != source.stat().st_ino
+
+
+def test_copy_others_reports_in_order_with_threads(tmp_path, capsys):
+    """Test that threaded copying reports files in the order given."""
+    src = tmp_path / "src"
+    files = []
+    for i in range(10):
+        path = src / f"file{i}.txt"
+        path.parent.mkdir(exist_ok=True)
+        path.write_text(f"content {i}")
+        files.append(path)
+    config = {"src": src, "dst": tmp_path / "dst", "verbose": True, "copy_workers": 4}
+    _copy_others(config, files)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [f"Copied file{i}.txt" for i in range(10)]
+    _copy_others(config, files)
+    lines = capsys.readouterr().out.splitlines()
+    assert lines == [f"Unchanged file{i}.txt" for i in range(10)]
+
+
+@pytest.fixture
+def fingerprinted_site(tmp_path):
+    """Create a site that fingerprints its stylesheets."""
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text('<link href="{{ asset(\'style.css\') }}">{{ content|safe }}')
+    (tmp_path / "src" / "docs").mkdir(parents=True)
+    (tmp_path / "src" / "style.css").write_text("body { color: red; }")
+    (tmp_path / "src" / "logo.png").write_text("png")
+    (tmp_path / "src" / "docs" / "page.md").write_text("# Page\n\n[style](@root/style.css)")
+    return {
+        "src": tmp_path / "src",
+        "dst": tmp_path / "dst",
+        "templates": tmp_path / "templates",
+        "skips": [],
+        "verbose": False,
+        "fingerprint": ["*.css"],
+    }
+
+
+def test_fingerprinted_assets_are_renamed_and_referenced(fingerprinted_site):
+    """Test that matching assets get hashed names used by pages and templates."""
+    dst = fingerprinted_site["dst"]
+    build_site(fingerprinted_site)
+    asset_map = json.loads((dst / ASSET_MANIFEST_FILE).read_text())
+    assert list(asset_map) == ["style.css"]
+    fingerprinted = asset_map["style.css"]
+    assert (dst / fingerprinted).exists()
+    assert not (dst / "style.css").exists()
+    assert (dst / "logo.png").exists()
+    page = (dst / "docs" / "page.html").read_text()
+    assert f'<link href="../{fingerprinted}">' in page
+    assert f'href="../{fingerprinted}"' in page.split(">", 1)[1]
+
+
+def test_changed_asset_rebuilds_pages_and_prunes_old_name(fingerprinted_site):
+    """Test that editing a fingerprinted asset updates references and removes the old copy."""
+    dst = fingerprinted_site["dst"]
+    build_site(fingerprinted_site)
+    old = json.loads((dst / ASSET_MANIFEST_FILE).read_text())["style.css"]
+    (fingerprinted_site["src"] / "style.css").write_text("body { color: blue; }")
+    prune_outputs(fingerprinted_site, build_site(fingerprinted_site))
+    new = json.loads((dst / ASSET_MANIFEST_FILE).read_text())["style.css"]
+    assert new != old
+    assert not (dst / old).exists()
+    assert new in (dst / "docs" / "page.html").read_text()
@@ -1,15 +1,21 @@
 """Tests for build functionality."""
 
 from bs4 import BeautifulSoup
+from concurrent.futures import Future
 from pathlib import Path
+import click
+import jinja2
 import pytest
 
 from mccole.build import (
+    Converter,
+    _bounded_map,
     _copy_others,
     _convert_markdowns,
     _do_markdown_to_html_links,
     _do_h1_to_title,
     _set_up_jinja,
+    precompile_templates,
 )
 
 # Directories (using non-defaults to improve testing).
@@ -492,3 +498,117 @@ def test_do_h1_to_title_function_with_multiple_h1(setup_markdown_files, capsys):
     assert "Warning: Multiple H1 headings found in test.md" in captured.out
 
     assert result is soup 
+
+
+def test_convert_markdowns_in_parallel_matches_serial(tmp_path, capsys):
+    """Test that converting with worker processes gives the same output and warning order."""
+    src = tmp_path / "source"
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "page.html").write_text(JINJA_TEMPLATE)
+    files = []
+    for i in range(6):
+        path = src / f"dir{i % 2}" / f"page{i}.md"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(INDEX_MD_CONTENT if i % 3 else PAGE_MD_CONTENT)
+        files.append(path)
+
+    outputs = {}
+    for jobs in (1, 3):
+        dst = tmp_path / f"dest{jobs}"
+        config = {"src": src, "dst": dst, "verbose": True, "templates": templates, "jobs": jobs}
+        _convert_markdowns(config, _set_up_jinja(config), files)
+        captured = capsys.readouterr()
+        pages = {p.relative_to(dst): p.read_text() for p in dst.rglob("*.html")}
+        outputs[jobs] = (captured.out, pages)
+
+    assert outputs[1] == outputs[3]
+    assert "Warning: No H1 heading found in dir0/page0.md" in outputs[3][0]
+    assert outputs[3][0].index("page0.md") < outputs[3][0].index("page1.md")
+
+
+def test_converter_reuses_one_markdown_engine(setup_markdown_files):
+    """Test that a converter keeps one Markdown instance and resets it between pages."""
+    converter = Converter(setup_markdown_files["config"])
+    md = converter.md
+    first, first_context = converter.render(INDEX_MD_CONTENT, Path("index.md"))
+    second, second_context = converter.render(DEEP_MD_CONTENT, Path("docs/subdir/deep.md"))
+    assert converter.md is md
+    assert "<title>Title</title>" in first
+    assert 'href="../../index.html"' in second
+    assert "citation1" not in second
+    assert second_context.warnings == ["Warning: No H1 heading found in docs/subdir/deep.md"]
+
+
+def test_converter_uses_configured_extensions(setup_markdown_files):
+    """Test that the Markdown extensions and their options come from the configuration."""
+    config = setup_markdown_files["config"]
+    config["markdown_extensions"] = ["markdown.extensions.toc"]
+    config["markdown_options"] = {"markdown.extensions.toc": {"permalink": "#"}}
+    content, context = Converter(config).convert("# Title\n\n## Part", Path("index.md"))
+    assert 'id="part"' in content
+    assert 'class="headerlink"' in content
+
+
+def test_converter_reports_bad_extension(setup_markdown_files):
+    """Test that an unknown Markdown extension is reported as a usage error."""
+    config = setup_markdown_files["config"]
+    config["markdown_extensions"] = ["no.such.extension"]
+    with pytest.raises(click.ClickException):
+        Converter(config)
+
+
+def test_templates_are_cached_as_bytecode(tmp_path):
+    """Test that compiled templates are stored per Jinja version and reused."""
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "page.html").write_text(JINJA_TEMPLATE)
+    (templates / "extra.html").write_text("<p>{{ content }}</p>")
+    config = {"templates": templates, "cache": str(tmp_path / "cache"), "verbose": False}
+    assert sorted(precompile_templates(config, _set_up_jinja(config))) == ["extra.html", "page.html"]
+    cache_path = tmp_path / "cache" / "jinja" / jinja2.__version__
+    assert len(list(cache_path.iterdir())) == 2
+
+    fresh = _set_up_jinja(config)
+    bucket = fresh.bytecode_cache.get_bucket(fresh, "page.html", str(templates / "page.html"), JINJA_TEMPLATE)
+    assert bucket.code is not None
+    stale = fresh.bytecode_cache.get_bucket(fresh, "page.html", str(templates / "page.html"), "changed")
+    assert stale.code is None
+
+
+def test_templates_without_cache_directory(setup_markdown_files):
+    """Test that no bytecode cache is used when none is configured."""
+    assert _set_up_jinja(setup_markdown_files["config"]).bytecode_cache is None
+
+
+def test_precompile_reports_bad_template(tmp_path):
+    """Test that a template that does not compile is reported as a usage error."""
+    templates = tmp_path / "templates"
+    templates.mkdir()
+    (templates / "page.html").write_text("{% if %}")
+    config = {"templates": templates, "cache": str(tmp_path / "cache")}
+    with pytest.raises(click.ClickException):
+        precompile_templates(config, _set_up_jinja(config))
+
+
+def _recording_submit(log):
+    """Make a submit function that records how many items are in flight."""
+    def _submit(item):
+        log["in_flight"] += 1
+        log["peak"] = max(log["peak"], log["in_flight"])
+        future = Future()
+        future.set_result(item * 10)
+        return future
+    return _submit
+
+
+def test_bounded_map_limits_items_and_cost():
+    """Test that submission waits for results when too many items or too much cost is in flight."""
+    for max_items, max_cost, expected_peak in [(3, 0, 3), (10, 25, 2), (10, 5, 1)]:
+        log = {"in_flight": 0, "peak": 0}
+        results = []
+        for item, result in _bounded_map(_recording_submit(log), range(8), lambda item: 10, max_items, max_cost):
+            log["in_flight"] -= 1
+            results.append((item, result))
+        assert results == [(i, i * 10) for i in range(8)]
+        assert log["peak"] == expected_peak
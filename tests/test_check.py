@@ -0,0 +1,103 @@
+"""Tests for checking links and references."""
+
+from pathlib import Path
+import click
+import pytest
+
+from mccole.check import check_site, do_check, find_refs
+
+SRC = Path("/source")
+CACHE = Path("/cache")
+
+INDEX_MD = """# Home
+
+See [the guide](guide/intro.md) and [a section](guide/intro.md#setup).
+Read [a paper](b:smith2020) about [a term](g:widget).
+![logo](@root/images/logo.png)
+
+```
+[not a link](missing.md)
+```
+"""
+
+INTRO_MD = """# Introduction
+
+## Setup {: #setup}
+
+Go [home](@root/index.html) or [back](../index.md).
+<a href="@root/images/missing.png">missing</a>
+[bad anchor](../index.md#nowhere)
+Cite [b:jones1999](b:jones1999) and `[code](nope.md)`.
+"""
+
+BIBLIOGRAPHY_MD = """# Bibliography
+
+<span id="smith2020">Smith 2020</span>
+"""
+
+GLOSSARY_MD = """# Glossary
+
+<dl>
+<dt id="widget">widget</dt>
+<dd>A thing.</dd>
+</dl>
+"""
+
+
+@pytest.fixture
+def site(fs):
+    """Create a small site with a few broken references."""
+    fs.create_file(str(SRC / "index.md"), contents=INDEX_MD)
+    fs.create_file(str(SRC / "guide" / "intro.md"), contents=INTRO_MD)
+    fs.create_file(str(SRC / "bibliography.md"), contents=BIBLIOGRAPHY_MD)
+    fs.create_file(str(SRC / "glossary.md"), contents=GLOSSARY_MD)
+    fs.create_file(str(SRC / "images" / "logo.png"), contents="png")
+    return {"src": SRC, "skips": [], "verbose": False, "cache": str(CACHE)}
+
+
+def test_find_refs_skips_code():
+    """Test that references are found with line numbers outside code."""
+    assert find_refs(INDEX_MD) == [
+        (3, "guide/intro.md"),
+        (3, "guide/intro.md#setup"),
+        (4, "b:smith2020"),
+        (4, "g:widget"),
+        (5, "@root/images/logo.png"),
+    ]
+
+
+def test_check_site_reports_broken_references(site):
+    """Test that only broken references are reported, by file and line."""
+    assert check_site(site) == [
+        ("guide/intro.md", 6, "Unknown page or file in reference '@root/images/missing.png'"),
+        ("guide/intro.md", 7, "Unknown anchor '#nowhere' in reference '../index.md#nowhere'"),
+        ("guide/intro.md", 8, "Unknown bibliography key 'jones1999'"),
+    ]
+
+
+def test_check_site_reuses_cached_index(site, fs, capsys):
+    """Test that only changed pages are indexed again, and references to them rechecked."""
+    check_site(site)
+    site["verbose"] = True
+    assert len(check_site(site)) == 3
+    assert "Indexed 0 page(s), reused 4" in capsys.readouterr().out
+
+    fs.remove_object(str(SRC / "guide" / "intro.md"))
+    fs.create_file(str(SRC / "guide" / "intro.md"), contents="# Introduction\n")
+    assert check_site(site) == [("index.md", 3, "Unknown anchor '#setup' in reference 'guide/intro.md#setup'")]
+    assert "Indexed 1 page(s), reused 3" in capsys.readouterr().out
+
+
+def test_check_site_without_bibliography(site, fs):
+    """Test that bibliography references need a bibliography page."""
+    fs.remove_object(str(SRC / "bibliography.md"))
+    problems = check_site(site)
+    assert ("index.md", 4, "No bibliography page (bibliography.md) for reference to 'smith2020'") in problems
+
+
+def test_do_check_fails_on_problems(site, fs, capsys):
+    """Test that the command prints problems and exits with an error."""
+    fs.create_file("pyproject.toml", contents=f'[tool.mccole]\nsrc = "{SRC}"\ncache = "{CACHE}"\n')
+    with pytest.raises(click.ClickException):
+        do_check(None, False, None, None)
+    assert "guide/intro.md:7: Unknown anchor" in capsys.readouterr().out
@@ -0,0 +1,91 @@
+"""Tests for precompressed siblings of built files."""
+
+import gzip
+import os
+
+from mccole.build import build_site, prune_outputs
+from mccole.compress import available_formats, compress_file
+
+COMPRESSIBLE = "<p>All work and no play makes Jack a dull boy.</p>\n" * 100
+
+
+def test_gzip_is_always_available():
+    """Test that gzip needs no optional library."""
+    assert "gz" in available_formats()
+
+
+def test_compress_file_writes_sibling_then_skips(tmp_path):
+    """Test that a sibling is written with the original's mtime and reused afterward."""
+    path = tmp_path / "index.html"
+    path.write_text(COMPRESSIBLE)
+    assert compress_file(path, ["gz"]) == ["gz"]
+    sibling = tmp_path / "index.html.gz"
+    assert gzip.decompress(sibling.read_bytes()).decode("utf-8") == COMPRESSIBLE
+    assert sibling.stat().st_mtime_ns == path.stat().st_mtime_ns
+    assert compress_file(path, ["gz"]) == []
+
+
+def test_compress_file_skips_poor_savings(tmp_path):
+    """Test that files compression barely shrinks get no sibling, and old siblings are removed."""
+    path = tmp_path / "random.txt"
+    path.write_text(COMPRESSIBLE)
+    compress_file(path, ["gz"])
+    path.write_bytes(os.urandom(4096))
+    assert compress_file(path, ["gz"], min_ratio=0.1) == []
+    assert not (tmp_path / "random.txt.gz").exists()
+
+
+def test_build_compresses_outputs_and_prunes_siblings(tmp_path):
+    """Test that built pages and assets get siblings that are removed along with them."""
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text("{{ content|safe }}")
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "index.md").write_text("# Home\n\n" + COMPRESSIBLE)
+    (src / "notes.txt").write_text(COMPRESSIBLE)
+    (src / "image.png").write_bytes(b"png" * 1000)
+    config = {
+        "src": src,
+        "dst": tmp_path / "dst",
+        "templates": tmp_path / "templates",
+        "skips": [],
+        "verbose": False,
+        "compress": ["gz"],
+    }
+    prune_outputs(config, build_site(config))
+    dst = config["dst"]
+    assert (dst / "index.html.gz").exists()
+    assert (dst / "notes.txt.gz").exists()
+    assert not (dst / "image.png.gz").exists()
+
+    (src / "notes.txt").unlink()
+    prune_outputs(config, build_site(config))
+    assert not (dst / "notes.txt").exists()
+    assert not (dst / "notes.txt.gz").exists()
+
+
+def test_changing_settings_compresses_unchanged_outputs(tmp_path):
+    """Test that turning compression on or changing its settings affects outputs that were not rebuilt."""
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text("{{ content|safe }}")
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "notes.txt").write_text(COMPRESSIBLE)
+    config = {
+        "src": src,
+        "dst": tmp_path / "dst",
+        "templates": tmp_path / "templates",
+        "skips": [],
+        "verbose": False,
+    }
+    build_site(config)
+    sibling = tmp_path / "dst" / "notes.txt.gz"
+    assert not sibling.exists()
+
+    config["compress"] = ["gz"]
+    build_site(config)
+    assert sibling.exists()
+
+    config["compress_min_ratio"] = 0.999
+    build_site(config)
+    assert not sibling.exists()
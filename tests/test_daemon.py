@@ -0,0 +1,94 @@
+"""Tests for the build daemon and its client."""
+
+import click
+import pytest
+import socket
+import threading
+import time
+
+import mccole.daemon
+from mccole.daemon import DAEMON_PROTOCOL_VERSION, Daemon, run_in_daemon, socket_path
+
+CONFIG = """[tool.mccole]
+src = "src"
+dst = "docs"
+"""
+
+
+@pytest.fixture
+def site(tmp_path, monkeypatch):
+    """Set up a small site in a temporary directory and work there."""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / "pyproject.toml").write_text(CONFIG)
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text("<title>{{ title }}</title>{{ content|safe }}")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "index.md").write_text("# Home\n\n[next](other.md)\n")
+    (tmp_path / "src" / "other.md").write_text("# Other\n")
+    return tmp_path
+
+
+@pytest.fixture
+def daemon(site):
+    """Run a daemon for the site in a background thread."""
+    daemon = Daemon(site / "pyproject.toml", False, None, None)
+    path = socket_path(daemon.config)
+    thread = threading.Thread(target=daemon.serve, args=(path,))
+    thread.start()
+    for _ in range(100):
+        if path.exists():
+            break
+        time.sleep(0.01)
+    yield daemon
+    if thread.is_alive():
+        run_in_daemon(None, False, None, None, "stop")
+    thread.join(timeout=5)
+
+
+def test_client_without_daemon_falls_back(site):
+    """Test that the client reports that nothing is listening."""
+    assert not run_in_daemon(None, False, None, None, "build")
+
+
+def test_daemon_builds_renders_and_checks(site, daemon, capsys):
+    """Test that the daemon runs commands and sends back their output."""
+    assert run_in_daemon(None, True, None, None, "build", {"force": False, "jobs": 1, "dry_run": False})
+    assert "Converted index.md to HTML" in capsys.readouterr().out
+    assert (site / "docs" / "other.html").exists()
+
+    (site / "src" / "other.md").write_text("# Renamed\n")
+    assert run_in_daemon(None, True, None, None, "render", {"page": str(site / "src" / "other.md")})
+    assert "Converted other.md to HTML" in capsys.readouterr().out
+    assert "<title>Renamed</title>" in (site / "docs" / "other.html").read_text()
+
+    assert run_in_daemon(None, False, None, None, "check", {"jobs": 1})
+    (site / "src" / "index.md").write_text("[broken](missing.md)\n")
+    with pytest.raises(click.ClickException, match="Found 1 problem"):
+        run_in_daemon(None, False, None, None, "check", {"jobs": 1})
+
+
+def test_daemon_reloads_changed_templates(site, daemon):
+    """Test that template edits are picked up without restarting the daemon."""
+    run_in_daemon(None, False, None, None, "build", {})
+    (site / "templates" / "page.html").write_text("<h6>new</h6>{{ content|safe }}")
+    run_in_daemon(None, False, None, None, "render", {"page": str(site / "src" / "index.md")})
+    assert "<h6>new</h6>" in (site / "docs" / "index.html").read_text()
+
+
+def test_daemon_rejects_other_sites(site):
+    """Test that requests for a different site are refused so the client runs them itself."""
+    daemon = Daemon(site / "pyproject.toml", False, None, None)
+    request = {"version": DAEMON_PROTOCOL_VERSION, "command": "build", "site": ["elsewhere"], "args": {}}
+    assert daemon.handle(request) == {"status": "mismatch"}
+    assert daemon.handle({**request, "version": 0}) == {"status": "rejected"}
+
+
+def test_silent_client_does_not_block_daemon(site, daemon, monkeypatch):
+    """Test that a client that never finishes its request is dropped so later requests are served."""
+    monkeypatch.setattr(mccole.daemon, "DAEMON_TIMEOUT", 0.1)
+    with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as silent:
+        silent.connect(str(socket_path(daemon.config)))
+        silent.sendall(b'{"version": ')
+        start = time.monotonic()
+        assert run_in_daemon(None, False, None, None, "ping")
+        assert time.monotonic() - start < 5
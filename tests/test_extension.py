@@ -0,0 +1,112 @@
+"""Tests for the Markdown extension that applies transforms natively."""
+
+import markdown
+import pytest
+
+from mccole import transforms
+from mccole.build import _apply_soup_transforms
+from mccole.extension import TransformExtension
+from mccole.transforms import Context, Transform
+
+RAW_HTML_CONTENT = """# Raw HTML
+
+<div class="figure"><img src='@root/images/logo.png' alt="Logo &amp; more"></div>
+
+Inline <a href="g:term">term</a> and <a href="other.md#part">page</a>.
+"""
+
+CODE_CONTENT = """# Code
+
+```html
+<a href="@root/index.md">not a link</a>
+```
+"""
+
+RAW_H1_CONTENT = """<h1>Raw <em>Title</em></h1>
+
+Text.
+"""
+
+INLINE_HTML_TITLE_CONTENT = """# Title with <em>emphasis</em>
+
+Text.
+"""
+
+
+@pytest.fixture
+def registry():
+    """Restore the registered transforms after each test."""
+    saved = transforms.get_transforms()
+    yield
+    transforms._registry[:] = saved
+
+
+def _convert(text, rel_path="docs/page.md"):
+    """Convert Markdown with the extension, returning (html, context)."""
+    md = markdown.Markdown(extensions=["markdown.extensions.fenced_code", TransformExtension()])
+    context = Context(rel_path)
+    md.mccole_context = context
+    return md.convert(text), context
+
+
+def test_links_in_tree_are_rewritten():
+    """Test that Markdown links are rewritten on the ElementTree."""
+    html, context = _convert("# T\n\n[a](@root/x.md) [b](b:key) [c](g:term) ![d](@root/d.png)")
+    assert 'href="../x.html"' in html
+    assert 'href="../bibliography.html#key"' in html
+    assert 'href="../glossary.html#term"' in html
+    assert 'src="../d.png"' in html
+    assert context.title == "T"
+
+
+def test_raw_html_is_rewritten():
+    """Test that attributes in raw HTML blocks and inline HTML are rewritten."""
+    html, context = _convert(RAW_HTML_CONTENT)
+    assert 'src="../images/logo.png"' in html
+    assert 'alt="Logo &amp; more"' in html
+    assert 'href="../glossary.html#term"' in html
+    assert 'href="other.html#part"' in html
+
+
+def test_fenced_code_is_not_rewritten():
+    """Test that HTML shown in code blocks is left alone."""
+    html, context = _convert(CODE_CONTENT)
+    assert "@root/index.md" in html
+
+
+def test_title_from_raw_html_h1():
+    """Test that an H1 written as raw HTML still sets the title."""
+    html, context = _convert(RAW_H1_CONTENT)
+    assert context.title == "Raw Title"
+    assert context.warnings == []
+
+
+def test_title_with_inline_html():
+    """Test that inline HTML in a heading does not leak placeholders into the title."""
+    html, context = _convert(INLINE_HTML_TITLE_CONTENT)
+    assert context.title == "Title with emphasis"
+
+
+@pytest.mark.parametrize("heading, title", [(r"# Foo \* bar", "Foo * bar"), (r"# A \_b\_", "A _b_")])
+def test_title_with_escaped_characters(heading, title):
+    """Test that backslash escapes in a heading do not leak placeholders into the title."""
+    html, context = _convert(f"{heading}\n\nText.\n")
+    assert context.title == title
+
+
+def test_multiple_h1_warning():
+    """Test that multiple H1 headings produce a warning."""
+    html, context = _convert("# One\n\n# Two\n", "index.md")
+    assert context.warnings == ["Warning: Multiple H1 headings found in index.md"]
+
+
+def test_soup_transforms_only_run_when_registered(registry):
+    """Test that BeautifulSoup is only used for transforms that need it."""
+    html, context = _convert("# T\n\n<p>x</p>")
+    assert _apply_soup_transforms(html, context) is html
+
+    def _mark(node, context):
+        node["class"] = "marked"
+
+    transforms.register_transform(Transform("mark", tags=["p"], visit=_mark))
+    assert 'class="marked"' in _apply_soup_transforms(html, context)
@@ -0,0 +1,97 @@
+"""Tests for cached syntax highlighting."""
+
+import click
+import pytest
+
+from mccole.build import _set_up_markdown, build_site
+from mccole.highlight import HIGHLIGHT_CSS_FILE, HighlightCache
+from mccole.transforms import Context
+
+pytest.importorskip("pygments")
+
+FENCED = """# Code
+
+```python
+x = "<a>" & 1
+```
+
+```{.js #example}
+var a;
+```
+
+```nosuchlanguage
+left alone
+```
+
+```
+plain
+```
+"""
+
+
+def _config(tmp_path, **extra):
+    """Build a configuration that highlights with a cache in a temporary directory."""
+    return {"highlight": "default", "cache": str(tmp_path / "cache"), **extra}
+
+
+def test_fenced_blocks_are_highlighted(tmp_path):
+    """Test that blocks with known languages are highlighted and others are left alone."""
+    md = _set_up_markdown(_config(tmp_path), native=[])
+    md.mccole_context = Context("index.md")
+    html = md.convert(FENCED)
+    assert '<div class="highlight"><pre><span></span><code><span class="n">x</span>' in html
+    assert "&lt;a&gt;" in html
+    assert '<pre id="example"><span></span><code><span class="kd">var</span>' in html
+    assert '<code class="language-nosuchlanguage">left alone' in html
+    assert "<pre><code>plain" in html
+
+
+def test_unchanged_blocks_come_from_the_cache(tmp_path):
+    """Test that a block is only highlighted the first time it is seen."""
+    cache = HighlightCache(_config(tmp_path))
+    first = cache.highlight("python", "print(1)\n")
+    assert (cache.hits, cache.misses) == (0, 1)
+    assert HighlightCache(_config(tmp_path)).highlight("python", "print(1)\n") == first
+
+    again = HighlightCache(_config(tmp_path))
+    again.highlight("python", "print(1)\n")
+    again.highlight("python", "print(2)\n")
+    assert (again.hits, again.misses) == (1, 1)
+
+    other_style = HighlightCache(_config(tmp_path, highlight="monokai"))
+    other_style.highlight("python", "print(1)\n")
+    assert other_style.misses == 1
+
+
+def test_unknown_style_is_an_error(tmp_path):
+    """Test that a misspelled style is reported."""
+    with pytest.raises(click.ClickException, match="Unknown highlighting style"):
+        HighlightCache(_config(tmp_path, highlight="no-such-style"))
+
+
+def test_build_writes_stylesheet_once(tmp_path):
+    """Test that the style's CSS is written for the site and removed when highlighting is turned off."""
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text("{{ content|safe }}")
+    (tmp_path / "src").mkdir()
+    (tmp_path / "src" / "index.md").write_text(FENCED)
+    config = {
+        "src": tmp_path / "src",
+        "dst": tmp_path / "dst",
+        "templates": tmp_path / "templates",
+        "skips": [],
+        "verbose": False,
+        **_config(tmp_path),
+    }
+    build_site(config)
+    css = tmp_path / "dst" / HIGHLIGHT_CSS_FILE
+    assert ".highlight .k" in css.read_text()
+    assert 'class="highlight"' in (tmp_path / "dst" / "index.html").read_text()
+    mtime = css.stat().st_mtime_ns
+    build_site(config)
+    assert css.stat().st_mtime_ns == mtime
+
+    config["highlight"] = ""
+    build_site(config)
+    assert not css.exists()
+    assert 'class="highlight"' not in (tmp_path / "dst" / "index.html").read_text()
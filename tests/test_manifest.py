@@ -0,0 +1,164 @@
+"""Tests for incremental builds driven by the manifest."""
+
+from pathlib import Path
+import pytest
+
+from mccole.build import _convert_markdowns, _copy_others, _set_up_jinja, build_site, prune_outputs
+from mccole.manifest import MANIFEST_FILE, load_manifest
+
+SRC = Path("/source")
+DST = Path("/dest")
+TEMPLATES = Path("/templates")
+
+JINJA_TEMPLATE = "<html><title>{{ title }}</title><body>{{ content|safe }}</body></html>"
+
+
+@pytest.fixture
+def site(fs):
+    """Set up a small site with one page and one asset."""
+    fs.create_file(str(TEMPLATES / "page.html"), contents=JINJA_TEMPLATE)
+    fs.create_file(str(SRC / "index.md"), contents="# Title\n\nBody.")
+    fs.create_file(str(SRC / "image.txt"), contents="asset")
+    config = {"src": SRC, "dst": DST, "verbose": True, "templates": TEMPLATES}
+    return config
+
+
+def _build(config):
+    """Run the conversion and copying steps with a manifest."""
+    manifest = load_manifest(config)
+    _convert_markdowns(config, _set_up_jinja(config), [SRC / "index.md"], manifest)
+    _copy_others(config, [SRC / "image.txt"], manifest)
+    manifest.save()
+
+
+def test_manifest_written_after_build(site):
+    """Test that a build records every file in the manifest."""
+    _build(site)
+    assert (DST / MANIFEST_FILE).exists()
+    manifest = load_manifest(site)
+    assert manifest.previous["index.md"]["output"] == "index.html"
+    assert manifest.previous["image.txt"]["template"] is None
+
+
+def test_unchanged_files_are_skipped(site, capsys):
+    """Test that a second build skips files whose inputs did not change."""
+    _build(site)
+    capsys.readouterr()
+    _build(site)
+    captured = capsys.readouterr()
+    assert "Unchanged index.md" in captured.out
+    assert "Unchanged image.txt" in captured.out
+    assert "Converted" not in captured.out
+    assert "Copied" not in captured.out
+
+
+def test_changed_source_is_rebuilt(site, capsys):
+    """Test that editing a page rebuilds only that page."""
+    _build(site)
+    (SRC / "index.md").write_text("# Other\n\nNew body.")
+    capsys.readouterr()
+    _build(site)
+    captured = capsys.readouterr()
+    assert "Converted index.md to HTML" in captured.out
+    assert "Unchanged image.txt" in captured.out
+    assert "<title>Other</title>" in (DST / "index.html").read_text()
+
+
+def test_changed_template_rebuilds_pages_only(site, capsys):
+    """Test that editing a template rebuilds pages but not assets."""
+    _build(site)
+    (TEMPLATES / "page.html").write_text("<p>{{ title }}</p>{{ content|safe }}")
+    capsys.readouterr()
+    _build(site)
+    captured = capsys.readouterr()
+    assert "Converted index.md to HTML" in captured.out
+    assert "Unchanged image.txt" in captured.out
+
+
+def test_changed_config_rebuilds_everything(site, capsys):
+    """Test that changing the configuration rebuilds every file."""
+    _build(site)
+    site["skips"] = ["*.tmp"]
+    capsys.readouterr()
+    _build(site)
+    captured = capsys.readouterr()
+    assert "Converted index.md to HTML" in captured.out
+    assert "image.txt" in captured.out
+
+
+def test_output_settings_do_not_rebuild(site, capsys):
+    """Test that settings which do not change page contents leave files up to date."""
+    _build(site)
+    site.update({"compress": ["gz"], "compress_min_ratio": 0.5, "search": True, "link_mode": "hardlink"})
+    capsys.readouterr()
+    _build(site)
+    captured = capsys.readouterr()
+    assert "Unchanged index.md" in captured.out
+    assert "Unchanged image.txt" in captured.out
+
+
+def test_missing_output_is_rebuilt(site, capsys):
+    """Test that a deleted output is regenerated even if inputs are unchanged."""
+    _build(site)
+    (DST / "index.html").unlink()
+    capsys.readouterr()
+    _build(site)
+    assert (DST / "index.html").exists()
+
+
+def test_force_ignores_manifest(site, capsys):
+    """Test that forcing a build rebuilds files the previous manifest says are up to date."""
+    _build(site)
+    site["force"] = True
+    capsys.readouterr()
+    _build(site)
+    captured = capsys.readouterr()
+    assert "Converted index.md to HTML" in captured.out
+    assert "Copied image.txt" in captured.out
+
+
+@pytest.fixture
+def nested_site(site, fs):
+    """Add a page in a subdirectory and a file no build produced."""
+    fs.create_file(str(SRC / "docs" / "old.md"), contents="# Old")
+    fs.create_file(str(DST / "CNAME"), contents="example.org")
+    site["skips"] = []
+    return site
+
+
+def test_prune_removes_orphans_and_empty_directories(nested_site, fs, capsys):
+    """Test that outputs of deleted sources are removed along with emptied directories."""
+    prune_outputs(nested_site, build_site(nested_site))
+    fs.remove_object(str(SRC / "docs" / "old.md"))
+    capsys.readouterr()
+    assert prune_outputs(nested_site, build_site(nested_site)) == ["docs/old.html"]
+    out = capsys.readouterr().out
+    assert "Removed docs/old.html" in out
+    assert "Removed docs/" in out
+    assert not (DST / "docs").exists()
+    assert (DST / "CNAME").exists()
+    assert (DST / "index.html").exists()
+
+
+def test_prune_dry_run_lists_without_removing(nested_site, fs, capsys):
+    """Test that a dry run lists stale outputs and leaves them for a later build."""
+    prune_outputs(nested_site, build_site(nested_site))
+    fs.remove_object(str(SRC / "docs" / "old.md"))
+    capsys.readouterr()
+    prune_outputs(nested_site, build_site(nested_site), dry_run=True)
+    out = capsys.readouterr().out
+    assert "Would remove docs/old.html" in out
+    assert "Would remove docs/" in out
+    assert (DST / "docs" / "old.html").exists()
+
+    assert prune_outputs(nested_site, build_site(nested_site)) == ["docs/old.html"]
+    assert not (DST / "docs").exists()
+
+
+def test_forced_build_prunes_deleted_sources(nested_site, fs):
+    """Test that a forced build still removes outputs of deleted sources."""
+    prune_outputs(nested_site, build_site(nested_site))
+    fs.remove_object(str(SRC / "docs" / "old.md"))
+    nested_site["force"] = True
+    assert prune_outputs(nested_site, build_site(nested_site)) == ["docs/old.html"]
+    assert not (DST / "docs").exists()
@@ -0,0 +1,125 @@
+"""Tests for minifying HTML, CSS, and JavaScript."""
+
+from pathlib import Path
+
+from mccole.build import build_site
+from mccole.minify import minifier_for, minify_css, minify_html, minify_js
+
+SRC = Path("/source")
+DST = Path("/dest")
+TEMPLATES = Path("/templates")
+
+PAGE = """<!DOCTYPE html>
+<html>
+  <head>
+    <title>  A   title </title>
+  </head>
+  <body>
+    <!-- navigation goes here -->
+    <p>Some   <em>emphasis</em>  here</p>
+    <ul>
+      <li>One</li>
+      <li>Two</li>
+    </ul>
+    <pre>  keep
+    this  </pre>
+    <p><code>x  =  1</code> <input value="a  b"></p>
+    <textarea>
+  as typed
+</textarea>
+  </body>
+</html>
+"""
+
+STYLE = """/* theme */
+a:hover , nav > a {
+  color : red ;
+  content: "a ; b  c";
+}
+/*! license */
+@media (min-width: 40em) { p { margin: 0 auto; } }
+"""
+
+
+def test_minify_html_collapses_whitespace_outside_preformatted_text():
+    """Test that whitespace and comments go but preformatted text and attributes stay."""
+    result = minify_html(PAGE)
+    assert result.startswith("<!DOCTYPE html><html><head><title>A title</title></head><body><p>Some <em>")
+    assert "navigation" not in result
+    assert "<em>emphasis</em> here</p>" in result
+    assert "<ul><li>One<li>Two</ul>" in result
+    assert "<pre>  keep\n    this  </pre>" in result
+    assert '<code>x  =  1</code> <input value="a  b">' in result
+    assert "<textarea>\n  as typed\n</textarea>" in result
+    assert not result.endswith("</html>")
+
+
+def test_minify_html_keeps_spaces_around_inline_form_controls():
+    """Test that select is treated as inline text while its options may still drop their end tags."""
+    result = minify_html("<label>Pick <select> <option>A</option> <option>B</option> </select> now</label>")
+    assert result == "<label>Pick <select> <option>A</option> <option>B</option> </select> now</label>"
+    assert minify_html("<select><option>A</option><option>B</option></select>") == "<select><option>A<option>B</select>"
+
+
+def test_minify_css_keeps_strings_and_licenses():
+    """Test that CSS loses comments and spaces but not strings or /*! comments."""
+    assert minify_css(STYLE) == (
+        'a:hover,nav>a{color :red;content:"a ; b  c"}/*! license */ @media (min-width:40em){p{margin:0 auto}}'
+    )
+
+
+def test_minify_js_is_line_based_and_skips_template_literals():
+    """Test that JavaScript keeps its line structure and template literals are untouched."""
+    assert minify_js("// note\nfunction f() {\n    return 1\n}\n\n") == "function f() {\nreturn 1\n}\n"
+    source = "const s = `\n  indented\n`\n"
+    assert minify_js(source) == source
+
+
+def test_minifier_for_respects_kinds_and_min_files():
+    """Test that only configured kinds are minified and .min files are copied as they are."""
+    assert minifier_for("style.css", ["css"]) is minify_css
+    assert minifier_for("app.js", ["css"]) is None
+    assert minifier_for("lib.min.js", ["js"]) is None
+
+
+def test_build_minifies_pages_and_stylesheets(fs):
+    """Test that a build with minification turned on shrinks pages and copied CSS."""
+    fs.create_file(str(TEMPLATES / "page.html"), contents="<html>\n  <body>\n    {{ content|safe }}\n  </body>\n</html>\n")
+    fs.create_file(str(SRC / "index.md"), contents="# Title\n\nSome text.\n\n    code  block\n")
+    fs.create_file(str(SRC / "style.css"), contents=STYLE)
+    config = {
+        "src": SRC,
+        "dst": DST,
+        "templates": TEMPLATES,
+        "skips": [],
+        "verbose": False,
+        "minify": ["html", "css"],
+    }
+    build_site(config)
+    assert (DST / "index.html").read_text() == (
+        "<html><body><h1>Title</h1><p>Some text.</p><pre><code>code  block\n</code></pre>"
+    )
+    assert (DST / "style.css").read_text().startswith("a:hover,nav>a{")
+
+
+def test_minifying_over_hardlink_leaves_source_alone(tmp_path):
+    """Test that turning on minification after a hardlink build does not rewrite the source."""
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text("{{ content|safe }}")
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "style.css").write_text(STYLE)
+    config = {
+        "src": src,
+        "dst": tmp_path / "dst",
+        "templates": tmp_path / "templates",
+        "skips": [],
+        "verbose": False,
+        "link_mode": "hardlink",
+    }
+    build_site(config)
+    assert (tmp_path / "dst" / "style.css").stat().st_ino == (src / "style.css").stat().st_ino
+    config["minify"] = ["css"]
+    build_site(config)
+    assert (src / "style.css").read_text() == STYLE
+    assert (tmp_path / "dst" / "style.css").read_text().startswith("a:hover,nav>a{")
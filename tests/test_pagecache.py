@@ -0,0 +1,75 @@
+"""Tests for the rendered-page cache."""
+
+import pytest
+import shutil
+
+from mccole.build import build_site
+from mccole.pagecache import PageCache, open_page_cache
+from mccole.util import MEGABYTE
+
+TEMPLATE = "<title>{{ title }}</title>{{ content|safe }}"
+
+
+@pytest.fixture
+def config(tmp_path):
+    """Create a small site with the page cache turned on (SQLite needs a real filesystem)."""
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text(TEMPLATE)
+    (tmp_path / "src" / "docs").mkdir(parents=True)
+    (tmp_path / "src" / "index.md").write_text("# Home\n\nHello.")
+    (tmp_path / "src" / "docs" / "page.md").write_text("No title here.")
+    return {
+        "src": tmp_path / "src",
+        "dst": tmp_path / "dst",
+        "templates": tmp_path / "templates",
+        "skips": [],
+        "verbose": True,
+        "cache": str(tmp_path / "cache"),
+        "page_cache_limit": 1,
+    }
+
+
+def test_rebuild_restores_pages_from_cache(config, capsys):
+    """Test that pages rendered before are restored instead of converted."""
+    build_site(config)
+    first = (config["dst"] / "docs" / "page.html").read_text()
+    capsys.readouterr()
+
+    shutil.rmtree(config["dst"])
+    build_site(config)
+    out = capsys.readouterr().out
+    assert "Restored index.md from cache" in out
+    assert "Warning: No H1 heading found in docs/page.md" in out
+    assert "Converted" not in out
+    assert (config["dst"] / "docs" / "page.html").read_text() == first
+
+
+def test_changed_template_misses_cache(config, capsys):
+    """Test that a different template chain gives different cache keys."""
+    build_site(config)
+    shutil.rmtree(config["dst"])
+    (config["templates"] / "page.html").write_text("<h1>{{ title }}</h1>{{ content|safe }}")
+    capsys.readouterr()
+    build_site(config)
+    assert "Restored" not in capsys.readouterr().out
+    assert "<h1>Home</h1>" in (config["dst"] / "index.html").read_text()
+
+
+def test_prune_evicts_least_recently_used(tmp_path):
+    """Test that pruning removes the oldest-used entries first."""
+    cache = PageCache(tmp_path / "pages.sqlite", MEGABYTE)
+    for key in ("a", "b", "c"):
+        cache.put(key, key * 1000, [])
+    cache.get("a")
+    sizes = cache.stats()["size"]
+    assert cache.prune(sizes - 1) == 1
+    assert cache.get("b") is None
+    assert cache.get("a") == ("a" * 1000, [])
+    assert cache.prune(0) == 2
+    assert cache.stats()["entries"] == 0
+
+
+def test_page_cache_can_be_turned_off(tmp_path):
+    """Test that a zero limit or no cache directory turns the cache off."""
+    assert open_page_cache({"cache": str(tmp_path), "page_cache_limit": 0}) is None
+    assert open_page_cache({"cache": None}) is None
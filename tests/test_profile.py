@@ -0,0 +1,104 @@
+"""Tests for build profiling."""
+
+import json
+from pathlib import Path
+import pytest
+
+from mccole.build import Converter, _copy_others, _convert_markdowns, _set_up_jinja
+from mccole.profile import NULL_PROFILER, MemoryProfiler, Profiler, report, report_memory, write_trace
+
+SRC = Path("/source")
+DST = Path("/dest")
+TEMPLATES = Path("/templates")
+
+
+@pytest.fixture
+def site(fs):
+    """Set up a site with two pages and an asset."""
+    fs.create_file(str(TEMPLATES / "page.html"), contents="<title>{{ title }}</title>{{ content|safe }}")
+    fs.create_file(str(SRC / "index.md"), contents="# Home\n\n[x](@root/a.md)")
+    fs.create_file(str(SRC / "a.md"), contents="# A")
+    fs.create_file(str(SRC / "logo.txt"), contents="logo")
+    return {"src": SRC, "dst": DST, "verbose": False, "templates": TEMPLATES}
+
+
+def test_profiler_records_every_stage_for_every_page(site):
+    """Test that each page gets read, markdown, transform, render, and write events."""
+    profiler = Profiler()
+    _convert_markdowns(site, _set_up_jinja(site), [SRC / "index.md", SRC / "a.md"], profiler=profiler)
+    _copy_others(site, [SRC / "logo.txt"], profiler=profiler)
+    recorded = {(name, page) for name, page, *rest in profiler.events}
+    for page in ("index.md", "a.md"):
+        for stage in ("read", "markdown", "transform", "render", "write"):
+            assert (stage, page) in recorded
+    assert ("copy", "logo.txt") in recorded
+
+
+def test_null_profiler_records_nothing(site):
+    """Test that conversion without profiling leaves no events."""
+    converter = Converter(site)
+    assert converter.profiler is NULL_PROFILER
+    converter.render("# Title", Path("index.md"))
+    assert NULL_PROFILER.take() == []
+
+
+def test_report_lists_stages_and_slowest_pages(capsys):
+    """Test the summary printed after a profiled build."""
+    profiler = Profiler()
+    profiler.add([
+        ("markdown", "slow.md", 0, 9_000_000, 1, 1),
+        ("transform", "slow.md", 0, 1_000_000, 1, 1),
+        ("markdown", "fast.md", 0, 1_000_000, 1, 1),
+    ])
+    report(profiler, top=1)
+    out = capsys.readouterr().out
+    assert "markdown" in out
+    assert "(part of markdown)" in out
+    assert "9.00  slow.md" in out
+    assert "fast.md" not in out
+
+
+def test_write_trace_produces_chrome_events(tmp_path):
+    """Test that trace files use the Chrome trace-event format."""
+    profiler = Profiler()
+    with profiler.stage("render", "index.md"):
+        pass
+    path = tmp_path / "trace.json"
+    write_trace(profiler, path)
+    data = json.loads(path.read_text())
+    event = data["traceEvents"][0]
+    assert event["ph"] == "X"
+    assert event["name"] == "render"
+    assert event["args"] == {"page": "index.md"}
+
+
+def test_memory_profiler_measures_peak_and_retained_allocation():
+    """Test that stages report what they allocated, including nested stages."""
+    profiler = MemoryProfiler()
+    kept = []
+    with profiler.stage("outer", "page.md"):
+        with profiler.stage("inner", "page.md"):
+            temporary = bytearray(4 * 1024 * 1024)
+            del temporary
+        kept.append(bytearray(1024 * 1024))
+    profiler.stop()
+    samples = {name: (peak, retained) for name, page, peak, retained, rss, pid in profiler.samples}
+    assert samples["inner"][0] >= 4 * 1024 * 1024
+    assert samples["inner"][1] < 1024 * 1024
+    assert samples["outer"][0] >= samples["inner"][0]
+    assert samples["outer"][1] >= 1024 * 1024
+    events, taken = profiler.take()
+    assert len(events) == 2 and len(taken) == 2
+    assert profiler.samples == []
+
+
+def test_report_memory_lists_stages_and_largest_pages(site, capsys):
+    """Test the summary printed after a memory-profiled build."""
+    profiler = MemoryProfiler()
+    _convert_markdowns(site, _set_up_jinja(site), [SRC / "index.md", SRC / "a.md"], profiler=profiler)
+    profiler.stop()
+    report_memory(profiler, top=1)
+    out = capsys.readouterr().out
+    assert "markdown" in out
+    assert "Largest 1 page allocations (MB):" in out
+    assert "Peak RSS:" in out
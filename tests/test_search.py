@@ -0,0 +1,83 @@
+"""Tests for the client-side search index."""
+
+import json
+
+from mccole.build import build_site
+from mccole.search import (
+    SEARCH_INDEX_FILE,
+    SEARCH_SCRIPT_FILE,
+    decode_postings,
+    encode_index,
+    index_page,
+    tokenize,
+)
+
+PAGE_HTML = """<html><head><title>Ignored</title><script>var hidden = 1;</script></head>
+<body><nav>Menu</nav><main>
+<h1 id="intro">Introduction</h1>
+<p>Widgets are useful widgets.</p>
+<h2>No anchor</h2>
+</main><footer>Copyright</footer></body></html>
+"""
+
+
+def test_tokenize_lowercases_and_drops_stop_words():
+    """Test that words are lower-cased and short or common words are dropped."""
+    assert tokenize("The Quick_brown fox, a dog's 42") == ["quick", "brown", "fox", "dog", "42"]
+
+
+def test_index_page_uses_main_content_and_anchored_headings():
+    """Test that only content text is indexed and headings with ids are kept."""
+    page = index_page(PAGE_HTML)
+    assert page["headings"] == [["intro", "Introduction"]]
+    assert page["terms"]["widgets"] == 2
+    assert page["terms"]["introduction"] > 1
+    for word in ("ignored", "hidden", "menu", "copyright"):
+        assert word not in page["terms"]
+
+
+def test_encode_index_delta_encodes_page_numbers():
+    """Test that postings store differences between page numbers and decode back."""
+    entries = [{"url": f"p{i}.html", "title": f"Page {i}"} for i in range(4)]
+    pages = [(entry, {"headings": [], "terms": {"shared": i + 1}}) for i, entry in enumerate(entries)]
+    pages[1][1]["terms"] = {}
+    index = encode_index(pages)
+    assert index["terms"]["shared"] == [0, 1, 2, 3, 1, 4]
+    assert decode_postings(index["terms"]["shared"]) == {0: 1, 2: 3, 3: 4}
+    assert index["pages"][2] == ["p2.html", "Page 2", []]
+
+
+def test_build_writes_index_and_reuses_postings(tmp_path, capsys):
+    """Test that builds write the index and only tokenize pages that changed."""
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text("<main>{{ content|safe }}</main>")
+    src = tmp_path / "src"
+    src.mkdir()
+    (src / "index.md").write_text("# Home\n\nWelcome to widgets.\n")
+    (src / "other.md").write_text("# Other\n\nGadgets only.\n")
+    config = {
+        "src": src,
+        "dst": tmp_path / "dst",
+        "templates": tmp_path / "templates",
+        "cache": str(tmp_path / "cache"),
+        "skips": [],
+        "verbose": True,
+        "search": True,
+    }
+    build_site(config)
+    assert "Indexed 2 page(s) for search, reused 0" in capsys.readouterr().out
+    index = json.loads((config["dst"] / SEARCH_INDEX_FILE).read_text())
+    assert [page[0] for page in index["pages"]] == ["index.html", "other.html"]
+    assert decode_postings(index["terms"]["gadgets"]) == {1: 1}
+    assert (config["dst"] / SEARCH_SCRIPT_FILE).exists()
+
+    (src / "other.md").write_text("# Other\n\nGadgets and widgets.\n")
+    build_site(config)
+    assert "Indexed 1 page(s) for search, reused 1" in capsys.readouterr().out
+    index = json.loads((config["dst"] / SEARCH_INDEX_FILE).read_text())
+    assert set(decode_postings(index["terms"]["widgets"])) == {0, 1}
+
+    config["search"] = False
+    build_site(config)
+    assert not (config["dst"] / SEARCH_INDEX_FILE).exists()
+    assert not (config["dst"] / SEARCH_SCRIPT_FILE).exists()
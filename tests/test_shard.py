@@ -0,0 +1,115 @@
+"""Tests for sharded builds and merging."""
+
+import click
+import pytest
+
+from mccole.build import build_site, prune_outputs
+from mccole.manifest import MANIFEST_FILE
+from mccole.shard import merge_shards, parse_shard, shard_of
+
+PAGES = [f"page{i}.md" for i in range(12)] + ["docs/index.md", "docs/deep/note.md"]
+
+
+@pytest.fixture
+def site(tmp_path):
+    """Set up a site with enough files to fill several shards."""
+    (tmp_path / "templates").mkdir()
+    (tmp_path / "templates" / "page.html").write_text("<title>{{ title }}</title>{{ content|safe }}")
+    src = tmp_path / "src"
+    for name in PAGES:
+        (src / name).parent.mkdir(parents=True, exist_ok=True)
+        (src / name).write_text(f"# {name}\n")
+    (src / "logo.txt").write_text("logo")
+    return tmp_path
+
+
+def _config(site, dst, shard=None):
+    """Build a configuration for one shard."""
+    return {
+        "src": site / "src",
+        "dst": site / dst,
+        "templates": site / "templates",
+        "skips": [],
+        "verbose": False,
+        "shard": shard,
+    }
+
+
+def _outputs(dst):
+    """Find every file in a directory except the manifest."""
+    return {path.relative_to(dst).as_posix() for path in dst.rglob("*") if path.is_file() and path.name != MANIFEST_FILE}
+
+
+def test_parse_shard():
+    """Test that shards are numbered from 1 and checked."""
+    assert parse_shard("2/4") == (2, 4)
+    for text in ("0/4", "5/4", "two/4", "2"):
+        with pytest.raises(ValueError):
+            parse_shard(text)
+
+
+def test_shard_of_is_stable_and_in_range():
+    """Test that a path always lands in the same shard."""
+    assert shard_of("docs/index.md", 3) == shard_of("docs/index.md", 3)
+    assert {shard_of(name, 3) for name in PAGES} <= {1, 2, 3}
+    assert shard_of("anything.md", 1) == 1
+
+
+def test_shards_partition_the_site_and_merge(site):
+    """Test that shards build disjoint parts of the site that merge into the whole."""
+    build_site(_config(site, "whole"))
+    for i in (1, 2, 3):
+        build_site(_config(site, f"shard{i}", (i, 3)))
+    parts = [_outputs(site / f"shard{i}") for i in (1, 2, 3)]
+    assert all(parts)
+    assert sum(len(part) for part in parts) == len(set().union(*parts))
+
+    config = _config(site, "merged")
+    manifest, collisions = merge_shards(config, [site / f"shard{i}" for i in (1, 2, 3)])
+    manifest.save()
+    assert collisions == []
+    assert _outputs(site / "merged") == _outputs(site / "whole")
+    assert (site / "merged" / "docs" / "deep" / "note.html").read_text() == (
+        site / "whole" / "docs" / "deep" / "note.html"
+    ).read_text()
+
+    (site / "src" / "page0.md").unlink()
+    for i in (1, 2, 3):
+        prune_outputs(_config(site, f"shard{i}", (i, 3)), build_site(_config(site, f"shard{i}", (i, 3))))
+    manifest, _ = merge_shards(config, [site / f"shard{i}" for i in (1, 2, 3)])
+    prune_outputs(config, manifest)
+    assert not (site / "merged" / "page0.html").exists()
+
+
+def test_build_after_merge_reuses_shard_outputs(site, capsys):
+    """Test that building into a merged directory does not re-render pages the shards built."""
+    for i in (1, 2):
+        build_site(_config(site, f"shard{i}", (i, 2)))
+    config = _config(site, "merged")
+    manifest, _ = merge_shards(config, [site / "shard1", site / "shard2"])
+    manifest.save()
+    config["verbose"] = True
+    capsys.readouterr()
+    build_site(config)
+    out = capsys.readouterr().out
+    assert "Converted" not in out
+    assert "Unchanged page0.md" in out
+
+
+def test_merge_reports_collisions(site):
+    """Test that files produced differently by two shards are reported."""
+    for i in (1, 2):
+        build_site(_config(site, f"shard{i}", (i, 2)))
+    (site / "shard1" / "extra.txt").write_text("one")
+    (site / "shard2" / "extra.txt").write_text("two")
+    manifest, collisions = merge_shards(_config(site, "merged"), [site / "shard1", site / "shard2"])
+    assert len(collisions) == 1
+    assert "extra.txt" in collisions[0]
+    assert (site / "merged" / "extra.txt").read_text() == "one"
+
+
+def test_merge_needs_manifests(site):
+    """Test that merging a directory that no build produced fails."""
+    (site / "empty").mkdir()
+    with pytest.raises(click.ClickException):
+        merge_shards(_config(site, "merged"), [site / "empty"])
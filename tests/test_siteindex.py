@@ -0,0 +1,127 @@
+"""Tests for the site metadata index."""
+
+from pathlib import Path
+import pytest
+
+from mccole.build import build_site
+from mccole.siteindex import SiteIndex, SiteView, extract_metadata, split_front_matter
+
+SRC = Path("/source")
+DST = Path("/dest")
+TEMPLATES = Path("/templates")
+
+NAV_TEMPLATE = """<title>{{ title }}</title>
+{% set prev = site.previous() %}{% if prev %}<a href="{{ site.url(prev) }}">{{ prev.title }}</a>{% endif %}
+{{ content|safe }}"""
+
+PAGE_WITH_FRONT_MATTER = """---
+title: "Getting Started"
+author: Someone
+---
+# Introduction
+
+```
+# not a heading
+```
+
+## Setup {: #setup}
+"""
+
+
+def _index(*keys):
+    """Make an index with a page for each key."""
+    return SiteIndex(extract_metadata(f"# {key}", key) for key in keys)
+
+
+def test_split_front_matter():
+    """Test that front matter is parsed and removed from the body."""
+    meta, body = split_front_matter(PAGE_WITH_FRONT_MATTER)
+    assert meta == {"title": "Getting Started", "author": "Someone"}
+    assert body.startswith("# Introduction")
+    assert split_front_matter("---\n\nNot front matter\n---\n") == ({}, "---\n\nNot front matter\n---\n")
+
+
+def test_extract_metadata_without_rendering():
+    """Test that titles and headings are found outside code blocks."""
+    entry = extract_metadata(PAGE_WITH_FRONT_MATTER, Path("docs/start.md"))
+    assert entry["key"] == "docs/start.md"
+    assert entry["url"] == "docs/start.html"
+    assert entry["title"] == "Getting Started"
+    assert entry["headings"] == [{"level": 1, "text": "Introduction"}, {"level": 2, "text": "Setup"}]
+
+
+@pytest.mark.parametrize(
+    "text, title",
+    [
+        ("# Use `x*y` here\n", "Use x*y here"),
+        ("# Foo \\* bar\n", "Foo * bar"),
+        ("# Caf&eacute;\n", "Café"),
+        ("# Show `&amp;`\n", "Show &amp;"),
+        ("Title\n=====\n\nText.\n", "Title"),
+    ],
+)
+def test_index_titles_are_plain_text(text, title):
+    """Test that titles are the text a heading displays rather than its Markdown."""
+    assert extract_metadata(text, Path("page.md"))["title"] == title
+
+
+def test_setext_headings_are_indexed():
+    """Test that underlined headings are found but rules and indented code are not."""
+    text = "Top\n===\n\nSection\n-------\n\nText.\n\n---\n\n    code\n    ----\n"
+    assert extract_metadata(text, Path("page.md"))["headings"] == [
+        {"level": 1, "text": "Top"},
+        {"level": 2, "text": "Section"},
+    ]
+
+
+def test_reading_order_and_navigation():
+    """Test that index pages come first and navigation records what it used."""
+    index = _index("docs/b.md", "docs/index.md", "z.md", "index.md", "docs/a.md")
+    assert [entry["key"] for entry in index.pages()] == ["index.md", "z.md", "docs/index.md", "docs/a.md", "docs/b.md"]
+
+    view = SiteView(index, Path("docs/a.md"))
+    assert view.next()["key"] == "docs/b.md"
+    assert view.previous()["key"] == "docs/index.md"
+    assert [entry["key"] for entry in view.breadcrumbs()] == ["index.md", "docs/index.md"]
+    assert view.url(view.page("index.md")) == "../index.html"
+    assert "next:docs/a.md" in view.uses
+    assert "page:docs/b.md" in view.uses
+
+
+def test_digest_changes_only_with_used_entries():
+    """Test that a page's dependency digest ignores entries it did not use."""
+    uses = {"page:a.md", "next:a.md"}
+    before = _index("a.md", "b.md", "c.md").digest(uses)
+    assert _index("a.md", "b.md", "d.md").digest(uses) == before
+    assert _index("a.md", "aa.md", "b.md").digest(uses) != before
+
+
+@pytest.fixture
+def site(fs):
+    """Create a site whose template links to the previous page."""
+    fs.create_file(str(TEMPLATES / "page.html"), contents=NAV_TEMPLATE)
+    for name in ("a", "b", "c"):
+        fs.create_file(str(SRC / f"{name}.md"), contents=f"# Page {name}\n")
+    return {"src": SRC, "dst": DST, "templates": TEMPLATES, "skips": [], "verbose": True, "cache": "/cache"}
+
+
+def test_pages_rerender_when_used_entries_change(site, capsys):
+    """Test that only pages whose used index entries changed are rendered again."""
+    build_site(site)
+    assert '<a href="./a.html">Page a</a>' in (DST / "b.html").read_text()
+    capsys.readouterr()
+
+    (SRC / "a.md").write_text("# First page\n")
+    build_site(site)
+    out = capsys.readouterr().out
+    assert "Converted a.md to HTML" in out
+    assert "Converted b.md to HTML" in out
+    assert "Unchanged c.md" in out
+    assert '<a href="./a.html">First page</a>' in (DST / "b.html").read_text()
+
+    (SRC / "c.md").write_text("# Page c\n\nMore text.\n")
+    build_site(site)
+    out = capsys.readouterr().out
+    assert "Unchanged a.md" in out
+    assert "Unchanged b.md" in out
+    assert "Converted c.md to HTML" in out
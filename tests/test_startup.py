@@ -0,0 +1,50 @@
+"""Tests that command-line startup stays fast."""
+
+import subprocess
+import sys
+import time
+
+# Extra seconds `mccole --help` may take beyond starting a bare interpreter
+STARTUP_BUDGET = 0.5
+
+# Modules that only the commands that use them should import
+HEAVY_MODULES = ("markdown", "jinja2", "bs4", "mccole.build", "mccole.check", "mccole.watch")
+
+HELP_SCRIPT = """
+import sys
+from mccole import main
+sys.argv = ["mccole", "--help"]
+try:
+    main()
+except SystemExit:
+    pass
+print(",".join(name for name in {modules!r} if name in sys.modules))
+"""
+
+
+def _best_time(args, runs=3):
+    """Run a command several times and return its fastest wall-clock time and output."""
+    best, output = None, None
+    for _ in range(runs):
+        start = time.perf_counter()
+        result = subprocess.run(args, capture_output=True, text=True, check=True)
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+        output = result.stdout
+    return best, output
+
+
+def test_help_does_not_import_heavy_modules():
+    """Test that showing help loads no command modules or heavy libraries."""
+    script = HELP_SCRIPT.format(modules=HEAVY_MODULES)
+    _, output = _best_time([sys.executable, "-c", script], runs=1)
+    assert "Commands:" in output
+    assert output.splitlines()[-1] == ""
+
+
+def test_help_is_within_startup_budget():
+    """Test that `mccole --help` costs little more than starting Python."""
+    baseline, _ = _best_time([sys.executable, "-c", "pass"])
+    script = HELP_SCRIPT.format(modules=HEAVY_MODULES)
+    elapsed, _ = _best_time([sys.executable, "-c", script])
+    assert elapsed - baseline < STARTUP_BUDGET
@@ -0,0 +1,90 @@
+"""Tests for the single-pass transformation engine."""
+
+from bs4 import BeautifulSoup
+import pytest
+
+from mccole import transforms
+from mccole.transforms import Context, Transform, apply_transforms, register_transform
+
+HTML_WITH_EVERYTHING = """
+<h1>Main Title</h1>
+<p><a href="@root/docs/page.md#intro">Root link</a></p>
+<p><a href="b:smith2020">Citation</a> and <a href="g:term">term</a></p>
+<img src="@root/images/logo.png">
+<a href="x:issue-12">Issue</a>
+"""
+
+
+@pytest.fixture
+def registry():
+    """Restore the registered transforms after each test."""
+    saved = transforms.get_transforms()
+    yield
+    transforms._registry[:] = saved
+
+
+def test_all_transforms_applied_in_one_pass():
+    """Test that the built-in transforms all run during a single walk."""
+    soup = BeautifulSoup(HTML_WITH_EVERYTHING, "html.parser")
+    context = Context("docs/sub/page.md")
+    apply_transforms(soup, context)
+    html = str(soup)
+    assert 'href="../../docs/page.html#intro"' in html
+    assert 'href="../../bibliography.html#smith2020"' in html
+    assert 'href="../../glossary.html#term"' in html
+    assert 'src="../../images/logo.png"' in html
+    assert context.title == "Main Title"
+    assert context.warnings == []
+
+
+def test_default_title_and_warning_without_h1():
+    """Test that a page without an H1 keeps the default title and gets a warning."""
+    soup = BeautifulSoup("<p>No heading</p>", "html.parser")
+    context = Context("page.md")
+    apply_transforms(soup, context)
+    assert context.title == transforms.DEFAULT_TITLE
+    assert context.warnings == ["Warning: No H1 heading found in page.md"]
+
+
+def test_registered_transform_is_applied(registry):
+    """Test that a third-party transform joins the single walk."""
+    def rewrite(value, context):
+        if value.startswith("x:"):
+            return f"https://example.org/issues/{value[2:]}"
+        return value
+
+    register_transform(Transform("issues", tags=["a"], attrs=["href"], rewrite=rewrite))
+    soup = BeautifulSoup(HTML_WITH_EVERYTHING, "html.parser")
+    apply_transforms(soup, Context("index.md"))
+    assert 'href="https://example.org/issues/issue-12"' in str(soup)
+
+
+def test_register_transform_before_existing(registry):
+    """Test that a transform can be placed before an existing one."""
+    register_transform(Transform("first", attrs=["href"], rewrite=lambda v, c: v), before="root_path")
+    assert transforms.get_transforms()[0].name == "first"
+
+
+def test_register_transform_rejects_duplicates_and_unknown_positions(registry):
+    """Test that bad registrations are reported."""
+    with pytest.raises(ValueError):
+        register_transform(Transform("glossary"))
+    with pytest.raises(ValueError):
+        register_transform(Transform("new"), before="nonexistent")
+
+
+def test_visit_sees_only_matching_tags():
+    """Test that node visitors are only called for the tags they declare."""
+    seen = []
+    transform = Transform("images", tags=["img"], visit=lambda node, context: seen.append(node.name))
+    soup = BeautifulSoup(HTML_WITH_EVERYTHING, "html.parser")
+    apply_transforms(soup, Context("index.md"), [transform])
+    assert seen == ["img"]
+
+
+def test_root_path_uses_fingerprinted_asset_names():
+    """Test that @root/ references to fingerprinted assets get the new names."""
+    assets = {"css/style.css": "css/style.0123456789.css"}
+    context = Context("docs/page.md", assets)
+    assert transforms.ROOT_PATH.rewrite("@root/css/style.css?v=1#top", context) == "../css/style.0123456789.css?v=1#top"
+    assert transforms.ROOT_PATH.rewrite("@root/logo.png", context) == "../logo.png"
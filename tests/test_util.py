@@ -0,0 +1,105 @@
+"""Tests for utility functions."""
+
+import os
+from pathlib import Path
+import pytest
+
+from mccole import util
+from mccole.util import compile_skips, find_files
+
+SRC = Path("/source")
+
+SOURCE_FILES = [
+    "index.md",
+    "notes.tmp",
+    "docs/page.md",
+    "docs/draft.tmp",
+    "docs/image.png",
+    "node_modules/pkg/index.js",
+    "node_modules/pkg/lib/deep.js",
+    "build/output.txt",
+    "top.txt",
+    "docs/top.txt",
+    "data/a1.csv",
+    "data/b1.csv",
+]
+
+
+@pytest.fixture
+def source_tree(fs):
+    """Create a source tree in the fake filesystem."""
+    for name in SOURCE_FILES:
+        fs.create_file(str(SRC / name), contents=name)
+
+
+def _relative(paths):
+    """Convert found paths to relative strings for comparison."""
+    return sorted(str(Path(p).relative_to(SRC)) for p in paths)
+
+
+def test_find_files_without_skips(source_tree):
+    """Test that every file is found and split by type."""
+    markdowns, others = find_files({"src": SRC, "skips": []})
+    assert _relative(markdowns) == ["docs/page.md", "index.md"]
+    assert len(others) == len(SOURCE_FILES) - 2
+
+
+def test_find_files_applies_skip_patterns(source_tree):
+    """Test the different kinds of skip pattern."""
+    skips = ["*.tmp", "node_modules/**", "build/", "/top.txt", "data/[!a]*.csv"]
+    markdowns, others = find_files({"src": SRC, "skips": skips})
+    assert _relative(others) == ["data/a1.csv", "docs/image.png", "docs/top.txt"]
+
+
+def test_find_files_does_not_enter_skipped_directories(source_tree, monkeypatch):
+    """Test that skipped directories are pruned rather than walked."""
+    visited = []
+    real_scandir = os.scandir
+
+    def _scandir(path):
+        visited.append(str(path))
+        return real_scandir(path)
+
+    monkeypatch.setattr(util.os, "scandir", _scandir)
+    find_files({"src": SRC, "skips": ["node_modules/**", "build/"]})
+    assert not any("node_modules" in path for path in visited)
+    assert not any("build" in path for path in visited)
+    assert str(SRC / "docs") in visited
+
+
+def test_find_files_records_stats(source_tree):
+    """Test that stat results from discovery are saved when asked."""
+    stats = {}
+    markdowns, others = find_files({"src": SRC, "skips": []}, stats)
+    assert set(stats) == set(markdowns + others)
+    index = next(path for path in markdowns if path.name == "index.md")
+    assert stats[index].st_size == len("index.md")
+
+
+def test_find_files_with_missing_source(fs):
+    """Test that a missing source directory has no files."""
+    assert find_files({"src": SRC, "skips": []}) == ([], [])
+
+
+def test_compile_skips_combines_patterns():
+    """Test that all patterns are compiled into a single matcher."""
+    files, dirs = compile_skips(["*.tmp", "*.bak", ".venv/**"])
+    assert files.match("a/b/c.tmp")
+    assert files.match("c.bak")
+    assert not files.match("c.tmp.txt")
+    assert dirs.match(".venv")
+    assert dirs.match("sub/.venv")
+    assert not dirs.match("venv")
+    assert compile_skips([]) == (None, None)
+
+
+def test_cache_round_trip_and_invalidation(fs):
+    """Test that cached entries come back only with the same version and when the build is not forced."""
+    config = {"cache": "/cache"}
+    util.save_cache(config, "entries.json", [1, "abc"], {"a.md": {"size": 1}})
+    assert util.load_cache(config, "entries.json", [1, "abc"]) == {"a.md": {"size": 1}}
+    assert util.load_cache(config, "entries.json", [2, "abc"]) == {}
+    assert util.load_cache({**config, "force": True}, "entries.json", [1, "abc"]) == {}
+    assert util.load_cache(config, "missing.json", 1) == {}
+    util.save_cache({"cache": None}, "entries.json", 1, {})
+    assert util.load_cache({"cache": None}, "entries.json", 1) == {}
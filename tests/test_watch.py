@@ -0,0 +1,92 @@
+"""Tests for watch functionality."""
+
+from pathlib import Path
+import pytest
+
+from mccole.build import Converter, _set_up_jinja
+from mccole.watch import _changed_paths, _rebuild, _snapshot, _wait_for_changes
+
+SRC = Path("/source")
+DST = Path("/dest")
+TEMPLATES = Path("/templates")
+CONFIG_FILE = Path("/pyproject.toml")
+
+JINJA_TEMPLATE = "<title>{{ title }}</title>{{ content|safe }}"
+
+
+@pytest.fixture
+def site(fs):
+    """Set up a small site and its configuration."""
+    fs.create_file(str(CONFIG_FILE), contents="[tool.mccole]\n")
+    fs.create_file(str(TEMPLATES / "page.html"), contents=JINJA_TEMPLATE)
+    fs.create_file(str(SRC / "index.md"), contents="# Home")
+    fs.create_file(str(SRC / "docs" / "page.md"), contents="# Page")
+    fs.create_file(str(SRC / "logo.txt"), contents="logo")
+    return {"src": SRC, "dst": DST, "verbose": True, "templates": TEMPLATES, "skips": []}
+
+
+def test_changed_paths_reports_additions_removals_and_edits():
+    """Test that snapshot differences include every kind of change."""
+    old = {Path("a"): (1, 1), Path("b"): (1, 1), Path("c"): (1, 1)}
+    new = {Path("a"): (1, 1), Path("b"): (2, 1), Path("d"): (1, 1)}
+    assert _changed_paths(old, new) == {Path("b"), Path("c"), Path("d")}
+
+
+def test_wait_for_changes_merges_bursts():
+    """Test that a burst of changes is returned as one settled batch."""
+    snapshots = iter([{"a": 1}, {"a": 2}, {"a": 2, "b": 1}, {"a": 2, "b": 2}, {"a": 2, "b": 2}])
+    sleeps = []
+    result = _wait_for_changes(lambda: next(snapshots), {"a": 1}, 0.5, 0.1, sleep=sleeps.append)
+    assert result == {"a": 2, "b": 2}
+    assert sleeps == [0.5, 0.5, 0.1, 0.1, 0.1]
+
+
+def test_snapshot_includes_sources_templates_and_config(site):
+    """Test that every watched file appears in a snapshot."""
+    snapshot = {str(path) for path in _snapshot(CONFIG_FILE, site)}
+    assert str(SRC / "index.md") in snapshot
+    assert str(SRC / "logo.txt") in snapshot
+    assert str(TEMPLATES / "page.html") in snapshot
+    assert str(CONFIG_FILE) in snapshot
+
+
+def test_rebuild_only_touches_changed_pages(site, capsys):
+    """Test that a warm rebuild converts only the page that changed."""
+    jinja_env = _set_up_jinja(site)
+    converter = Converter(site, jinja_env)
+    _rebuild(site, jinja_env, converter)
+    (SRC / "index.md").write_text("# New home")
+    capsys.readouterr()
+    _rebuild(site, jinja_env, converter)
+    captured = capsys.readouterr()
+    assert "Converted index.md to HTML" in captured.out
+    assert "Unchanged docs/page.md" in captured.out
+    assert "<title>New home</title>" in (DST / "index.html").read_text()
+
+
+def test_rebuild_after_template_change_rebuilds_all_pages(site, capsys):
+    """Test that changing a template rebuilds every page that uses it."""
+    jinja_env = _set_up_jinja(site)
+    _rebuild(site, jinja_env, Converter(site, jinja_env))
+    (TEMPLATES / "page.html").write_text("<h6>{{ title }}</h6>{{ content|safe }}")
+    capsys.readouterr()
+    _rebuild(site, jinja_env, Converter(site, jinja_env))
+    captured = capsys.readouterr()
+    assert "Converted index.md to HTML" in captured.out
+    assert "Converted docs/page.md to HTML" in captured.out
+    assert "<h6>Page</h6>" in (DST / "docs" / "page.html").read_text()
+
+
+def test_rebuild_removes_outputs_of_deleted_sources(site, capsys):
+    """Test that deleting a source removes its output."""
+    jinja_env = _set_up_jinja(site)
+    converter = Converter(site, jinja_env)
+    _rebuild(site, jinja_env, converter)
+    assert (DST / "docs" / "page.html").exists()
+    (SRC / "docs" / "page.md").unlink()
+    (SRC / "logo.txt").unlink()
+    _rebuild(site, jinja_env, converter)
+    assert not (DST / "docs" / "page.html").exists()
+    assert not (DST / "logo.txt").exists()
+    assert (DST / "index.html").exists()
+    assert "Removed docs/page.html" in capsys.readouterr().out